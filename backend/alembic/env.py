@@ -15,7 +15,10 @@ from app.core.database import Base
 # Importar modelos 
 # Importa cada modelo que se cree
 from app.models.user import User
-from app.models.habits import Habit, HabitCompletion
+from app.models.habits import Habit, HabitCompletion, HabitVersion, HabitTombstone
+from app.models.stats import HabitStats, UserStats
+from app.models.jobs import Job
+from app.models.refresh_token import RefreshToken
 
 # Objeto de configuracion de Alembic
 config = context.config
@@ -0,0 +1,32 @@
+"""add query indexes
+
+Revision ID: 0fa1c8fe8cfc
+Revises: f938de4a5fd7
+Create Date: 2026-10-18 11:40:03.127795
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0fa1c8fe8cfc'
+down_revision: Union[str, None] = 'f938de4a5fd7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_habits_user_id', 'habits', ['user_id'], unique=False)
+    op.create_index('ix_habits_public_category', 'habits', ['category', 'user_id'], unique=False, postgresql_where=sa.text('is_public IS true'))
+    op.create_index('ix_habit_completions_habit_completed', 'habit_completions', ['habit_id', 'completed_at'], unique=False)
+    op.create_index('ix_habit_completions_user_completed', 'habit_completions', ['user_id', 'completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_habit_completions_user_completed', table_name='habit_completions')
+    op.drop_index('ix_habit_completions_habit_completed', table_name='habit_completions')
+    op.drop_index('ix_habits_public_category', table_name='habits')
+    op.drop_index('ix_habits_user_id', table_name='habits')
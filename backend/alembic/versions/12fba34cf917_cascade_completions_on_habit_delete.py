@@ -0,0 +1,29 @@
+"""cascade completions on habit delete
+
+Revision ID: 12fba34cf917
+Revises: 91122c9eb51c
+Create Date: 2026-10-18 15:48:30.274910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '12fba34cf917'
+down_revision: Union[str, None] = '91122c9eb51c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # DELETE FROM habits ... RETURNING en una sola sentencia: las completions se borran en la DB
+    op.drop_constraint('habit_completions_habit_id_fkey', 'habit_completions', type_='foreignkey')
+    op.create_foreign_key('habit_completions_habit_id_fkey', 'habit_completions', 'habits', ['habit_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    op.drop_constraint('habit_completions_habit_id_fkey', 'habit_completions', type_='foreignkey')
+    op.create_foreign_key('habit_completions_habit_id_fkey', 'habit_completions', 'habits', ['habit_id'], ['id'])
@@ -0,0 +1,28 @@
+"""completion event id
+
+Revision ID: 2d7c5f0e93ab
+Revises: 8e4b2a7d19c6
+Create Date: 2026-10-18 22:03:51.207943
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7c5f0e93ab'
+down_revision: Union[str, None] = '8e4b2a7d19c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('habit_completions', sa.Column('event_id', sa.String(length=32), nullable=True))
+    op.create_unique_constraint('habit_completions_event_id_key', 'habit_completions', ['event_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('habit_completions_event_id_key', 'habit_completions', type_='unique')
+    op.drop_column('habit_completions', 'event_id')
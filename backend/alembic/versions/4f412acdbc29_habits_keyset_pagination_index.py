@@ -0,0 +1,29 @@
+"""habits keyset pagination index
+
+Revision ID: 4f412acdbc29
+Revises: 0fa1c8fe8cfc
+Create Date: 2026-10-18 13:05:47.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f412acdbc29'
+down_revision: Union[str, None] = '0fa1c8fe8cfc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (user_id, created_at, id) cubre tambien los filtros solo por user_id
+    op.create_index('ix_habits_user_created', 'habits', ['user_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_habits_user_id', table_name='habits')
+
+
+def downgrade() -> None:
+    op.create_index('ix_habits_user_id', 'habits', ['user_id'], unique=False)
+    op.drop_index('ix_habits_user_created', table_name='habits')
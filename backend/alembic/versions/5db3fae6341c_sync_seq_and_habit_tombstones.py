@@ -0,0 +1,47 @@
+"""sync seq and habit tombstones
+
+Revision ID: 5db3fae6341c
+Revises: f19817d2d4a3
+Create Date: 2026-10-18 20:07:33.981642
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5db3fae6341c'
+down_revision: Union[str, None] = 'f19817d2d4a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('habit_tombstones',
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('sync_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('habit_id')
+    )
+    op.create_index('ix_habit_tombstones_user_sync_seq', 'habit_tombstones', ['user_id', 'sync_seq'], unique=False)
+    op.add_column('habit_versions', sa.Column('sync_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('habit_versions', sa.Column('sync_floor', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('habits', sa.Column('sync_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_habits_user_sync_seq', 'habits', ['user_id', 'sync_seq'], unique=False)
+    op.add_column('habit_completions', sa.Column('sync_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_habit_completions_user_sync_seq', 'habit_completions', ['user_id', 'sync_seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_habit_completions_user_sync_seq', table_name='habit_completions')
+    op.drop_column('habit_completions', 'sync_seq')
+    op.drop_index('ix_habits_user_sync_seq', table_name='habits')
+    op.drop_column('habits', 'sync_seq')
+    op.drop_column('habit_versions', 'sync_floor')
+    op.drop_column('habit_versions', 'sync_seq')
+    op.drop_index('ix_habit_tombstones_user_sync_seq', table_name='habit_tombstones')
+    op.drop_table('habit_tombstones')
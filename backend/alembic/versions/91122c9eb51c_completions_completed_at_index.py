@@ -0,0 +1,27 @@
+"""completions completed_at index
+
+Revision ID: 91122c9eb51c
+Revises: 4f412acdbc29
+Create Date: 2026-10-18 14:22:16.630871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '91122c9eb51c'
+down_revision: Union[str, None] = '4f412acdbc29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # rango reciente de completed_at para reconciliar las clasificaciones de dia/semana
+    op.create_index('ix_habit_completions_completed_at', 'habit_completions', ['completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_habit_completions_completed_at', table_name='habit_completions')
@@ -0,0 +1,39 @@
+"""user timezone and completion local day
+
+Revision ID: f19817d2d4a3
+Revises: c194999a4dd2
+Create Date: 2026-10-18 19:14:52.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19817d2d4a3'
+down_revision: Union[str, None] = 'c194999a4dd2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+    op.add_column('habits', sa.Column('once_per_day', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('habit_completions', sa.Column('once_per_day', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('habit_completions', sa.Column('local_day', sa.Integer(), nullable=True))
+    # hasta ahora todos los usuarios estaban en UTC: el dia local es el dia de completed_at
+    op.execute("UPDATE habit_completions SET local_day = CAST(to_char(completed_at, 'YYYYMMDD') AS INTEGER)")
+    op.alter_column('habit_completions', 'local_day', nullable=False)
+    op.create_index('ix_habit_completions_habit_local_day', 'habit_completions', ['habit_id', 'local_day'], unique=False)
+    op.create_index('uq_habit_completions_once_per_day', 'habit_completions', ['habit_id', 'local_day'], unique=True, postgresql_where=sa.text('once_per_day IS true'))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_habit_completions_once_per_day', table_name='habit_completions', postgresql_where=sa.text('once_per_day IS true'))
+    op.drop_index('ix_habit_completions_habit_local_day', table_name='habit_completions')
+    op.drop_column('habit_completions', 'local_day')
+    op.drop_column('habit_completions', 'once_per_day')
+    op.drop_column('habits', 'once_per_day')
+    op.drop_column('users', 'timezone')
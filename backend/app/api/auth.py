@@ -1,16 +1,22 @@
-from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.core.database import get_db
 from app.core.config import settings
-from app.core.security import create_access_token
-from app.schemas.auth import UserRegister, UserLogin, UserResponse, AuthResponse
+from app.core.hashing import hash_password_async
+from app.core.ratelimit import rate_limit
+from app.core.replicas import get_replica_db
+from app.core.security import get_current_user
+from app.schemas.auth import UserRegister, UserLogin, UserResponse, UserUpdate, UserPrincipal, AuthResponse, TokenResponse, RefreshRequest
 from app.services.auth_service import AuthService
+from app.services.token_service import TokenService
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# register y login son async: las queries van al threadpool pero bcrypt (~250 ms) se espera en el
+# event loop, sin ocupar un hilo del threadpool mientras el pool de hashing calcula
 @router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)  # 
-def register(user_data: UserRegister, db: Session = Depends(get_db)):  #
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):  #
     """
     Registrar nuevo usuario
     
@@ -18,26 +24,26 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):  #
     - **username**: Nombre de usuario (único, 3-50 caracteres)
     - **password**: Contraseña (mínimo 6 caracteres)
     """
-    user = AuthService.create_user(db, user_data)
-    access_token = create_access_token(data={"sub": user.email})
-    return {
-        "token": access_token,
-        "token_type": "bearer",
-        "user": user
-    } 
+    # verificar existencia del email y del usuario (en la DB, sin el filtro de Bloom) antes de hashear
+    await run_in_threadpool(AuthService.ensure_available, db, user_data)
+    hashed_password = await hash_password_async(user_data.password)
+    user = await run_in_threadpool(AuthService.create_user, db, user_data, hashed_password)
+    tokens = await run_in_threadpool(TokenService.create_tokens, db, user)
+    return {**tokens, "user": user}
 
 @router.post("/login", response_model=AuthResponse)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     """
     Iniciar sesión y obtener token JWT
     
     - **email**: Email del usuario
     - **password**: Contraseña del usuario
     
-    Retorna un token JWT válido por 30 minutos
+    Retorna un token JWT de vida corta (ACCESS_TOKEN_EXPIRE_MINUTES) y un refresh token
+    para renovarlo en /auth/refresh
     """
     # autenticar usuario
-    user = AuthService.authenticate_user(db, user_data.email, user_data.password)
+    user = await AuthService.authenticate_user(db, user_data.email, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,25 +51,43 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # crear token acceso
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email},
-        expires_delta=access_token_expires
-    )
+    tokens = await run_in_threadpool(TokenService.create_tokens, db, user)
+    return {**tokens, "user": user}
+
+@router.post("/refresh", response_model=TokenResponse)
+def refresh(data: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Renovar el access token
+
+    - **refresh_token**: refresh token recibido en login/registro o en el ultimo refresh
+
+    Cada refresh token sirve una sola vez: la respuesta trae uno nuevo. Reusar uno ya usado cierra la sesion
+    """
+    tokens = TokenService.refresh_tokens(db, data.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tokens
 
-    return {
-        "token": access_token,
-        "token_type": "bearer",
-        "user": user
-    }
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(data: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Cerrar sesion: revoca el refresh token y los access tokens emitidos con el
+    """
+    TokenService.revoke_tokens(db, data.refresh_token)
+
+# se llaman en cada tecla del formulario de registro: limite por IP
+availability_rate_limit = rate_limit(settings.AVAILABILITY_RATE_LIMIT, settings.AVAILABILITY_RATE_PER_SECOND)
 
-@router.get("/check-username/{username}")
-def check_username(username: str, db: Session = Depends(get_db)):
+@router.get("/check-username/{username}", dependencies=[Depends(availability_rate_limit)])
+def check_username(username: str, db: Session = Depends(get_replica_db)):
     return { "available": AuthService.check_username_available(db, username) }
 
-@router.get("/check-email/{email}")
-def check_email(email: str, db: Session = Depends(get_db)):
+@router.get("/check-email/{email}", dependencies=[Depends(availability_rate_limit)])
+def check_email(email: str, db: Session = Depends(get_replica_db)):
     return { "available": AuthService.check_email_available(db, email) }
 
 
@@ -79,4 +103,19 @@ def get_current_user_info(db: Session = Depends(get_db)):
     raise HTTPException(
         status_code=status.HTTP_501_NOT_IMPLEMENTED,
         detail="Endpoint not implemented yet"
-    )
\ No newline at end of file
+    )
+
+@router.patch("/me", response_model=UserResponse)
+def update_current_user(user_data: UserUpdate, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Actualizar el usuario actual
+
+    - **timezone**: zona horaria IANA (p.ej. America/Bogota); las completions nuevas usan el dia local de esa zona
+    """
+    user = AuthService.update_user(db, current_user.id, user_data)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
@@ -0,0 +1,110 @@
+# version async de app/api/auth.py, se monta cuando DATABASE_ASYNC=true
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.config import settings
+from app.core.ratelimit import rate_limit
+from app.core.replicas import get_async_replica_db
+from app.core.security import get_current_user_async
+from app.schemas.auth import UserRegister, UserLogin, UserResponse, UserUpdate, UserPrincipal, AuthResponse, TokenResponse, RefreshRequest
+from app.services.auth_service import AsyncAuthService
+from app.services.token_service import AsyncTokenService
+
+router = APIRouter(prefix="/auth", tags=["Authentication"])
+
+@router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    """
+    Registrar nuevo usuario
+    
+    - **email**: Email válido (único)
+    - **username**: Nombre de usuario (único, 3-50 caracteres)
+    - **password**: Contraseña (mínimo 6 caracteres)
+    """
+    user = await AsyncAuthService.create_user(db, user_data)
+    tokens = await AsyncTokenService.create_tokens(db, user)
+    return {**tokens, "user": user}
+
+@router.post("/login", response_model=AuthResponse)
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    """
+    Iniciar sesión y obtener token JWT
+    
+    - **email**: Email del usuario
+    - **password**: Contraseña del usuario
+    
+    Retorna un token JWT de vida corta (ACCESS_TOKEN_EXPIRE_MINUTES) y un refresh token
+    para renovarlo en /auth/refresh
+    """
+    user = await AsyncAuthService.authenticate_user(db, user_data.email, user_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    tokens = await AsyncTokenService.create_tokens(db, user)
+    return {**tokens, "user": user}
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(data: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Renovar el access token
+
+    - **refresh_token**: refresh token recibido en login/registro o en el ultimo refresh
+
+    Cada refresh token sirve una sola vez: la respuesta trae uno nuevo. Reusar uno ya usado cierra la sesion
+    """
+    tokens = await AsyncTokenService.refresh_tokens(db, data.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tokens
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(data: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cerrar sesion: revoca el refresh token y los access tokens emitidos con el
+    """
+    await AsyncTokenService.revoke_tokens(db, data.refresh_token)
+
+# se llaman en cada tecla del formulario de registro: limite por IP
+availability_rate_limit = rate_limit(settings.AVAILABILITY_RATE_LIMIT, settings.AVAILABILITY_RATE_PER_SECOND)
+
+@router.get("/check-username/{username}", dependencies=[Depends(availability_rate_limit)])
+async def check_username(username: str, db: AsyncSession = Depends(get_async_replica_db)):
+    return { "available": await AsyncAuthService.check_username_available(db, username) }
+
+@router.get("/check-email/{email}", dependencies=[Depends(availability_rate_limit)])
+async def check_email(email: str, db: AsyncSession = Depends(get_async_replica_db)):
+    return { "available": await AsyncAuthService.check_email_available(db, email) }
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_current_user_info():
+    """
+    Obtener información del usuario actual (requiere autenticación)
+    """
+    raise HTTPException(
+        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        detail="Endpoint not implemented yet"
+    )
+
+@router.patch("/me", response_model=UserResponse)
+async def update_current_user(user_data: UserUpdate, current_user: UserPrincipal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    """
+    Actualizar el usuario actual
+
+    - **timezone**: zona horaria IANA (p.ej. America/Bogota); las completions nuevas usan el dia local de esa zona
+    """
+    user = await AsyncAuthService.update_user(db, current_user.id, user_data)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.replicas import get_read_db
+from app.core.security import get_current_user
+from app.schemas.auth import UserPrincipal
+from app.schemas.completion import CompletionCreate, CompletionBatch, CompletionBatchItem, CompletionResponse, HistoryBucket
+from app.services.completion_buffer import completion_buffer
+from app.services.completion_service import CompletionService
+
+router = APIRouter(tags=["Completions"])
+
+# con COMPLETION_WRITE_BEHIND se responde 202 sin esperar el commit (las completions salen sin id)
+def _create_completions(db: Session, current_user: UserPrincipal, items: list[CompletionBatchItem], response: Response) -> list[CompletionResponse]:
+    if completion_buffer.enabled:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return CompletionService.buffer_completions(db, current_user.id, items, current_user.timezone)
+    return CompletionService.create_completions(db, current_user.id, items, current_user.timezone)
+
+@router.post("/habits/{habit_id}/completions", response_model=CompletionResponse, status_code=status.HTTP_201_CREATED)
+def create_completion(habit_id: int, completion_data: CompletionCreate, response: Response, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    item = CompletionBatchItem(habit_id=habit_id, **completion_data.model_dump())
+    completions = _create_completions(db, current_user, [item], response)
+    if not completions:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El habito ya se completo ese dia",
+        )
+    return completions[0]
+
+@router.post("/completions:batch", response_model=list[CompletionResponse], status_code=status.HTTP_201_CREATED)
+def create_completions_batch(batch: CompletionBatch, response: Response, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Registrar muchas completions en un solo request (sincronizacion de clientes offline)
+
+    Las repetidas del mismo dia en habitos once_per_day se omiten, reenviar un lote es seguro para esos habitos
+    """
+    return _create_completions(db, current_user, batch.completions, response)
+
+@router.get("/habits/{habit_id}/history", response_model=list[HistoryBucket], status_code=status.HTTP_200_OK)
+def get_habit_history(
+    habit_id: int,
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    bucket: Literal["day", "week", "month"] = "day",
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Historial agregado de un habito (calendario / heatmap)
+
+    - **from** / **to**: rango de fechas, por defecto los ultimos 365 dias
+    - **bucket**: day, week o month, en dias locales del usuario (el `local_day` de cada completion)
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=365)
+    history = CompletionService.get_history(db, current_user.id, habit_id, start, end, bucket)
+    if history is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No existe el habito",
+        )
+    return history
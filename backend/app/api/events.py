@@ -0,0 +1,70 @@
+import asyncio
+import time
+import orjson
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from app.core.config import settings
+from app.core.security import _credentials_exception, decode_access_token, revoked_access_tokens
+from app.services.event_service import event_hub
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# EventSource del navegador no envia headers: se acepta tambien ?access_token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+def _format(kind: str, data: dict) -> bytes:
+    return b"event: " + kind.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def _stream(user_id: int, jti: str | None, expires_at: float):
+    subscriber = event_hub.subscribe(user_id)
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n".encode()
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                yield _format("token_expired", {})  # el cliente renueva el token y se vuelve a conectar
+                return
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), min(settings.EVENTS_HEARTBEAT_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                if revoked_access_tokens.get(jti):
+                    return
+                yield b": ping\n\n"
+                continue
+            if subscriber.take_lost():
+                yield _format("resync", {})  # se perdieron eventos: el cliente llama GET /sync
+                continue
+            if item["type"] != "resync":
+                data = {key: value for key, value in item.items() if key not in ("user_id", "type")}
+                yield _format(item["type"], data)
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+
+@router.get("")
+async def stream_events(
+    token: str | None = Depends(optional_oauth2_scheme),
+    access_token: str | None = Query(None),
+):
+    """
+    Cambios en vivo de los habitos y completions del usuario (text/event-stream)
+
+    - Eventos: `habit.created`, `habit.updated`, `habit.deleted`, `completion.created`, `resync`, `token_expired`
+    - **token** de cada evento: llamar GET /sync?since=<token anterior> para traer los cambios
+    - `completion.created` con **leaderboard** true: cambiaron las clasificaciones del usuario
+    - La conexion no usa la DB: el token se valida sin consultar usuarios y se cierra al expirar
+    """
+    payload = decode_access_token(token or access_token or "")
+    if payload is None:
+        raise _credentials_exception()
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        raise _credentials_exception()
+    return StreamingResponse(
+        _stream(user_id, payload.get("jti"), payload.get("exp", 0)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
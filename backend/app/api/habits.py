@@ -1,52 +1,81 @@
-from app.schemas.habit import HabitResponse, HabitCreate, HabitUpdate
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.schemas.habit import HabitResponse, HabitCreate, HabitUpdate, HabitBulkUpdate
+from app.models.habits import HabitCategory
+from app.core.config import settings
+from app.core.responses import rows_response
+from fastapi import APIRouter, Depends, Query, Request, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.replicas import get_read_db
+from app.api.habits_common import (
+    cached_response, habit_etag, habit_not_found, habit_response, invalid_cursor, list_etag, page_response, some_habit_not_found,
+)
 from app.services.habit_service import HabitService
-from app.models.user import User
+from app.schemas.auth import UserPrincipal
 from app.core.security import get_current_user
 
 router = APIRouter(prefix="/habits", tags=["Habits"])
 
 @router.get("", response_model=list[HabitResponse], status_code=status.HTTP_200_OK)
-def get_list_habits(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return HabitService.get_habits(db, current_user.id)
+def get_list_habits(
+    request: Request,
+    limit: int = Query(settings.HABITS_PAGE_SIZE, ge=1, le=settings.HABITS_PAGE_MAX),
+    cursor: str | None = None,
+    category: HabitCategory | None = None,
+    is_public: bool | None = None,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Listar habitos del usuario, paginados por (created_at, id)
+
+    Si hay mas resultados el header **X-Next-Cursor** trae el valor para `?cursor=`.
+    Con **If-None-Match** y sin cambios responde 304 sin consultar los habitos.
+    """
+    # la version de la coleccion es una lectura por primary key, antes del query y la serializacion
+    etag = list_etag(request, current_user.id, HabitService.get_habits_version(db, current_user.id))
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+
+    try:
+        habits, next_cursor = HabitService.get_habits_page(db, current_user.id, limit, cursor, category, is_public)
+    except ValueError:
+        raise invalid_cursor()
+    return page_response(habits, next_cursor, etag)
+
+@router.patch("", response_model=list[HabitResponse], status_code=status.HTTP_200_OK)
+def bulk_update_habits(habit_data: HabitBulkUpdate, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Actualizar muchos habitos en una sola transaccion (todo o nada)
+
+    - **habits**: lista de cambios parciales, cada uno con el `id` de un habito distinto (repetidos: 422)
+    """
+    habits = HabitService.bulk_update_habits(db, current_user.id, habit_data.habits)
+    if habits is None:
+        raise some_habit_not_found()
+    return rows_response(habits)
 
 @router.get("/{habit_id}", response_model=HabitResponse, status_code=status.HTTP_200_OK)
-def get_habit(habit_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    habit = HabitService.get_habit(db, current_user.id, habit_id)
-    if not habit:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No hay lista de habitos",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    return habit
+def get_habit(habit_id: int, request: Request, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    # primero solo updated_at: con If-None-Match vigente se responde 304 sin cargar ni serializar el habito
+    updated_at = HabitService.get_habit_updated_at(db, current_user.id, habit_id)
+    if updated_at is None:
+        raise habit_not_found("No hay lista de habitos")
+    etag = habit_etag(habit_id, updated_at)
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+    return habit_response(HabitService.get_habit(db, current_user.id, habit_id), "No hay lista de habitos", etag)
 
 @router.post("", response_model=HabitResponse, status_code=status.HTTP_201_CREATED)
-def create_habit(habit_data: HabitCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_habit(habit_data: HabitCreate, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
     habit = HabitService.create_habit(db, current_user.id, habit_data)
     return habit
 
 @router.put("/{habit_id}", response_model=HabitResponse, status_code=status.HTTP_200_OK)
-def update_habit(habit_id: int, habit_data: HabitUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    habit = HabitService.update_habit(db, current_user.id, habit_id, habit_data)
-    if not habit:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="El habito no existe",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return habit
+def update_habit(habit_id: int, habit_data: HabitUpdate, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    return habit_response(HabitService.update_habit(db, current_user.id, habit_id, habit_data), "El habito no existe")
 
 @router.delete("/{habit_id}", response_model=HabitResponse, status_code=status.HTTP_200_OK)
-def delete_habit(habit_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    habit = HabitService.delete_habit(db, current_user.id, habit_id)
-    if not habit:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No existe el habito",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return habit
\ No newline at end of file
+def delete_habit(habit_id: int, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    return habit_response(HabitService.delete_habit(db, current_user.id, habit_id), "No existe el habito")
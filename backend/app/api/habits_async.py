@@ -0,0 +1,82 @@
+# version async de app/api/habits.py, se monta cuando DATABASE_ASYNC=true
+from app.schemas.habit import HabitResponse, HabitCreate, HabitUpdate, HabitBulkUpdate
+from app.models.habits import HabitCategory
+from app.core.config import settings
+from app.core.responses import rows_response
+from fastapi import APIRouter, Depends, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.replicas import get_async_read_db
+from app.api.habits_common import (
+    cached_response, habit_etag, habit_not_found, habit_response, invalid_cursor, list_etag, page_response, some_habit_not_found,
+)
+from app.services.habit_service import AsyncHabitService
+from app.schemas.auth import UserPrincipal
+from app.core.security import get_current_user_async
+
+router = APIRouter(prefix="/habits", tags=["Habits"])
+
+@router.get("", response_model=list[HabitResponse], status_code=status.HTTP_200_OK)
+async def get_list_habits(
+    request: Request,
+    limit: int = Query(settings.HABITS_PAGE_SIZE, ge=1, le=settings.HABITS_PAGE_MAX),
+    cursor: str | None = None,
+    category: HabitCategory | None = None,
+    is_public: bool | None = None,
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Listar habitos del usuario, paginados por (created_at, id)
+
+    Si hay mas resultados el header **X-Next-Cursor** trae el valor para `?cursor=`.
+    Con **If-None-Match** y sin cambios responde 304 sin consultar los habitos.
+    """
+    # la version de la coleccion es una lectura por primary key, antes del query y la serializacion
+    etag = list_etag(request, current_user.id, await AsyncHabitService.get_habits_version(db, current_user.id))
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+
+    try:
+        habits, next_cursor = await AsyncHabitService.get_habits_page(db, current_user.id, limit, cursor, category, is_public)
+    except ValueError:
+        raise invalid_cursor()
+    return page_response(habits, next_cursor, etag)
+
+@router.patch("", response_model=list[HabitResponse], status_code=status.HTTP_200_OK)
+async def bulk_update_habits(habit_data: HabitBulkUpdate, current_user: UserPrincipal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    """
+    Actualizar muchos habitos en una sola transaccion (todo o nada)
+
+    - **habits**: lista de cambios parciales, cada uno con el `id` de un habito distinto (repetidos: 422)
+    """
+    habits = await AsyncHabitService.bulk_update_habits(db, current_user.id, habit_data.habits)
+    if habits is None:
+        raise some_habit_not_found()
+    return rows_response(habits)
+
+@router.get("/{habit_id}", response_model=HabitResponse, status_code=status.HTTP_200_OK)
+async def get_habit(habit_id: int, request: Request, current_user: UserPrincipal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_read_db)):
+    # primero solo updated_at: con If-None-Match vigente se responde 304 sin cargar ni serializar el habito
+    updated_at = await AsyncHabitService.get_habit_updated_at(db, current_user.id, habit_id)
+    if updated_at is None:
+        raise habit_not_found("No hay lista de habitos")
+    etag = habit_etag(habit_id, updated_at)
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+    return habit_response(await AsyncHabitService.get_habit(db, current_user.id, habit_id), "No hay lista de habitos", etag)
+
+@router.post("", response_model=HabitResponse, status_code=status.HTTP_201_CREATED)
+async def create_habit(habit_data: HabitCreate, current_user: UserPrincipal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    habit = await AsyncHabitService.create_habit(db, current_user.id, habit_data)
+    return habit
+
+@router.put("/{habit_id}", response_model=HabitResponse, status_code=status.HTTP_200_OK)
+async def update_habit(habit_id: int, habit_data: HabitUpdate, current_user: UserPrincipal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    return habit_response(await AsyncHabitService.update_habit(db, current_user.id, habit_id, habit_data), "El habito no existe")
+
+@router.delete("/{habit_id}", response_model=HabitResponse, status_code=status.HTTP_200_OK)
+async def delete_habit(habit_id: int, current_user: UserPrincipal = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    return habit_response(await AsyncHabitService.delete_habit(db, current_user.id, habit_id), "No existe el habito")
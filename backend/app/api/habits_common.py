@@ -0,0 +1,48 @@
+# logica compartida por app/api/habits.py (sync) y app/api/habits_async.py (DATABASE_ASYNC=true)
+# las rutas solo difieren en la sesion y en el servicio (HabitService / AsyncHabitService)
+
+from fastapi import HTTPException, Request, Response, status
+from app.core.etag import etag_matches, make_etag, not_modified, set_etag
+from app.core.responses import row_response, rows_response
+
+
+# GET /habits: la version de la coleccion y la query (pagina y filtros) identifican la respuesta
+def list_etag(request: Request, user_id: int, version) -> str:
+    return make_etag("habits", user_id, version, request.url.query)
+
+def habit_etag(habit_id: int, updated_at) -> str:
+    return make_etag("habit", habit_id, updated_at.isoformat())
+
+# 304 si el cliente ya tiene esta version, None si hay que armar la respuesta
+def cached_response(request: Request, etag: str) -> Response | None:
+    return not_modified(etag) if etag_matches(request, etag) else None
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+def habit_not_found(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def some_habit_not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Algun habito no existe")
+
+
+# filas con las columnas de HabitResponse: se serializan directo con orjson
+def page_response(habits, next_cursor: str | None, etag: str) -> Response:
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    response = rows_response(habits, headers)
+    set_etag(response, etag)
+    return response
+
+def habit_response(habit, not_found_detail: str, etag: str | None = None) -> Response:
+    if not habit:
+        raise habit_not_found(not_found_detail)
+    response = row_response(habit)
+    if etag is not None:
+        set_etag(response, etag)
+    return response
@@ -0,0 +1,27 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+from app.core.replicas import get_read_db
+from app.core.security import get_current_user
+from app.models.habits import HabitCategory
+from app.schemas.auth import UserPrincipal
+from app.schemas.leaderboard import LeaderboardResponse
+from app.services.leaderboard_service import LeaderboardService
+
+router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
+
+@router.get("", response_model=LeaderboardResponse, status_code=status.HTTP_200_OK)
+def get_leaderboard(
+    window: Literal["day", "week", "all"] = "week",
+    category: HabitCategory | None = None,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Clasificacion por puntos de habitos publicos
+
+    - **window**: day (ultimas 24 horas), week (ultimos 7 dias) o all (todo el tiempo)
+    - **category**: opcional, clasificacion de una sola categoria
+    """
+    return LeaderboardService.get_leaderboard(db, current_user.id, window, category, limit)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.schemas.auth import UserPrincipal
+from app.schemas.stats import UserStatsResponse, HabitStatsResponse
+from app.services.stats_service import StatsService
+
+router = APIRouter(tags=["Stats"])
+
+@router.get("/stats/me", response_model=UserStatsResponse, status_code=status.HTTP_200_OK)
+def get_my_stats(current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    return StatsService.get_user_stats(db, current_user.id, current_user.timezone)
+
+@router.get("/habits/{habit_id}/stats", response_model=HabitStatsResponse, status_code=status.HTTP_200_OK)
+def get_habit_stats(habit_id: int, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    stats = StatsService.get_habit_stats(db, current_user.id, habit_id, current_user.timezone)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No existe el habito",
+        )
+    return stats
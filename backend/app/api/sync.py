@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.schemas.auth import UserPrincipal
+from app.schemas.sync import SyncChanges, SyncUpload, SyncUploadResult
+from app.services.sync_service import SyncService
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+@router.get("", response_model=SyncChanges, status_code=status.HTTP_200_OK)
+def get_changes(
+    since: int | None = Query(None),
+    limit: int = Query(settings.SYNC_PAGE_SIZE, ge=1, le=settings.SYNC_PAGE_MAX),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Cambios desde la ultima sincronizacion (clientes offline)
+
+    - **since**: `token` de la respuesta anterior; sin el se devuelven todos los datos (`full`)
+    - Con **has_more** volver a llamar con el `token` nuevo (negativo si sigue un snapshot `full`)
+    """
+    changes = SyncService.get_changes(db, current_user.id, since, limit)
+    # filas con las columnas de los response models: se serializan directo con orjson
+    for key in ("habits", "completions"):
+        changes[key] = [row._asdict() for row in changes[key]]
+    for completion in changes["completions"]:
+        completion.pop("sync_seq")
+    return ORJSONResponse(changes)
+
+@router.post("", response_model=SyncUploadResult, status_code=status.HTTP_200_OK)
+def upload_changes(upload: SyncUpload, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Subir los cambios hechos offline en una sola transaccion
+
+    Despues llamar a GET /sync con el token anterior para recibir el estado resultante.
+    Las completions repetidas de habitos once_per_day se omiten.
+    """
+    return SyncService.apply_upload(db, current_user.id, current_user.timezone, upload)
@@ -0,0 +1,113 @@
+# Reconstruir habit_stats y user_stats desde cero a partir de habit_completions
+# Uso (desde la carpeta backend):  python -m app.commands.rebuild_stats
+#
+# Recorre habit_completions una sola vez ordenado por (user_id, completed_at) en lotes,
+# asi la memoria usada depende de los habitos de un usuario y no del historial completo.
+#
+# Trabaja por lotes de JOB_BATCH_SIZE usuarios, con un commit por lote: pone en cero y bloquea las filas
+# user_stats del lote (StatsService.record_completions tambien empieza por esa fila), lee sus completions y
+# escribe los agregados. Las completions de esos usuarios esperan solo lo que tarda su lote; una confirmada
+# antes del bloqueo entra en la lectura y una que espera suma sus puntos despues, sobre los valores reconstruidos.
+
+from sqlalchemy import delete, insert, literal, select, update
+from app.core.database import SessionLocal
+from app.core.localtime import key_day
+from app.models.habits import HabitCompletion
+from app.models.stats import HabitStats, UserStats
+from app.models.user import User
+from app.services.job_service import id_batches
+from app.services.stats_service import STREAK_FIELDS, _insert, apply_completion, empty_stats
+
+BATCH_SIZE = 5000
+STATS_FIELDS = ("total_points", "total_completions", *STREAK_FIELDS)
+
+
+def _reset_users(db, user_ids: list[int]) -> None:
+    # user_stats en cero (se crean las que faltan), bloqueadas en orden de id hasta el commit;
+    # con esas filas bloqueadas ningun request escribe habit_stats de esos usuarios
+    users = select(User.id, *(literal(0) for _ in range(4)), literal(None)).where(User.id.in_(user_ids)).order_by(User.id)
+    stmt = _insert(db.bind.dialect.name)(UserStats).from_select(["user_id", *STATS_FIELDS], users)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={field: getattr(stmt.excluded, field) for field in STATS_FIELDS},
+    ))
+
+    db.execute(delete(HabitStats).where(HabitStats.user_id.in_(user_ids)).execution_options(synchronize_session=False))
+
+def _flush(db, user_stats, habit_stats) -> None:
+    db.execute(
+        update(UserStats).where(UserStats.user_id == user_stats.user_id).values(**_as_row(user_stats))
+        .execution_options(synchronize_session=False)
+    )
+    if habit_stats:
+        db.execute(insert(HabitStats.__table__), [_as_row(stats, "habit_id", "user_id") for stats in habit_stats.values()])
+
+def _as_row(stats, *keys) -> dict:
+    return {column: getattr(stats, column) for column in (*keys, *STATS_FIELDS)}
+
+
+def rebuild_user_stats(db, user_ids: list[int]) -> int:
+    """
+    Recalcular los agregados de esos usuarios dentro de la transaccion de db, sin commit
+    """
+    _reset_users(db, user_ids)
+    query = (
+        select(
+            HabitCompletion.user_id,
+            HabitCompletion.habit_id,
+            HabitCompletion.local_day,
+            HabitCompletion.points_earned,
+        )
+        .order_by(HabitCompletion.user_id, HabitCompletion.completed_at)
+        .where(HabitCompletion.user_id.in_(user_ids))
+        .execution_options(yield_per=BATCH_SIZE)  # cursor del lado del servidor, no carga todo en memoria
+    )
+
+    users = 0
+    current_user_id = None
+    user_stats = None
+    habit_stats = {}
+    # conexion aparte para leer en streaming mientras la sesion escribe (lee despues del bloqueo)
+    with SessionLocal() as reader:
+        for user_id, habit_id, day, points in reader.execute(query):
+            if user_id != current_user_id:
+                if user_stats is not None:
+                    _flush(db, user_stats, habit_stats)
+                    users += 1
+                current_user_id = user_id
+                user_stats = empty_stats(UserStats, user_id=user_id)
+                habit_stats = {}
+
+            if habit_id not in habit_stats:
+                habit_stats[habit_id] = empty_stats(HabitStats, habit_id=habit_id, user_id=user_id)
+
+            day = key_day(day)
+            apply_completion(habit_stats[habit_id], day, points)
+            apply_completion(user_stats, day, points)
+
+    if user_stats is not None:
+        _flush(db, user_stats, habit_stats)
+        users += 1
+    return users
+
+
+def rebuild_stats() -> int:
+    """
+    Recalcular todos los agregados por lotes de usuarios (un commit por lote), retorna cuantos usuarios se procesaron
+    """
+    db = SessionLocal()
+    try:
+        users = 0
+        for user_ids in id_batches(db, select(User.id), User.id):
+            users += rebuild_user_stats(db, user_ids)
+            db.commit()
+        return users
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print(f"Agregados reconstruidos para {rebuild_stats()} usuarios")
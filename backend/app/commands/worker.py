@@ -0,0 +1,23 @@
+# Worker de trabajos en segundo plano (rachas, agregados, purga)
+# Uso (desde la carpeta backend):  python -m app.commands.worker
+#
+# Se pueden correr varios a la vez (en una o varias maquinas): se reparten la tabla jobs
+# con SKIP LOCKED. Con JOBS_IN_APP=true cada worker de la API corre uno en un hilo.
+
+import logging
+from app.core.database import SessionLocal
+from app.services.job_service import JobWorker
+from app.services.job_tasks import HANDLERS, PERIODIC
+
+
+def build_worker() -> JobWorker:
+    return JobWorker(SessionLocal, HANDLERS, PERIODIC)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    worker = build_worker()
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        worker.stop()
@@ -0,0 +1,48 @@
+# filtro de Bloom: conjunto aproximado en memoria
+# "no esta" es seguro; "puede estar" tiene una tasa de falsos positivos acotada (error_rate)
+# mientras no se pase de capacity: despues la tasa sube y hay que armar uno mas grande (full)
+
+import hashlib
+import math
+
+
+class BloomFilter:
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.count = 0  # valores agregados que encendieron algun bit (los repetidos no cuentan)
+        self.bits_set = 0
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))  # bits
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        # doble hashing (Kirsch-Mitzenmacher): k posiciones a partir de un solo digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, value: str) -> None:
+        new = False
+        for position in self._positions(value):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                self.bits_set += 1
+                new = True
+        if new:
+            self.count += 1
+
+    @property
+    def fill_ratio(self) -> float:
+        # fraccion de bits en 1: ~0.5 al llegar a capacity
+        return self.bits_set / self.size
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
@@ -0,0 +1,58 @@
+# cache en memoria del proceso (por worker de uvicorn), acotado por tamaño y por tiempo
+# LRU: cuando se llena se descarta la entrada usada hace mas tiempo
+# TTL: cada entrada caduca a los `ttl` segundos aunque se siga usando
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (expira_en, valor)
+        self._lock = Lock()  # los endpoints sync corren en un threadpool
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)  # marcar como usada recientemente
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)  # sacar la menos usada
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[1] if item else None
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Eliminar todas las entradas cuya key cumpla el predicado, retorna cuantas se borraron
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
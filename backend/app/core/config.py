@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,11 +6,111 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    DATABASE_ASYNC: bool = False  # True: AsyncEngine + rutas async def (asyncpg) en /auth y /habits; el resto sigue sync
+    DATABASE_ASYNC_URL: Optional[str] = None  # por defecto se deriva de DATABASE_URL
+    DATABASE_REPLICA_URL: Optional[str] = None  # replica de solo lectura para las rutas GET (sin ella todo va a la primaria)
+    DATABASE_ASYNC_REPLICA_URL: Optional[str] = None  # por defecto se deriva de DATABASE_REPLICA_URL
+    REPLICA_STICKY_SECONDS: float = 5  # despues de escribir, las lecturas del usuario van a la primaria (read-your-writes)
+
+    # Pool de conexiones (por worker: el maximo de conexiones es workers * (size + overflow))
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # segundos esperando una conexion libre antes de fallar
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = True  # un round trip extra por checkout; False confia en DB_POOL_RECYCLE
+    DB_POOL_WARMUP: int = 2  # conexiones que se abren al arrancar el worker, antes del primer request
+    DB_QUERY_CACHE_SIZE: int = 500  # cache de SQL compilado de SQLAlchemy
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100  # prepared statements por conexion (asyncpg)
+    DB_PGBOUNCER: bool = False  # PgBouncer en modo transaction: NullPool y sin prepared statements
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 5  # corto: el cliente renueva con POST /auth/refresh
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_SYNC_SECONDS: float = 5  # cada cuanto un worker lee los access tokens revocados por otros
+    REVOCATION_SYNC_OVERLAP_SECONDS: int = 120  # cuanto mas atras relee (revocaciones confirmadas despues de su revoked_at)
+
+    # Hashing de contraseñas (bcrypt) fuera del request
+    HASH_EXECUTOR: str = "process"  # "process": pool de procesos, "inline": en el mismo hilo
+    HASH_WORKERS: int = 0  # 0 = un proceso por core
+    HASH_QUEUE_SIZE: int = 64  # operaciones en cola antes de responder 429
+
+    # Paginacion de GET /habits
+    HABITS_PAGE_SIZE: int = 100  # sin ?limit=
+    HABITS_PAGE_MAX: int = 500
+
+    # GET /sync (cambios incrementales para clientes offline)
+    SYNC_PAGE_SIZE: int = 1000  # completions por respuesta
+    SYNC_PAGE_MAX: int = 5000
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 90  # clientes sin sincronizar por mas tiempo reciben todo de nuevo
+
+    # Completions: desfase aceptado entre el reloj del cliente y el del servidor para completed_at
+    COMPLETION_MAX_FUTURE_SECONDS: int = 300
+
+    # Completions write-behind: se responde 202 sin esperar el commit y se guardan por lotes (un commit por lote)
+    COMPLETION_WRITE_BEHIND: bool = False  # las stats suman las pendientes solo en el worker que las recibio
+    COMPLETION_FLUSH_MS: int = 50  # espera maxima antes de guardar lo pendiente
+    COMPLETION_FLUSH_ROWS: int = 500  # se guarda antes si se juntan estas completions
+    COMPLETION_BUFFER_SIZE: int = 10000  # pendientes por worker; con la cola llena se responde 503
+    COMPLETION_JOURNAL_DIR: str = "journal"  # un archivo por worker, se reenvia al arrancar
+    COMPLETION_JOURNAL_FSYNC: bool = False  # True: sobrevive caidas del host a costa de un fsync por request
+    COMPLETION_FLUSH_RETRIES: int = 5  # lotes fallidos seguidos antes de guardar evento por evento (dead letter)
+
+    # GET /events (SSE): cambios en vivo via LISTEN/NOTIFY de PostgreSQL, una conexion LISTEN por worker
+    EVENTS_ENABLED: bool = True
+    EVENTS_QUEUE_SIZE: int = 100  # eventos en espera por conexion; si se llena el cliente recibe "resync"
+    EVENTS_HEARTBEAT_SECONDS: int = 15  # comentario ": ping" para que proxies no cierren la conexion
+    EVENTS_RECONNECT_SECONDS: int = 5  # espera antes de reabrir la conexion LISTEN
+    EVENTS_RETRY_MS: int = 3000  # "retry:" sugerido al EventSource del cliente
+
+    # Clasificaciones: cada cuanto se reconcilian las listas en memoria con la DB
+    LEADERBOARD_RECONCILE_SECONDS: int = 300
+    LEADERBOARD_USERNAME_CACHE_SIZE: int = 10000  # usernames en memoria para las clasificaciones (LRU)
+
+    # Trabajos en segundo plano (tabla jobs + python -m app.commands.worker)
+    JOBS_IN_APP: bool = False  # True: cada worker de la API corre tambien un hilo de trabajos
+    JOB_POLL_SECONDS: float = 5  # espera entre busquedas cuando la cola esta vacia
+    JOB_CLAIM_SIZE: int = 10  # trabajos que toma un worker por vuelta
+    JOB_BATCH_SIZE: int = 500  # usuarios por trabajo al repartir trabajo por usuario
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_SECONDS: int = 30  # backoff exponencial: base * 2^(intento - 1)
+    JOB_RETRY_MAX_SECONDS: int = 3600
+    JOB_LOCK_TIMEOUT_SECONDS: int = 900  # un trabajo "running" sin empezar/terminar en ese tiempo se considera de un worker caido
+    JOB_RETENTION_DAYS: int = 7  # trabajos terminados que se conservan
+
+    # Arranque: el worker abre conexiones, compila los queries calientes y carga bcrypt antes de quedar listo
+    STARTUP_WARMUP: bool = True
+
+    # Metricas (GET /metrics en formato Prometheus)
+    METRICS_ENABLED: bool = True
+    N_PLUS_ONE_THRESHOLD: int = 5  # mismo query repetido N veces en un request -> warning
+
+    # Limite de requests (token bucket) por usuario del access token o por IP: (rafaga, requests por segundo)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT: tuple[float, float] = (120, 20)  # rutas sin presupuesto propio (un bucket por cliente)
+    RATE_LIMITS: dict[str, tuple[float, float]] = {  # "METODO /path" exacto; en el .env como JSON
+        "POST /auth/login": (5, 0.2),  # bcrypt: 5 intentos y despues 1 cada 5 s por IP
+        "POST /auth/register": (5, 0.1),
+        "POST /auth/refresh": (10, 1),
+    }
+    RATE_LIMIT_IP_ROUTES: tuple[str, ...] = ("POST /auth/login", "POST /auth/register", "POST /auth/refresh")  # por IP aunque traigan token
+    RATE_LIMIT_MAX_KEYS: int = 100000  # clientes por presupuesto en memoria, se descartan los inactivos
+    RATE_LIMIT_REDIS_URL: Optional[str] = None  # buckets compartidos entre workers (requiere el paquete redis)
+    RATE_LIMIT_REDIS_RETRY_SECONDS: float = 5  # con Redis caido se usa el limite local y se reintenta cada tanto
+    RATE_LIMIT_TRUSTED_PROXIES: tuple[str, ...] = ()  # IPs/redes de proxies propios: la IP del cliente sale de X-Forwarded-For
+
+    # check-username / check-email: filtro de Bloom y limite por IP
+    AVAILABILITY_BLOOM_CAPACITY: int = 1000000
+    AVAILABILITY_BLOOM_ERROR_RATE: float = 0.01
+    AVAILABILITY_REFRESH_SECONDS: int = 10  # cada cuanto se agregan al filtro los usuarios registrados en otros workers
+    AVAILABILITY_REFRESH_OVERLAP_IDS: int = 1000  # ids que se vuelven a leer (registros confirmados fuera de orden)
+    AVAILABILITY_RATE_LIMIT: int = 10  # rafaga de consultas por IP
+    AVAILABILITY_RATE_PER_SECOND: float = 3  # consultas por segundo sostenidas por IP
+
+    # Cache de usuarios autenticados (evita consultar la DB en cada request)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
     
     # App
     PROJECT_NAME: str = "Habit Gamification API"
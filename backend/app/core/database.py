@@ -1,25 +1,196 @@
 # documento para la la configuracion de la DB
 # Todo el backend usa esto, nunca te conectas directo a la DB desde los endpoints.
 
-from sqlalchemy import create_engine #conexion global para la DB
+import time
+from threading import Lock
+from sqlalchemy import create_engine, event #conexion global para la DB
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base #clase base para todos los modelos
 from sqlalchemy.orm import sessionmaker #para crear sesiones de BD
 from app.core.config import settings #importar la config.py del .env para DATABASE_URL
+from app.core.cache import TTLCache
+from app.core.metrics import Gauge, Histogram
+
+POOL_CHECKOUT_SECONDS = Histogram("db_pool_checkout_seconds", "Espera para obtener una conexion del pool")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Conexiones del pool en uso")
+
+
+# pools que miden cuanto espera cada request por una conexion libre
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, engine="sync")
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, engine="async")
+
+
+# opciones del engine segun Settings
+def engine_options(url: str, async_mode: bool = False) -> dict:
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Verifica conexiones antes de usarlas
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+        "echo": False,  # CambiaR a True para ver las queries SQL
+    }
+    if settings.DB_PGBOUNCER:
+        # PgBouncer ya hace de pool; una conexion por sesion y se devuelve al terminar
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if async_mode else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,  # Recicla conexiones cada hora
+        )
+    if url.startswith("postgresql+asyncpg"):
+        # en modo transaction de PgBouncer los prepared statements no sobreviven entre transacciones
+        cache_size = 0 if settings.DB_PGBOUNCER else settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+        options["connect_args"] = {
+            "prepared_statement_cache_size": cache_size,
+            "statement_cache_size": cache_size,
+        }
+    return options
+
+def instrument_pool(engine, label: str) -> None:
+    event.listen(engine, "checkout", lambda *args: POOL_CHECKED_OUT.inc(engine=label))
+    event.listen(engine, "checkin", lambda *args: POOL_CHECKED_OUT.dec(engine=label))
+
+# engines perezosos: importar el modulo no carga el driver ni arma el pool, se crean en el
+# lifespan de la app (init_engines) o en la primera sesion de los comandos y benchmarks
+_engines = {}
+_engines_lock = Lock()
+
+def _get_or_create(name: str, build):
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = _engines[name] = build()
+    return engine
+
+# motor async, solo existe si DATABASE_ASYNC=true
+# postgresql://... -> postgresql+asyncpg://...
+def to_async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+def get_async_database_url() -> str:
+    return settings.DATABASE_ASYNC_URL or to_async_url(settings.DATABASE_URL)
+
+def _build_engine(url: str, label: str):
+    engine = create_engine(url, **engine_options(url))
+    instrument_pool(engine, label)
+    return engine
+
+def _build_async_engine(url: str, label: str):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(url, **engine_options(url, async_mode=True))
+    instrument_pool(engine.sync_engine, label)
+    return engine
 
 # crear engine para supabase
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,      # Verifica conexiones antes de usarlas
-    pool_recycle=3600,       # Recicla conexiones cada hora
-    echo=False,              # CambiaR a True para ver las queries SQL    
-)
+def get_engine():
+    return _get_or_create("sync", lambda: _build_engine(settings.DATABASE_URL, "sync"))
+
+def get_async_engine():
+    if not settings.DATABASE_ASYNC:
+        return None
+    return _get_or_create("async", lambda: _build_async_engine(get_async_database_url(), "async"))
+
+# replica de lectura (DATABASE_REPLICA_URL); sin replica las sesiones de lectura son de la primaria
+# las rutas la usan con las dependencias de app.core.replicas
+def get_replica_engine():
+    if not settings.DATABASE_REPLICA_URL:
+        return None
+    return _get_or_create("replica", lambda: _build_engine(settings.DATABASE_REPLICA_URL, "replica"))
+
+def get_async_replica_engine():
+    if not (settings.DATABASE_ASYNC and settings.DATABASE_REPLICA_URL):
+        return None
+    url = settings.DATABASE_ASYNC_REPLICA_URL or to_async_url(settings.DATABASE_REPLICA_URL)
+    return _get_or_create("async_replica", lambda: _build_async_engine(url, "async_replica"))
+
+def init_engines() -> list:
+    """
+    Crear todos los engines configurados (lifespan de la app), retorna los sync y los sync_engine de los async
+    """
+    engines = [get_engine(), get_replica_engine()]
+    for async_engine in (get_async_engine(), get_async_replica_engine()):
+        if async_engine is not None:
+            engines.append(async_engine.sync_engine)
+    return [engine for engine in engines if engine is not None]
+
+async def dispose_engines() -> None:
+    # cierra las conexiones del pool al apagar; los engines siguen usables (abren conexiones nuevas)
+    for engine in list(_engines.values()):
+        if hasattr(engine, "sync_engine"):
+            await engine.dispose()
+        else:
+            engine.dispose()
+
+
+# sessionmaker que arma su engine con la primera sesion
+class LazySessionmaker:
+
+    def __init__(self, get_bind, async_mode: bool = False):
+        self.get_bind = get_bind
+        self.async_mode = async_mode
+        self.factory = None
+
+    def __call__(self, **kwargs):
+        if self.factory is None:
+            if self.async_mode:
+                from sqlalchemy.ext.asyncio import async_sessionmaker
+
+                # expire_on_commit=False: en async no se pueden recargar atributos de forma implicita
+                self.factory = async_sessionmaker(self.get_bind(), autoflush=False, expire_on_commit=False)
+            else:
+                self.factory = sessionmaker(autocommit=False, autoflush=False, bind=self.get_bind())
+        return self.factory(**kwargs)
+
 
 # SessionLocal para crear sesiones de DB
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = LazySessionmaker(get_engine)
+AsyncSessionLocal = LazySessionmaker(get_async_engine, async_mode=True) if settings.DATABASE_ASYNC else None
+ReplicaSessionLocal = LazySessionmaker(get_replica_engine) if settings.DATABASE_REPLICA_URL else SessionLocal
+AsyncReplicaSessionLocal = (
+    LazySessionmaker(get_async_replica_engine, async_mode=True)
+    if settings.DATABASE_ASYNC and settings.DATABASE_REPLICA_URL else AsyncSessionLocal
+)
 
 # clase base para modelos; todos mis modelos heredan de esta Base - class User(Base):
 Base = declarative_base()
 
+# database.engine / async_engine / replica_engine siguen disponibles, se crean al primer acceso
+def __getattr__(name: str):
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "replica_engine":
+        return get_replica_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# usuarios que escribieron hace menos de REPLICA_STICKY_SECONDS en este worker:
+# sus lecturas van a la primaria hasta que la replica los alcance
+recent_writers = TTLCache(maxsize=100000, ttl=settings.REPLICA_STICKY_SECONDS)
+
+def mark_recent_writer(user_id: int) -> None:
+    recent_writers.set(user_id, True)
+
 # Dependency para obtener la sesion de DB en fastAPI
 # “abre una conexión → préstala → ciérrala”
 # Dependency es una funcion o clase llamable que se ejecuta antes de entrar el endpoint - Depends(get_db)
@@ -31,8 +202,7 @@ def get_db():
     finally:
         db.close() # se cierre la sesion siempre
 
-
-
-
-
-
+# version async de get_db, la sesion se cierra al terminar el request
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,102 @@
+# ejecutor dedicado para bcrypt
+# cada hash/verify cuesta ~250 ms de CPU; en un pool de procesos no bloquea el threadpool
+# ni el GIL del worker, y con la cola llena se responde 429 en lugar de acumular latencia
+
+import asyncio
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+from app.core.security import get_password_hash, load_password_backend, verify_password
+
+HASH_QUEUE_DEPTH = Gauge("password_hash_queue_depth", "Operaciones bcrypt en cola o en ejecucion")
+HASH_SECONDS = Histogram("password_hash_seconds", "Latencia de bcrypt incluyendo la espera en cola")
+HASH_REJECTED = Counter("password_hash_rejected_total", "Operaciones bcrypt rechazadas con la cola llena")
+
+_executor = None
+_pending = 0
+_lock = Lock()
+
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = settings.HASH_WORKERS or os.cpu_count() or 1
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+def warm_up_hashing() -> None:
+    """
+    Cargar bcrypt antes del primer login: en este proceso o en cada proceso del pool
+    """
+    if settings.HASH_EXECUTOR == "inline":
+        load_password_backend()
+        return
+    workers = settings.HASH_WORKERS or os.cpu_count() or 1
+    list(get_hash_executor().map(load_password_backend, range(workers)))
+
+def shutdown_hash_executor() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _reserve_slot() -> None:
+    global _pending
+    with _lock:
+        if _pending >= settings.HASH_QUEUE_SIZE:
+            HASH_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Servidor ocupado, intenta nuevamente",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+        HASH_QUEUE_DEPTH.set(_pending)
+
+def _release_slot(started: float, operation: str) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+        HASH_QUEUE_DEPTH.set(_pending)
+    HASH_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
+def _submit(operation: str, fn, *args) -> Future:
+    _reserve_slot()
+    started = time.perf_counter()
+    try:
+        future = get_hash_executor().submit(fn, *args)
+    except Exception:
+        _release_slot(started, operation)
+        raise
+    future.add_done_callback(lambda _: _release_slot(started, operation))
+    return future
+
+
+def _run_inline(operation: str, fn, *args):
+    _reserve_slot()
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        _release_slot(started, operation)
+
+
+# el event loop queda libre mientras el pool calcula; las rutas sync de auth tambien las esperan con await
+# (un .result() bloqueante ocuparia un hilo del threadpool de FastAPI por cada hash)
+async def hash_password_async(password: str) -> str:
+    if settings.HASH_EXECUTOR == "inline":
+        return await run_in_threadpool(_run_inline, "hash", get_password_hash, password)
+    return await asyncio.wrap_future(_submit("hash", get_password_hash, password))
+
+async def check_password_async(plain_password: str, hashed_password: str) -> bool:
+    if settings.HASH_EXECUTOR == "inline":
+        return await run_in_threadpool(_run_inline, "verify", verify_password, plain_password, hashed_password)
+    return await asyncio.wrap_future(_submit("verify", verify_password, plain_password, hashed_password))
@@ -0,0 +1,95 @@
+# instrumentacion por request: latencia por ruta, cantidad de queries y tiempo en la DB
+# los datos quedan en app.core.metrics y se exportan en GET /metrics
+
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Latencia de requests HTTP por ruta")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "Queries SQL ejecutados por request",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_SECONDS_PER_REQUEST = Histogram("db_seconds_per_request", "Tiempo total en la DB por request")
+DB_N_PLUS_ONE = Counter("db_n_plus_one_total", "Requests que repiten el mismo query muchas veces (posible N+1)")
+
+
+class RequestStats:
+    # se comparte por referencia con el threadpool (los contextvars se copian, el objeto no)
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = StatementCounter()
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+        stats.statements[statement] += 1
+
+def instrument_engine(engine) -> None:
+    """
+    Contar queries y tiempo de DB del request actual (para AsyncEngine pasar engine.sync_engine)
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return  # lifespan repetido (tests): no contar dos veces
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    # middleware ASGI puro: no envuelve el body, sirve tambien para respuestas en streaming
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            # plantilla de la ruta (/habits/{habit_id}), no el path real, para no explotar las etiquetas
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=route, status=status_code,
+            )
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route=route)
+            DB_SECONDS_PER_REQUEST.observe(stats.db_seconds, route=route)
+
+            if stats.statements:
+                statement, repeats = stats.statements.most_common(1)[0]
+                if repeats >= settings.N_PLUS_ONE_THRESHOLD:
+                    DB_N_PLUS_ONE.inc(route=route)
+                    logger.warning("Posible N+1 en %s %s: %d veces %s", scope["method"], route, repeats, statement[:200])
@@ -0,0 +1,38 @@
+# dias locales del usuario: las completions guardan el dia en su zona horaria como entero YYYYMMDD
+# (local_day), asi "hoy", rachas y unicidad por dia son comparaciones de enteros sobre un indice
+
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "UTC"
+MAX_UTC_OFFSET = timedelta(hours=14)  # la zona mas adelantada (Pacific/Kiritimati)
+
+
+@lru_cache(maxsize=1024)
+def get_zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        get_zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+# completed_at es UTC sin zona horaria (datetime.utcnow)
+def local_day(completed_at: datetime, tz: str) -> date:
+    return completed_at.replace(tzinfo=timezone.utc).astimezone(get_zone(tz)).date()
+
+def local_today(tz: str) -> date:
+    return datetime.now(get_zone(tz)).date()
+
+# el dia local mas adelantado que existe ahora en alguna zona
+def latest_today() -> date:
+    return (datetime.utcnow() + MAX_UTC_OFFSET).date()
+
+def day_key(day: date) -> int:
+    return day.year * 10000 + day.month * 100 + day.day
+
+def key_day(key: int) -> date:
+    return date(key // 10000, key // 100 % 100, key % 100)
@@ -0,0 +1,101 @@
+# metricas en memoria del proceso (por worker de uvicorn)
+# cada metrica se registra en REGISTRY y se puede exportar en formato de texto de Prometheus
+
+from threading import Lock
+from typing import Optional
+
+REGISTRY: list = []
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key: tuple, extra: Optional[dict] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: dict = {}
+        self._lock = Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list:
+        return [(self.name + _format_labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._values: dict = {}  # labels -> [conteo por bucket..., suma, total]
+        self._lock = Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            data = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def count(self, **labels) -> int:
+        data = self._values.get(_label_key(labels))
+        return data[-1] if data else 0
+
+    def samples(self) -> list:
+        result = []
+        for key, data in self._values.items():
+            for bound, count in zip(self.buckets, data):
+                result.append((self.name + "_bucket" + _format_labels(key, {"le": bound}), count))
+            result.append((self.name + "_bucket" + _format_labels(key, {"le": "+Inf"}), data[-1]))
+            result.append((self.name + "_sum" + _format_labels(key), data[-2]))
+            result.append((self.name + "_count" + _format_labels(key), data[-1]))
+        return result
+
+
+def render_prometheus() -> str:
+    """
+    Exportar todas las metricas registradas en formato de texto de Prometheus
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for sample, value in metric.samples():
+            lines.append(f"{sample} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,22 @@
+# cursores opacos para paginacion keyset: base64 de la ultima (created_at, id) entregada
+# el cliente solo lo devuelve tal cual en ?cursor=
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Lanza ValueError si el cursor no es valido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(id)
+    except (TypeError, ValueError, json.JSONDecodeError) as exc:
+        raise ValueError("Cursor inválido") from exc
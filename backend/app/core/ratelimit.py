@@ -0,0 +1,245 @@
+# limite de requests por cliente con token bucket en memoria (por worker)
+#
+# RateLimitMiddleware aplica un presupuesto por ruta (RATE_LIMITS, "METODO /path" exacto) o RATE_LIMIT_DEFAULT
+# a cada cliente: el usuario del access token o la IP si no hay token valido (siempre la IP en RATE_LIMIT_IP_ROUTES).
+# El chequeo es O(1) y no usa la DB.
+# Con RATE_LIMIT_REDIS_URL los buckets estan en Redis y el limite vale para todos los workers;
+# si Redis no responde se usa el bucket local del worker y se reintenta cada RATE_LIMIT_REDIS_RETRY_SECONDS.
+# La IP es la del socket; detras de un proxy de RATE_LIMIT_TRUSTED_PROXIES se toma de X-Forwarded-For.
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
+from threading import Lock
+import orjson
+from fastapi import HTTPException, Request, status
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter("rate_limited_total", "Requests rechazados con 429 por ruta")
+
+
+class TokenBucketLimiter:
+    # capacity: rafaga maxima; rate: tokens que se recuperan por segundo
+    # max_keys acota la memoria, se descartan los clientes inactivos mas antiguos
+
+    def __init__(self, capacity: float, rate: float, max_keys: int = 100000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()  # key -> (tokens, ultimo acceso)
+        self._lock = Lock()
+
+    def acquire(self, key, cost: float = 1) -> float:
+        """
+        Consumir cost tokens, retorna 0 si se permite o los segundos hasta que alcancen
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def allow(self, key, cost: float = 1) -> bool:
+        return self.acquire(key, cost) == 0
+
+
+# mismo algoritmo en Redis, atomico; la hora es la del servidor de Redis (igual para todos los workers)
+REDIS_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local last = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+class RedisBuckets:
+    # buckets compartidos entre workers (redis es opcional: solo se importa con RATE_LIMIT_REDIS_URL)
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self.script = self.client.register_script(REDIS_BUCKET_SCRIPT)
+
+    async def acquire(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        return float(await self.script(keys=[key], args=[capacity, rate, cost]))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class RateLimiter:
+    # un TokenBucketLimiter por presupuesto; la ruta elige el presupuesto y el cliente el bucket
+
+    def __init__(self):
+        self.default = TokenBucketLimiter(*settings.RATE_LIMIT_DEFAULT, max_keys=settings.RATE_LIMIT_MAX_KEYS)
+        self.routes = {
+            route: TokenBucketLimiter(capacity, rate, max_keys=settings.RATE_LIMIT_MAX_KEYS)
+            for route, (capacity, rate) in settings.RATE_LIMITS.items()
+        }
+        self.ip_routes = frozenset(settings.RATE_LIMIT_IP_ROUTES)
+        self.shared = None
+        self.shared_retry_at = None  # Redis caido: no se vuelve a intentar antes de este momento
+
+    def start(self) -> None:
+        if settings.RATE_LIMIT_REDIS_URL:
+            self.shared = RedisBuckets(settings.RATE_LIMIT_REDIS_URL)
+
+    async def stop(self) -> None:
+        if self.shared is not None:
+            await self.shared.close()
+            self.shared = None
+
+    async def acquire(self, route: str, client: str) -> float:
+        limiter = self.routes.get(route)
+        if limiter is None:
+            route, limiter = "default", self.default
+        if self.shared is not None and (self.shared_retry_at is None or time.monotonic() >= self.shared_retry_at):
+            try:
+                wait = await self.shared.acquire(f"ratelimit:{route}:{client}", limiter.capacity, limiter.rate)
+            except Exception:
+                # un solo aviso por caida, no uno por request
+                if self.shared_retry_at is None:
+                    logger.warning("Redis no disponible para el rate limit, se usa el limite local", exc_info=True)
+                self.shared_retry_at = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+            else:
+                if self.shared_retry_at is not None:
+                    logger.info("Redis disponible de nuevo para el rate limit")
+                    self.shared_retry_at = None
+                return wait
+        return limiter.acquire(client)
+
+
+@lru_cache(maxsize=None)
+def _networks(proxies: tuple) -> tuple:
+    return tuple(ip_network(proxy, strict=False) for proxy in proxies)
+
+def _trusted_proxy(host: str) -> bool:
+    networks = _networks(tuple(settings.RATE_LIMIT_TRUSTED_PROXIES))
+    if not networks:
+        return False
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+def client_address(scope) -> str:
+    """
+    IP del cliente: la del socket o, si es un proxy de RATE_LIMIT_TRUSTED_PROXIES, la de X-Forwarded-For
+    """
+    client = scope.get("client")
+    host = client[0] if client else "unknown"
+    if not _trusted_proxy(host):
+        return host
+    forwarded = b",".join(value for name, value in scope["headers"] if name == b"x-forwarded-for")
+    # de derecha a izquierda: la primera que no es un proxy propio (lo anterior lo puede escribir el cliente)
+    for hop in reversed(forwarded.decode("latin-1").split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        host = hop
+        if not _trusted_proxy(hop):
+            break
+    return host
+
+def client_ip(request: Request) -> str:
+    return client_address(request.scope)
+
+# sub del access token valido (sin consultar la DB)
+def _token_subject(scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            payload = decode_access_token(token) if scheme.lower() == "bearer" else None
+            return payload.get("sub") if payload is not None else None
+    return None
+
+# usuario del access token o IP del cliente (by_ip: siempre la IP)
+def client_key(scope, by_ip: bool = False) -> str:
+    subject = None if by_ip else _token_subject(scope)
+    if subject:
+        return f"user:{subject}"
+    return f"ip:{client_address(scope)}"
+
+
+class RateLimitMiddleware:
+    # middleware ASGI puro: responde 429 antes de llegar a la ruta (y a bcrypt en /auth/login)
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route = f"{scope['method']} {scope['path']}"
+        # login/registro siempre por IP: un token de otra cuenta no abre un bucket nuevo
+        wait = await self.limiter.acquire(route, client_key(scope, by_ip=route in self.limiter.ip_routes))
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMITED.inc(route=route if route in self.limiter.routes else "default")
+        body = orjson.dumps({"detail": "Demasiadas solicitudes, intenta nuevamente"})
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_429_TOO_MANY_REQUESTS,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limit(capacity: float, rate: float):
+    """
+    Dependency de FastAPI: 429 si el cliente (IP) supera el limite en esta ruta
+    """
+    limiter = TokenBucketLimiter(capacity, rate)
+
+    def dependency(request: Request) -> None:
+        wait = limiter.acquire(client_ip(request))
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas solicitudes, intenta nuevamente",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    return dependency
@@ -0,0 +1,37 @@
+# dependencias de sesion para rutas de solo lectura: van a la replica (DATABASE_REPLICA_URL)
+# salvo que el usuario haya escrito hace poco en este worker (read-your-writes con la primaria)
+
+from fastapi import Depends
+from app.core import database
+from app.core.security import get_current_user, get_current_user_async
+from app.schemas.auth import UserPrincipal
+
+
+def _read_session_factory(user_id: int | None, primary, replica):
+    if user_id is not None and database.recent_writers.get(user_id):
+        return primary
+    return replica
+
+# lecturas anonimas (check-username/email): siempre la replica
+def get_replica_db():
+    db = database.ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# lecturas del usuario autenticado
+def get_read_db(current_user: UserPrincipal = Depends(get_current_user)):
+    db = _read_session_factory(current_user.id, database.SessionLocal, database.ReplicaSessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_replica_db():
+    async with database.AsyncReplicaSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(current_user: UserPrincipal = Depends(get_current_user_async)):
+    async with _read_session_factory(current_user.id, database.AsyncSessionLocal, database.AsyncReplicaSessionLocal)() as db:
+        yield db
@@ -0,0 +1,12 @@
+# respuestas JSON rapidas con orjson
+# las rutas que ya tienen filas (Row) con exactamente las columnas del response_model las
+# serializan directo, sin validar de nuevo cada objeto con pydantic ni pasar por jsonable_encoder
+
+from fastapi.responses import ORJSONResponse
+
+
+def rows_response(rows, headers: dict | None = None) -> ORJSONResponse:
+    return ORJSONResponse([row._asdict() for row in rows], headers=headers)
+
+def row_response(row, headers: dict | None = None) -> ORJSONResponse:
+    return ORJSONResponse(row._asdict(), headers=headers)
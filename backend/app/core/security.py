@@ -1,24 +1,41 @@
+import time
+from functools import lru_cache
 from datetime import datetime, timedelta  # manejo de fechas
 from typing import Optional  # tipado opcional en funciones
+from uuid import uuid4  # id unico (jti) por token
 from jose import JWTError, jwt  # libreria para JWT
-from passlib.context import CryptContext  # Para manejar hashing de contraseñas
 from app.core.config import settings  # configuraciones de app
-from app.core.database import get_db
+from app.core.cache import TTLCache
+from app.core.database import get_db, get_async_db, mark_recent_writer
+from app.models.refresh_token import RefreshToken
 from app.models.user import User
-from fastapi import Depends, HTTPException, status
+from app.schemas.auth import UserPrincipal
+from app.services.event_service import event_hub, queue_event
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 
-# crear contexto para hashing usando bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# contexto para hashing usando bcrypt; passlib se importa con el primer hash (o en el warm-up),
+# no al importar el modulo (tambien lo importan los procesos del pool de hashing)
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # funcion para comparar contraseña string con hashing
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 # convertir contraseñas en hashing
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# cargar el backend de bcrypt antes del primer login (la primera llamada cuesta mas que un hash)
+def load_password_backend(_=None) -> None:
+    get_pwd_context().handler("bcrypt").get_backend()
 
 # generador de JWT para autenticacion
 def  create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -28,6 +45,7 @@ def  create_access_token(data: dict, expires_delta: Optional[timedelta] = None)
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid4().hex)  # identifica el token para el cache de usuarios
     encoded_jwt = jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -35,39 +53,155 @@ def  create_access_token(data: dict, expires_delta: Optional[timedelta] = None)
     )
     return encoded_jwt
 
+# jti de access tokens revocados (logout o refresh token reutilizado) hasta que expirarian solos
+# se consulta en memoria en cada request; los workers se ponen al dia con sync_revocations
+revoked_access_tokens = TTLCache(maxsize=100000, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+def revoke_access_tokens(jtis) -> None:
+    for jti in jtis:
+        revoked_access_tokens.set(jti, True)
+
 # Validar y decodificar token JWT
 def decode_access_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
-            algorithm=[settings.ALGORITHM]
+            algorithms=[settings.ALGORITHM]
         )
-        return payload
     except JWTError:
         return None
+    if revoked_access_tokens.get(payload.get("jti")):
+        return None
+    return payload
+
+# claims que identifican al usuario dentro del token
+def user_token_claims(user: User) -> dict:
+    return {
+        "sub": str(user.id),
+        "email": user.email,
+        "username": user.username,
+    }
+
+
+# cache de usuarios autenticados: (user_id, jti) -> UserPrincipal, por worker
+# con un hit el request no consulta la tabla users
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+def invalidate_principal(user_id: int) -> None:
+    principal_cache.pop_where(lambda key: key[0] == user_id)
+
+# si el usuario cambia o se elimina, sus tokens cacheados se vuelven a validar contra la DB:
+# en este worker enseguida y en los demas con el NOTIFY del commit (mismo camino que GET /events)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_principal(mapper, connection, target: User) -> None:
+    invalidate_principal(target.id)
+    session = object_session(target)
+    if session is not None:
+        queue_event(session, target.id, "user.changed", None)
+
+event_hub.on("user.changed", lambda item: invalidate_principal(item["user_id"]))
+
+
+# revocaciones hechas por otros workers: una query cada REVOCATION_SYNC_SECONDS, no una por request
+class _RevocationSync:
+
+    def __init__(self):
+        self.checked_at = 0.0
+        # al arrancar se cargan las de tokens que todavia podrian estar vigentes
+        self.since = datetime.utcnow() - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    def due(self) -> bool:
+        return time.monotonic() - self.checked_at >= settings.REVOCATION_SYNC_SECONDS
+
+    def query(self):
+        self.checked_at = time.monotonic()
+        started = datetime.utcnow()
+        query = select(RefreshToken.access_jti).where(RefreshToken.revoked_at >= self.since)
+        # revoked_at se fija antes del commit: se vuelven a leer los ultimos REVOCATION_SYNC_OVERLAP_SECONDS
+        # para ver revocaciones que confirmaron tarde (releerlas no cambia nada)
+        self.since = started - timedelta(seconds=settings.REVOCATION_SYNC_OVERLAP_SECONDS)
+        return query
+
+_revocation_sync = _RevocationSync()
+
+def sync_revocations(db: Session) -> None:
+    if _revocation_sync.due():
+        revoke_access_tokens(db.scalars(_revocation_sync.query()))
+
+async def sync_revocations_async(db: AsyncSession) -> None:
+    if _revocation_sync.due():
+        revoke_access_tokens(await db.scalars(_revocation_sync.query()))
 
 
 # extraer el usuario del jwt
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido o expirado",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+# valida el token y retorna (user_id, key del cache)
+def _principal_cache_key(token: str) -> tuple:
     payload = decode_access_token(token)
     if payload is None:
-        raise credentials_exception
-    
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
+        raise _credentials_exception()
+
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        raise _credentials_exception()
+
+    return user_id, (user_id, payload.get("jti"))
+
+# solo las columnas necesarias, sin hidratar el modelo completo
+def _principal_query(user_id: int):
+    return select(User.id, User.email, User.username, User.timezone).where(User.id == user_id)
+
+# un request que escribe deja al usuario leyendo de la primaria unos segundos (app.core.replicas)
+def _track_writer(request: Request, user_id: int) -> None:
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        mark_recent_writer(user_id)
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserPrincipal:
+    sync_revocations(db)
+    user_id, cache_key = _principal_cache_key(token)
+    _track_writer(request, user_id)
+
+    # fast path: token ya verificado en este worker
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
+    user = db.execute(_principal_query(user_id)).first()
+    if user is None:
+        raise _credentials_exception()
+
+    principal = UserPrincipal.model_validate(user)
+    principal_cache.set(cache_key, principal)
+    return principal
+
+# version para las rutas async (DATABASE_ASYNC=true), comparte el mismo cache
+async def get_current_user_async(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> UserPrincipal:
+    await sync_revocations_async(db)
+    user_id, cache_key = _principal_cache_key(token)
+    _track_writer(request, user_id)
+
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
+    user = (await db.execute(_principal_query(user_id))).first()
     if user is None:
-        raise credentials_exception
-    
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+
+    principal = UserPrincipal.model_validate(user)
+    principal_cache.set(cache_key, principal)
+    return principal
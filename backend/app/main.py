@@ -1,16 +1,87 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
-from app.api import auth, habits
+from app.core import database
+from app.core.hashing import shutdown_hash_executor
+from app.core.instrumentation import MetricsMiddleware, instrument_engine
+from app.core.metrics import render_prometheus
+from app.core.ratelimit import RateLimitMiddleware, rate_limiter
+from app.services.availability_service import warm_availability_index
+from app.services.completion_buffer import completion_buffer
+from app.services.completion_service import CompletionService
+from app.services.event_service import NotifyListener, event_hub
+from app.services.warmup import warm_up
+
+# DATABASE_ASYNC=true monta las rutas async def sobre AsyncSession (solo auth y habits;
+# completions, stats, leaderboard y sync siguen en el threadpool con el engine sync)
+if settings.DATABASE_ASYNC:
+    from app.api import auth_async as auth, habits_async as habits
+else:
+    from app.api import auth, habits
+from app.api import completions, stats, leaderboard, sync, events
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # importar app.main no crea engines ni hilos: todo se arma aca, antes de que el worker quede listo
+    engines = database.init_engines()
+    if settings.METRICS_ENABLED:
+        for engine in engines:
+            instrument_engine(engine)
+    await run_in_threadpool(warm_availability_index, database.SessionLocal)
+    if settings.STARTUP_WARMUP:
+        await warm_up()
+    if settings.COMPLETION_WRITE_BEHIND:
+        # reenvia los journals de procesos anteriores antes de aceptar completions nuevas
+        completion_buffer.start(database.SessionLocal, CompletionService.write_buffered, CompletionService.record_buffered_leaderboard)
+
+    if settings.RATE_LIMIT_ENABLED:
+        rate_limiter.start()
+
+    # GET /events: una conexion LISTEN por worker (sin PostgreSQL los eventos se entregan en este proceso)
+    event_hub.start(asyncio.get_running_loop())
+    event_listener = None
+    if settings.EVENTS_ENABLED and database.get_engine().dialect.name == "postgresql":
+        event_listener = NotifyListener(database.get_engine(), event_hub)
+        event_listener.start()
+
+    # trabajos en segundo plano dentro del proceso de la API (sin worker aparte)
+    job_worker = None
+    if settings.JOBS_IN_APP:
+        from app.commands.worker import build_worker
+
+        job_worker = build_worker()
+        job_worker.start_thread()
+
+    yield
+
+    if job_worker is not None:
+        job_worker.stop()
+    completion_buffer.stop()
+    if event_listener is not None:
+        event_listener.stop()
+    await rate_limiter.stop()
+    shutdown_hash_executor()
+    await database.dispose_engines()
 
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     description="API de hábitos productivos gamificado",
     version=settings.VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,  # orjson en lugar de json de la libreria estandar
 )
 
+# Limite de requests por usuario/IP, antes de tocar la DB o bcrypt
+# (agregado antes que CORS para que los 429 lleven los headers de CORS)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,11 +92,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # cursor de paginacion y GET condicionales de /habits
 )
 
+# Metricas por request (latencia por ruta, queries y tiempo de DB; los engines se instrumentan en lifespan)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Incluir routers
 app.include_router(auth.router)
 app.include_router(habits.router)
+app.include_router(completions.router)
+app.include_router(stats.router)
+app.include_router(leaderboard.router)
+app.include_router(sync.router)
+if settings.EVENTS_ENABLED:
+    app.include_router(events.router)
 
 @app.get("/")
 def root():
@@ -33,4 +115,9 @@ def root():
         "message": "Habit Gamification API",
         "version": settings.VERSION,
         "docs": "/docs"
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # formato de texto de Prometheus, metricas de este worker
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
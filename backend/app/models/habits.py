@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Text, Enum, Index, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -23,22 +23,84 @@ class Habit(Base):
     category = Column(Enum(HabitCategory), nullable=False)
     is_public = Column(Boolean, default=False)
     track_time = Column(Boolean, default=False)
+    once_per_day = Column(Boolean, nullable=False, default=False, server_default=false())  # una completion por dia local
+    sync_seq = Column(BigInteger, nullable=False, default=0, server_default="0")  # HabitVersion.sync_seq de la ultima escritura
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    completions = relationship("HabitCompletion", back_populates="habit")
+    # las completions se borran en la DB (ON DELETE CASCADE), el ORM no las carga para eliminarlas
+    completions = relationship("HabitCompletion", back_populates="habit", cascade="all, delete-orphan", passive_deletes=True)
     user = relationship("User", back_populates="habits")
 
+    __table_args__ = (
+        # HabitService filtra siempre por user_id; (created_at, id) es el orden de la paginacion keyset
+        Index("ix_habits_user_created", "user_id", "created_at", "id"),
+        Index("ix_habits_user_sync_seq", "user_id", "sync_seq"),  # GET /sync
+    )
+
+# solo habitos publicos (clasificaciones por categoria), indice parcial mucho mas chico
+Index(
+    "ix_habits_public_category",
+    Habit.category,
+    Habit.user_id,
+    postgresql_where=Habit.is_public.is_(True),
+)
+
 
 class HabitCompletion(Base):
     __tablename__ = "habit_completions"
 
     id = Column(Integer, primary_key=True, index=True)
-    habit_id = Column(Integer, ForeignKey("habits.id"), nullable=False)
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     completed_at = Column(DateTime, default=datetime.utcnow)
     time_spent = Column(Integer, nullable=True)  # minutes, solo si track_time=True
     points_earned = Column(Integer, default=1, nullable=False)
+    local_day = Column(Integer, nullable=False)  # dia de completed_at en la zona del usuario, YYYYMMDD (app.core.localtime)
+    once_per_day = Column(Boolean, nullable=False, default=False, server_default=false())  # copia de Habit.once_per_day
+    sync_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+    event_id = Column(String(32), nullable=True, unique=True)  # completions del buffer write-behind: reenviar el journal no duplica
 
     # Relaciones
-    habit = relationship("Habit", back_populates="completions")
\ No newline at end of file
+    habit = relationship("Habit", back_populates="completions")
+
+    __table_args__ = (
+        Index("ix_habit_completions_habit_completed", "habit_id", "completed_at"),  # historial de un habito
+        Index("ix_habit_completions_user_completed", "user_id", "completed_at"),  # historial / agregados del usuario
+        Index("ix_habit_completions_completed_at", "completed_at"),  # reconciliacion de clasificaciones (semana actual)
+        Index("ix_habit_completions_habit_local_day", "habit_id", "local_day"),  # "hecho hoy" = busqueda puntual
+        Index("ix_habit_completions_user_sync_seq", "user_id", "sync_seq"),  # GET /sync
+        # habitos de una vez por dia: la DB rechaza la segunda completion del mismo dia local
+        Index(
+            "uq_habit_completions_once_per_day", "habit_id", "local_day", unique=True,
+            postgresql_where=once_per_day.is_(True), sqlite_where=once_per_day.is_(True),
+        ),
+    )
+
+
+# version de la coleccion de habitos de cada usuario, sube con cada escritura de habitos
+# ETag de GET /habits: responder 304 cuesta una lectura por primary key
+class HabitVersion(Base):
+    __tablename__ = "habit_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+    # token de GET /sync: sube con cada escritura de habitos o completions y se guarda en las filas escritas.
+    # el upsert bloquea esta fila hasta el commit, asi el orden de sync_seq es el orden de commit
+    # (updated_at no sirve: una transaccion con timestamp menor puede confirmarse despues)
+    sync_seq = Column(BigInteger, default=0, nullable=False, server_default="0")
+    sync_floor = Column(BigInteger, default=0, nullable=False, server_default="0")  # tokens menores ya no tienen sus tombstones
+
+
+# habitos borrados, para que GET /sync informe los borrados (se purgan despues de SYNC_TOMBSTONE_RETENTION_DAYS)
+class HabitTombstone(Base):
+    __tablename__ = "habit_tombstones"
+
+    habit_id = Column(Integer, primary_key=True)  # sin FK: el habito ya no existe
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    sync_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_habit_tombstones_user_sync_seq", "user_id", "sync_seq"),
+    )
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, JSON, Index
+from datetime import datetime
+from app.core.database import Base
+import enum
+
+# cola de trabajos en segundo plano, durable en PostgreSQL (ver JobService y app.commands.worker)
+
+class JobStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"  # agoto los reintentos
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)  # nombre del handler en app.services.job_tasks
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.pending)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # no se ejecuta antes (reintentos con backoff)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    last_error = Column(Text, nullable=True)
+    locked_by = Column(String(100), nullable=True)  # worker que lo tomo
+    locked_at = Column(DateTime, nullable=True)
+    dedupe_key = Column(String(100), nullable=True, unique=True)  # trabajos periodicos: uno por periodo aunque haya varios workers
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # los workers buscan pendientes por run_at; el indice solo guarda las filas pendientes
+        Index("ix_jobs_pending_run_at", "run_at", postgresql_where=(status == JobStatus.pending)),
+        Index("ix_jobs_status_updated", "status", "updated_at"),  # purga de terminados y rescate de colgados
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary, Index
+from datetime import datetime
+from app.core.database import Base
+
+# refresh tokens con rotacion: cada uso crea uno nuevo de la misma familia (login original)
+# y reutilizar uno ya usado revoca toda la familia (ver TokenService)
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    token_hash = Column(LargeBinary(32), nullable=False, unique=True)  # sha256 del token, nunca el token
+    family_id = Column(String(32), nullable=False)
+    access_jti = Column(String(32), nullable=False)  # access token emitido junto a este refresh token
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)  # rotado: ya no se acepta
+    revoked_at = Column(DateTime, nullable=True)  # logout o reutilizacion detectada
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_family_id", "family_id"),
+        Index("ix_refresh_tokens_revoked_at", "revoked_at"),  # los workers leen las revocaciones recientes
+        Index("ix_refresh_tokens_expires_at", "expires_at"),  # purga
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from app.core.database import Base
+
+# agregados materializados de gamificacion, se actualizan de forma incremental
+# en cada HabitCompletion (ver StatsService) y se reconstruyen con app.commands.rebuild_stats
+
+class HabitStats(Base):
+    __tablename__ = "habit_stats"
+
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    total_points = Column(Integer, default=0, nullable=False)
+    total_completions = Column(Integer, default=0, nullable=False)
+    current_streak = Column(Integer, default=0, nullable=False)  # dias consecutivos hasta last_completion_day
+    longest_streak = Column(Integer, default=0, nullable=False)
+    last_completion_day = Column(Date, nullable=True)
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_points = Column(Integer, default=0, nullable=False)
+    total_completions = Column(Integer, default=0, nullable=False)
+    current_streak = Column(Integer, default=0, nullable=False)  # dias consecutivos con al menos una completion
+    longest_streak = Column(Integer, default=0, nullable=False)
+    last_completion_day = Column(Date, nullable=True)
@@ -1,13 +1,29 @@
-from pydantic import BaseModel, EmailStr, Field, field_serializer
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_serializer, field_validator
+from app.core.localtime import DEFAULT_TIMEZONE, is_valid_timezone
 from datetime import datetime
 from typing import Optional
 # BaseModel es la clase que se encarga de hacer las validacion de tipos y Serializacion a JSON/dict
 
+# zona horaria IANA (America/Bogota, Europe/Madrid...): define el "dia" de rachas y habitos diarios
+def _check_timezone(value: str) -> str:
+    if not is_valid_timezone(value):
+        raise ValueError("Zona horaria desconocida")
+    return value
+
 # Schema para register
 class UserRegister(BaseModel):
     email: EmailStr
     username: str = Field(..., min_length=3, max_length=50)
     password: str = Field(..., min_length=8, max_length=50)
+    timezone: str = DEFAULT_TIMEZONE
+
+    _validate_timezone = field_validator('timezone')(_check_timezone)
+
+# Schema para actualizar el usuario actual
+class UserUpdate(BaseModel):
+    timezone: str
+
+    _validate_timezone = field_validator('timezone')(_check_timezone)
 
 # Schema para login
 class UserLogin(BaseModel):
@@ -19,6 +35,7 @@ class UserResponse(BaseModel):
     id: int
     email: str
     username: str
+    timezone: str
     created_at: datetime
 
     @field_serializer('id')
@@ -28,12 +45,30 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True   # Para SQLAlchemy 2.0
 
-# Schema de respuesta de registro
-class AuthResponse(BaseModel):
+# Schema de tokens: access token corto + refresh token de un solo uso
+class TokenResponse(BaseModel):
     token: str
+    refresh_token: str
     token_type: str
+
+# Schema de respuesta de registro
+class AuthResponse(TokenResponse):
     user: UserResponse
 
+# Schema para refresh y logout
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(..., min_length=1, max_length=200)
+
+# usuario autenticado: fila de users leida en el primer request de cada token y cacheada por worker
+# (app.core.security.principal_cache)
+class UserPrincipal(BaseModel):
+    id: int
+    email: str
+    username: str
+    timezone: str = DEFAULT_TIMEZONE
+
+    model_config = ConfigDict(from_attributes=True)
+
 class TokenData(BaseModel):   # schema de cuerpo dentro del Token schema
     email: Optional[str] = None
 
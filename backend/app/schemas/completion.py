@@ -0,0 +1,44 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from datetime import date, datetime, timedelta, timezone
+from app.core.config import settings
+
+# completed_at en el futuro (mas alla del desfase de reloj del cliente) adelantaria rachas y "hecho hoy"
+def _check_not_future(value: datetime | None) -> datetime | None:
+    if value is None:
+        return value
+    utc = value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    if utc > datetime.utcnow() + timedelta(seconds=settings.COMPLETION_MAX_FUTURE_SECONDS):
+        raise ValueError("completed_at no puede estar en el futuro")
+    return value
+
+
+class CompletionCreate(BaseModel):
+    completed_at: datetime | None = None  # por defecto ahora (UTC); los clientes offline envian la fecha real
+    time_spent: int | None = Field(None, ge=0)  # minutos, solo si el habito tiene track_time
+
+    _validate_completed_at = field_validator('completed_at')(_check_not_future)
+
+class CompletionBatchItem(CompletionCreate):
+    habit_id: int
+
+# sincronizacion de clientes offline: muchas completions en un solo request
+class CompletionBatch(BaseModel):
+    completions: list[CompletionBatchItem] = Field(..., min_length=1, max_length=500)
+
+class CompletionResponse(BaseModel):
+    id: int | None = None  # None: aceptada por el buffer write-behind, todavia sin guardar
+    habit_id: int
+    user_id: int
+    completed_at: datetime
+    time_spent: int | None = None
+    points_earned: int
+    local_day: int  # YYYYMMDD en la zona horaria del usuario
+
+    model_config = ConfigDict(from_attributes=True)
+
+# una fila por dia/semana/mes del historial de un habito
+class HistoryBucket(BaseModel):
+    bucket: date  # primer dia local del periodo (lunes en las semanas)
+    completions: int
+    points: int
+    time_spent: int  # minutos sumados
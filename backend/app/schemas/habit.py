@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from app.models.habits import HabitCategory
 from datetime import datetime
 
@@ -9,6 +9,7 @@ class HabitBase(BaseModel):
     category: HabitCategory
     is_public: bool
     track_time: bool
+    once_per_day: bool = False  # solo una completion por dia (en la zona del usuario)
 
 class HabitCreate(HabitBase):
     pass
@@ -19,6 +20,23 @@ class HabitUpdate(BaseModel):
     category: HabitCategory | None = None
     is_public: bool | None = None
     track_time: bool | None = None
+    once_per_day: bool | None = None
+
+class HabitBulkUpdateItem(HabitUpdate):
+    id: int
+
+# PATCH /habits: muchos cambios parciales en una sola transaccion
+class HabitBulkUpdate(BaseModel):
+    habits: list[HabitBulkUpdateItem] = Field(..., min_length=1, max_length=500)
+
+    # un id repetido saldria dos veces en la respuesta (o con dos cambios distintos, uno ganaria al azar)
+    @field_validator("habits")
+    @classmethod
+    def check_unique_ids(cls, habits: list[HabitBulkUpdateItem]) -> list[HabitBulkUpdateItem]:
+        ids = [habit.id for habit in habits]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Cada habito puede aparecer una sola vez")
+        return habits
 
 class HabitResponse(HabitBase):
     id: int
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from app.models.habits import HabitCategory
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    points: int
+
+class LeaderboardRank(BaseModel):
+    rank: int
+    points: int
+
+class LeaderboardResponse(BaseModel):
+    window: str
+    category: HabitCategory | None = None
+    entries: list[LeaderboardEntry]
+    me: LeaderboardRank | None = None  # null si el usuario no tiene puntos en esta clasificacion
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import date
+
+
+class StatsBase(BaseModel):
+    total_points: int = 0
+    total_completions: int = 0
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_completion_day: date | None = None  # dia local del usuario
+    completed_today: bool = False
+
+    model_config = ConfigDict(from_attributes=True)
+
+class UserStatsResponse(StatsBase):
+    user_id: int
+
+class HabitStatsResponse(StatsBase):
+    habit_id: int
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field, model_validator
+from app.schemas.habit import HabitCreate, HabitBulkUpdateItem, HabitResponse
+from app.schemas.completion import CompletionCreate, CompletionResponse
+
+
+# GET /sync: cambios desde el token anterior
+class SyncChanges(BaseModel):
+    token: int  # enviar como ?since= en la siguiente llamada (negativo: pagina siguiente de un snapshot)
+    full: bool  # True: son todos los datos, el cliente reemplaza su copia local
+    has_more: bool  # quedan completions: volver a llamar con el token nuevo
+    habits: list[HabitResponse]  # creados o modificados
+    deleted_habit_ids: list[int]  # sus completions tambien se borraron
+    completions: list[CompletionResponse]
+
+
+# POST /sync: cambios hechos offline, en una sola transaccion
+class SyncHabitCreate(HabitCreate):
+    client_id: str = Field(..., min_length=1, max_length=64)  # id temporal del cliente
+
+class SyncCompletionItem(CompletionCreate):
+    habit_id: int | None = None
+    habit_client_id: str | None = None  # habito creado en este mismo upload
+
+    @model_validator(mode="after")
+    def check_habit(self):
+        if (self.habit_id is None) == (self.habit_client_id is None):
+            raise ValueError("Indicar habit_id o habit_client_id")
+        return self
+
+class SyncUpload(BaseModel):
+    created_habits: list[SyncHabitCreate] = Field(default_factory=list, max_length=500)
+    updated_habits: list[HabitBulkUpdateItem] = Field(default_factory=list, max_length=500)
+    deleted_habit_ids: list[int] = Field(default_factory=list, max_length=500)
+    completions: list[SyncCompletionItem] = Field(default_factory=list, max_length=500)
+
+class SyncUploadResult(BaseModel):
+    created_habit_ids: dict[str, int]  # client_id -> id
+    skipped_habit_ids: list[int]  # cambios o completions de habitos que ya no existen (borrarlos de nuevo no es error)
+    completions: list[CompletionResponse]
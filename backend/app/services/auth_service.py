@@ -1,75 +1,201 @@
+from sqlalchemy import exists, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from app.models.user import User
-from app.schemas.auth import UserRegister
-from app.core.security import get_password_hash, verify_password
+from app.schemas.auth import UserRegister, UserUpdate
+from app.services.availability_service import availability_index
+from app.core.hashing import hash_password_async, check_password_async
+
+def email_taken_query(email: str):
+    return select(exists().where(User.email == email))
+
+def username_taken_query(username: str):
+    return select(exists().where(User.username == username))
+
 
 class AuthService:
 
     @staticmethod  # funcion helper
-    def create_user(db: Session, user_data: UserRegister) -> User:
+    def create_user(db: Session, user_data: UserRegister, hashed_password: str) -> User:
         """
         Crear nuevo usuario en la base de datos
-        """
-        # verificar existencia del email
-        if not AuthService.check_email_available(db, user_data.email):
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
-
-        # verificar usuario existencia
-        if not AuthService.check_username_available(db, user_data.username):
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Username already taken")
-
-        # hashear contraseña
-        hashed_password = get_password_hash(user_data.password)
 
+        - **hashed_password**: hash de hash_password_async; la ruta lo espera en el event loop, no en el threadpool
+        """
         # crear nuevo usuario
         new_user = User(
             email=user_data.email,
             username=user_data.username,
-            password_hash=hashed_password
+            password_hash=hashed_password,
+            timezone=user_data.timezone
         )
 
         # guardar usuario nuevo en la DB
+        # otro registro concurrente con el mismo email/username falla en el indice unico: 409
         db.add(new_user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            AuthService.ensure_available(db, user_data)
+            raise
         db.refresh(new_user)
+        availability_index.add(new_user.username, new_user.email)
 
         return new_user
 
-    @staticmethod # verificar username en tiempo real
+    @staticmethod
+    def update_user(db: Session, user_id: int, user_data: UserUpdate) -> User:
+        """
+        Actualizar datos del usuario (por ahora la zona horaria)
+        """
+        # por el ORM: el evento after_update invalida el cache de usuarios autenticados
+        user = db.get(User, user_id)
+        if user is None:
+            return None
+        user.timezone = user_data.timezone
+        db.commit()
+        db.refresh(user)
+        return user
+
+    @staticmethod
+    def ensure_available(db: Session, user_data: UserRegister) -> None:
+        """
+        409 si el email o el username ya estan registrados (EXISTS en la DB)
+        """
+        if db.scalar(email_taken_query(user_data.email)):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
+        if db.scalar(username_taken_query(user_data.username)):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Username already taken")
+
+    @staticmethod # verificar username en tiempo real (formulario de registro)
     def check_username_available(db: Session, username: str) -> bool:
-        existing = db.query(User).filter(User.username == username).first()
-        return existing is None
+        if availability_index.due():
+            availability_index.load(db.execute(availability_index.refresh_query()))
+        if not availability_index.username_maybe_taken(username):
+            return True  # el filtro de Bloom no lo tiene: libre sin consultar la DB
+        return not db.scalar(username_taken_query(username))
 
-    @staticmethod # verificar email en tiempo real
+    @staticmethod # verificar email en tiempo real (formulario de registro)
     def check_email_available(db: Session, email: str) -> bool:
-        existing = db.query(User).filter(User.email == email).first()
-        return existing is None
+        if availability_index.due():
+            availability_index.load(db.execute(availability_index.refresh_query()))
+        if not availability_index.email_maybe_taken(email):
+            return True
+        return not db.scalar(email_taken_query(email))
 
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> User:
+    async def authenticate_user(db: Session, email: str, password: str) -> User:
         """
         Autenticar usuario verificando email y contraseña
+
+        La query corre en el threadpool; bcrypt se espera sin ocupar un hilo
         """
         # buscar usuario por email
-        user = db.query(User).filter(User.email == email).first()
+        user = await run_in_threadpool(AuthService.get_user_by_email, db, email)
         if not user:
             return None
 
         # verificar contraseña
-        if not verify_password(password, user.password_hash):
+        if not await check_password_async(password, user.password_hash):
             return None
         return user
-    
+
     @staticmethod
     def get_user_by_email(db: Session, email: str) -> User:
         """
         Obtener usuario por email
         """
         return db.query(User).filter(User.email == email).first()
-        
 
 
-        
+class AsyncAuthService:
+    # mismas operaciones que AuthService sobre AsyncSession (DATABASE_ASYNC=true)
 
+    @staticmethod
+    async def create_user(db: AsyncSession, user_data: UserRegister) -> User:
+        """
+        Crear nuevo usuario en la base de datos
+        """
+        await AsyncAuthService.ensure_available(db, user_data)
+
+        hashed_password = await hash_password_async(user_data.password)
 
+        new_user = User(
+            email=user_data.email,
+            username=user_data.username,
+            password_hash=hashed_password,
+            timezone=user_data.timezone
+        )
+
+        db.add(new_user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            await AsyncAuthService.ensure_available(db, user_data)
+            raise
+        await db.refresh(new_user)
+        availability_index.add(new_user.username, new_user.email)
+
+        return new_user
+
+    @staticmethod
+    async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate) -> User:
+        """
+        Actualizar datos del usuario (por ahora la zona horaria)
+        """
+        user = await db.get(User, user_id)
+        if user is None:
+            return None
+        user.timezone = user_data.timezone
+        await db.commit()
+        await db.refresh(user)
+        return user
+
+    @staticmethod
+    async def ensure_available(db: AsyncSession, user_data: UserRegister) -> None:
+        if await db.scalar(email_taken_query(user_data.email)):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
+        if await db.scalar(username_taken_query(user_data.username)):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Username already taken")
+
+    @staticmethod
+    async def check_username_available(db: AsyncSession, username: str) -> bool:
+        if availability_index.due():
+            availability_index.load(await db.execute(availability_index.refresh_query()))
+        if not availability_index.username_maybe_taken(username):
+            return True
+        return not await db.scalar(username_taken_query(username))
+
+    @staticmethod
+    async def check_email_available(db: AsyncSession, email: str) -> bool:
+        if availability_index.due():
+            availability_index.load(await db.execute(availability_index.refresh_query()))
+        if not availability_index.email_maybe_taken(email):
+            return True
+        return not await db.scalar(email_taken_query(email))
+
+    @staticmethod
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
+        """
+        Autenticar usuario verificando email y contraseña
+        """
+        user = await AsyncAuthService.get_user_by_email(db, email)
+        if not user:
+            return None
+
+        if not await check_password_async(password, user.password_hash):
+            return None
+        return user
+
+    @staticmethod
+    async def get_user_by_email(db: AsyncSession, email: str) -> User:
+        """
+        Obtener usuario por email
+        """
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
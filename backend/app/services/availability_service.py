@@ -0,0 +1,123 @@
+# prefiltro en memoria para check-username / check-email
+# un filtro de Bloom con todos los usernames/emails tomados responde "disponible" sin ir a la DB;
+# solo los posibles positivos se confirman con un EXISTS. Se carga al iniciar el worker, se
+# actualiza con cada registro de este worker y cada AVAILABILITY_REFRESH_SECONDS lee los usuarios
+# nuevos de otros workers. Es orientativo: el registro no lo usa, siempre valida contra la DB.
+# Los filtros se dimensionan para el doble de los usuarios actuales (minimo AVAILABILITY_BLOOM_CAPACITY); si se
+# pasan de su capacidad se recargan en un hilo con una mas grande y mientras tanto se sigue usando el anterior.
+
+import logging
+import threading
+import time
+from threading import Lock
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core import database
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.metrics import Gauge
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+BLOOM_FILL_RATIO = Gauge("availability_bloom_fill_ratio", "Fraccion de bits en 1 de los filtros de disponibilidad")
+
+
+class AvailabilityIndex:
+
+    def __init__(self):
+        self.ready = False
+        self._usernames = None
+        self._emails = None
+        self._lock = Lock()
+        self.max_id = 0  # mayor users.id cargado
+        self.checked_at = 0.0
+        self.rebuild_thread = None  # recarga en curso con filtros mas grandes
+
+    def warm(self, db: Session) -> int:
+        """
+        Cargar todos los usernames/emails en filtros nuevos, retorna cuantos usuarios se leyeron
+        """
+        # margen para el doble de usuarios antes de la proxima recarga
+        capacity = max(settings.AVAILABILITY_BLOOM_CAPACITY, 2 * db.scalar(select(func.count()).select_from(User)))
+        usernames = BloomFilter(capacity, settings.AVAILABILITY_BLOOM_ERROR_RATE)
+        emails = BloomFilter(capacity, settings.AVAILABILITY_BLOOM_ERROR_RATE)
+        count = max_id = 0
+        self.checked_at = time.monotonic()
+        for user_id, username, email in db.execute(select(User.id, User.username, User.email).execution_options(yield_per=10000)):
+            usernames.add(username)
+            emails.add(email)
+            max_id = max(max_id, user_id)
+            count += 1
+        with self._lock:
+            self._usernames, self._emails = usernames, emails
+            self.max_id = max_id
+            self.ready = True
+            self._check_capacity()
+        return count
+
+    def due(self) -> bool:
+        return self.ready and time.monotonic() - self.checked_at >= settings.AVAILABILITY_REFRESH_SECONDS
+
+    def refresh_query(self):
+        """
+        Usuarios registrados despues de la ultima carga (en cualquier worker)
+
+        Los ids se asignan antes del commit: se vuelven a leer los ultimos AVAILABILITY_REFRESH_OVERLAP_IDS
+        para no perder registros que se confirmaron despues de uno con id mayor (agregar de nuevo no cambia el filtro)
+        """
+        self.checked_at = time.monotonic()
+        return select(User.id, User.username, User.email).where(
+            User.id > self.max_id - settings.AVAILABILITY_REFRESH_OVERLAP_IDS
+        )
+
+    def load(self, rows) -> None:
+        with self._lock:
+            for user_id, username, email in rows:
+                self._usernames.add(username)
+                self._emails.add(email)
+                self.max_id = max(self.max_id, user_id)
+            self._check_capacity()
+
+    def add(self, username: str, email: str) -> None:
+        with self._lock:
+            if self.ready:
+                self._usernames.add(username)
+                self._emails.add(email)
+                self._check_capacity()
+
+    def _check_capacity(self) -> None:
+        # con self._lock tomado
+        BLOOM_FILL_RATIO.set(self._usernames.fill_ratio, filter="usernames")
+        BLOOM_FILL_RATIO.set(self._emails.fill_ratio, filter="emails")
+        if not (self._usernames.full or self._emails.full):
+            return
+        if self.rebuild_thread is not None and self.rebuild_thread.is_alive():
+            return
+        logger.info("Filtro de disponibilidad sobre su capacidad (%d), recargando", self._usernames.capacity)
+        self.rebuild_thread = threading.Thread(
+            target=warm_availability_index, args=(database.SessionLocal,), name="availability-rebuild", daemon=True,
+        )
+        self.rebuild_thread.start()
+
+    # False = seguro que esta libre; True = hay que confirmar en la DB (o el filtro no esta cargado)
+    def username_maybe_taken(self, username: str) -> bool:
+        return not self.ready or username in self._usernames
+
+    def email_maybe_taken(self, email: str) -> bool:
+        return not self.ready or email in self._emails
+
+
+availability_index = AvailabilityIndex()
+
+
+def warm_availability_index(session_factory) -> None:
+    db = session_factory()
+    try:
+        count = availability_index.warm(db)
+        logger.info("Filtro de disponibilidad cargado con %d usuarios", count)
+    except Exception:
+        # sin filtro las consultas van directo a la DB, el servicio sigue funcionando
+        logger.exception("No se pudo cargar el filtro de disponibilidad")
+    finally:
+        db.close()
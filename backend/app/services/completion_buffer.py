@@ -0,0 +1,338 @@
+# Buffer write-behind de completions (COMPLETION_WRITE_BEHIND=true)
+#
+# Los POST de completions responden sin esperar el commit: los eventos quedan en una cola acotada en
+# memoria y en un journal local append-only, y un hilo los guarda con un solo commit por lote cada
+# COMPLETION_FLUSH_MS (o antes si se juntan COMPLETION_FLUSH_ROWS). Al arrancar se vuelven a encolar
+# los journals de procesos caidos; event_id es unico en la DB, reenviar un evento ya guardado no lo duplica.
+# Sin COMPLETION_JOURNAL_FSYNC el journal sobrevive a la caida del proceso, no a la del host.
+# La cola es por worker: read_with_pending solo ve las pendientes de este proceso; en otro worker las
+# completions aparecen en las stats despues del siguiente lote (como REPLICA_STICKY_SECONDS, la ventana es por worker).
+# Un lote que falla COMPLETION_FLUSH_RETRIES veces seguidas se guarda evento por evento: los que fallan solos
+# (no por la DB caida) pasan a <proceso>.dead en el directorio del journal y el resto sigue.
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy.exc import OperationalError
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+
+try:
+    import fcntl  # los journals de procesos vivos quedan bloqueados y no se reenvian
+except ImportError:  # Windows: sin bloqueo, un solo proceso por directorio de journal
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COMPLETIONS_PENDING = Gauge("completion_buffer_pending", "Completions aceptadas que todavia no estan en la DB")
+COMPLETIONS_FLUSHED = Counter("completion_buffer_flushed_total", "Completions guardadas por el buffer write-behind por resultado")
+
+
+def _try_lock(file) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+# el journal guarda completed_at como texto ISO
+def _load_event(line: bytes) -> dict:
+    event = orjson.loads(line)
+    event["completed_at"] = datetime.fromisoformat(event["completed_at"])
+    return event
+
+
+class _Journal:
+    # segmentos <proceso>.<n>.journal: el actual recibe los eventos nuevos; los sellados esperan el commit de su lote
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.prefix = f"{os.getpid()}-{uuid4().hex[:8]}"
+        self.segment = 0
+        self.path = None
+        self.file = None
+        self.sealed = []  # (path, file)
+
+    def open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment += 1
+        # se bloquea antes de tener el nombre .journal para que ningun otro proceso lo adopte
+        tmp = self.directory / f"{self.prefix}.{self.segment}.tmp"
+        self.file = open(tmp, "ab")
+        _try_lock(self.file)
+        path = tmp.with_suffix(".journal")
+        os.replace(tmp, path)
+        self.path = path
+
+    def append(self, events: list[dict]) -> None:
+        self.file.write(b"".join(orjson.dumps(event) + b"\n" for event in events))
+        self.file.flush()
+        if settings.COMPLETION_JOURNAL_FSYNC:
+            os.fsync(self.file.fileno())
+
+    def seal(self) -> int:
+        """
+        Cerrar el segmento actual para un lote, retorna cuantos segmentos hay que borrar despues del commit
+        """
+        if self.file.tell():
+            self.sealed.append((self.path, self.file))
+            self.open()
+        return len(self.sealed)
+
+    def dead_letter(self, events: list[dict]) -> None:
+        # mismo formato que el journal: renombrado a .journal se reenvia en el proximo arranque
+        with open(self.directory / f"{self.prefix}.dead", "ab") as file:
+            file.write(b"".join(orjson.dumps(event) + b"\n" for event in events))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def release(self, count: int) -> None:
+        for path, file in self.sealed[:count]:
+            file.close()
+            path.unlink(missing_ok=True)
+        del self.sealed[:count]
+
+    def adopt(self) -> list[dict]:
+        """
+        Eventos de journals de procesos que ya no corren (quedan sellados hasta guardarlos)
+        """
+        events = []
+        for path in sorted(self.directory.glob("*.journal")):
+            if path == self.path:
+                continue
+            file = open(path, "rb")
+            if not _try_lock(file):
+                file.close()
+                continue
+            for line in file:
+                try:
+                    events.append(_load_event(line))
+                except (orjson.JSONDecodeError, KeyError, ValueError):
+                    logger.warning("Linea incompleta en %s, se descarta", path)  # caida a mitad de una escritura
+            self.sealed.append((path, file))
+        return events
+
+    def close(self) -> None:
+        # lo que no se pudo guardar queda en disco para el proximo arranque
+        for _, file in self.sealed:
+            file.close()
+        self.file.close()
+        if self.path.stat().st_size == 0:
+            self.path.unlink(missing_ok=True)
+
+
+class CompletionBuffer:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.pending = []  # eventos en orden de llegada
+        self.by_user = {}  # user_id -> eventos pendientes del usuario, mismo orden
+        self.once_days = set()  # (habit_id, local_day) pendientes de habitos once_per_day
+        self.epoch = 0  # impar mientras se confirma un lote (ver read_with_pending)
+        self.failures = 0  # lotes fallidos seguidos
+        self.journal = None
+        self.thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.thread is not None
+
+    def start(self, session_factory, write, after_commit) -> None:
+        """
+        Reenviar journals huerfanos y arrancar el hilo que guarda los lotes
+
+        - **write(db, events)**: escribe un lote sin commit y retorna lo que necesita after_commit
+        - **after_commit(result)**: efectos fuera de la DB (clasificaciones en memoria)
+        """
+        self.session_factory, self.write, self.after_commit = session_factory, write, after_commit
+        self.journal = _Journal(settings.COMPLETION_JOURNAL_DIR)
+        self.journal.open()
+        replayed = self.journal.adopt()
+        if replayed:
+            logger.info("Reenviando %d completions de journals anteriores", len(replayed))
+            self._push(replayed)
+        self.thread = threading.Thread(target=self.run, name="completion-buffer", daemon=True)
+        self.thread.start()
+
+    def _push(self, events: list[dict]) -> None:
+        self.pending.extend(events)
+        for event in events:
+            self.by_user.setdefault(event["user_id"], []).append(event)
+            if event["once_per_day"]:
+                self.once_days.add((event["habit_id"], event["local_day"]))
+        COMPLETIONS_PENDING.set(len(self.pending))
+
+    def add(self, events: list[dict]) -> list[dict]:
+        """
+        Aceptar completions (journal + cola), retorna las aceptadas
+
+        Se omiten las de habitos once_per_day con ese dia ya pendiente; con la cola llena responde 503
+        """
+        with self.lock:
+            accepted = []
+            for event in events:
+                key = (event["habit_id"], event["local_day"])
+                if event["once_per_day"]:
+                    if key in self.once_days:
+                        continue
+                    self.once_days.add(key)
+                accepted.append(event)
+            if len(self.pending) + len(accepted) > settings.COMPLETION_BUFFER_SIZE:
+                self.once_days.difference_update((e["habit_id"], e["local_day"]) for e in accepted if e["once_per_day"])
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Demasiadas completions pendientes, intenta de nuevo",
+                    headers={"Retry-After": "1"},
+                )
+            if accepted:
+                self.journal.append(accepted)
+                self._push(accepted)
+            if len(self.pending) >= settings.COMPLETION_FLUSH_ROWS:
+                self.wake.set()
+        return accepted
+
+    def read_with_pending(self, read, user_id: int):
+        """
+        Leer de la DB (read()) junto con los eventos pendientes del usuario en este worker
+
+        Si un lote se confirma durante la lectura se repite, para no contarlo dos veces ni perderlo.
+        read() debe leer de nuevo de la DB en cada llamada (populate_existing)
+        """
+        if not self.enabled:
+            return read(), []
+        while True:
+            epoch = self.epoch
+            if epoch % 2 == 0:
+                with self.lock:
+                    events = list(self.by_user.get(user_id, ()))
+                result = read()
+                if self.epoch == epoch:
+                    return result, events
+            time.sleep(0.001)
+
+    def flush(self) -> int:
+        """
+        Guardar todo lo pendiente en una transaccion, retorna cuantos eventos se enviaron
+        """
+        with self.lock:
+            batch = list(self.pending)
+            if not batch:
+                return 0
+            sealed = self.journal.seal()
+
+        with self.session_factory() as db:
+            result = self.write(db, batch)
+            self.epoch += 1  # los lectores esperan hasta que el lote salga de pending
+            try:
+                db.commit()
+                with self.lock:
+                    self._remove(batch)
+                    self.journal.release(sealed)
+            finally:
+                self.epoch += 1
+
+        COMPLETIONS_FLUSHED.inc(len(batch), result="done")
+        self.after_commit(result)
+        return len(batch)
+
+    def flush_isolated(self) -> int:
+        """
+        Guardar lo pendiente con un commit por evento, retorna cuantos pasaron al dead letter
+
+        Para un lote que falla siempre: un evento que no se puede guardar no frena a los demas.
+        Si la DB esta caida (OperationalError) se corta y lo pendiente se reintenta entero
+        """
+        with self.lock:
+            batch = list(self.pending)
+            if not batch:
+                return 0
+            sealed = self.journal.seal()
+
+        dead = []
+        self.epoch += 1  # los lectores esperan: los eventos guardados siguen en pending hasta el final
+        try:
+            for event in batch:
+                try:
+                    with self.session_factory() as db:
+                        result = self.write(db, [event])
+                        db.commit()
+                except OperationalError:
+                    raise  # los ya guardados se omiten al reintentar (event_id unico)
+                except Exception:
+                    logger.exception("La completion %s no se pudo guardar, pasa al dead letter", event["event_id"])
+                    dead.append(event)
+                    continue
+                self.after_commit(result)
+            if dead:
+                self.journal.dead_letter(dead)
+            with self.lock:
+                self._remove(batch)
+                self.journal.release(sealed)
+        finally:
+            self.epoch += 1
+
+        COMPLETIONS_FLUSHED.inc(len(batch) - len(dead), result="done")
+        if dead:
+            COMPLETIONS_FLUSHED.inc(len(dead), result="dead_letter")
+        return len(dead)
+
+    def _remove(self, batch: list[dict]) -> None:
+        # el lote es un prefijo de pending y, por usuario, un prefijo de by_user
+        del self.pending[:len(batch)]
+        counts = {}
+        for event in batch:
+            counts[event["user_id"]] = counts.get(event["user_id"], 0) + 1
+            if event["once_per_day"]:
+                self.once_days.discard((event["habit_id"], event["local_day"]))
+        for user_id, count in counts.items():
+            events = self.by_user[user_id]
+            del events[:count]
+            if not events:
+                del self.by_user[user_id]
+        COMPLETIONS_PENDING.set(len(self.pending))
+
+    def run(self) -> None:
+        while not self.stopping.is_set():
+            self.wake.wait(settings.COMPLETION_FLUSH_MS / 1000)
+            self.wake.clear()
+            try:
+                if self.failures >= settings.COMPLETION_FLUSH_RETRIES:
+                    self.flush_isolated()
+                else:
+                    self.flush()
+                self.failures = 0
+            except Exception:
+                # DB caida o un evento que no se puede guardar: los eventos siguen en la cola y en el journal
+                self.failures += 1
+                logger.exception("No se pudo guardar el lote de completions (intento %d)", self.failures)
+                COMPLETIONS_FLUSHED.inc(result="error")
+                self.stopping.wait(1)
+
+    def stop(self) -> None:
+        """
+        Detener el hilo y guardar lo pendiente (si falla queda en el journal para el proximo arranque)
+        """
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.wake.set()
+        self.thread.join()
+        self.thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Quedaron %d completions en el journal", len(self.pending))
+        self.journal.close()
+
+
+completion_buffer = CompletionBuffer()
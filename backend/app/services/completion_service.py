@@ -0,0 +1,278 @@
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core.localtime import day_key, key_day, local_day
+from app.models.habits import Habit, HabitCategory, HabitCompletion
+from app.schemas.completion import CompletionBatchItem, CompletionResponse, HistoryBucket
+from app.services.completion_buffer import completion_buffer
+from app.services.event_service import queue_event
+from app.services.habit_service import bump_habits_version_stmt
+from app.services.leaderboard_service import LeaderboardService
+from app.services.stats_service import StatsService
+
+POINTS_PER_COMPLETION = 1
+MINUTES_PER_BONUS_POINT = 15  # habitos con track_time: +1 punto cada 15 minutos
+
+completions_table = HabitCompletion.__table__
+
+# columnas que se guardan de un evento del buffer write-behind
+BUFFERED_COLUMNS = ("event_id", "habit_id", "user_id", "completed_at", "time_spent", "points_earned", "local_day", "once_per_day")
+
+
+def _insert(dialect_name: str):
+    return postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+
+# evento para GET /events; leaderboard=True si sumaron puntos en habitos publicos
+def queue_completion_event(db: Session, user_id: int, seq: int, completions: list[CompletionResponse], leaderboard: bool) -> None:
+    queue_event(
+        db, user_id, "completion.created", seq, [c.id for c in completions],
+        habit_ids=sorted({c.habit_id for c in completions}),
+        points=sum(c.points_earned for c in completions),
+        leaderboard=leaderboard,
+    )
+
+
+class CompletionService:
+
+    @staticmethod
+    def calculate_points(track_time: bool, time_spent: int | None) -> int:
+        """
+        Puntos de una completion
+        """
+        points = POINTS_PER_COMPLETION
+        if track_time and time_spent:
+            points += time_spent // MINUTES_PER_BONUS_POINT
+        return points
+
+    @staticmethod
+    def create_completions(db: Session, user_id: int, items: list[CompletionBatchItem], tz: str) -> list[CompletionResponse]:
+        """
+        Registrar completions de uno o varios habitos del usuario en un solo INSERT
+
+        En habitos once_per_day se omiten las que repiten un dia local ya registrado (no se retornan)
+        """
+        habits = CompletionService.get_completable_habits_or_404(db, user_id, items)
+        completions = CompletionService.insert_completions(db, user_id, items, habits, tz)
+        if not completions:
+            db.rollback()
+            return completions
+        db.commit()
+
+        CompletionService.record_leaderboard(user_id, habits, completions)
+        return completions
+
+    @staticmethod
+    def buffer_completions(db: Session, user_id: int, items: list[CompletionBatchItem], tz: str) -> list[CompletionResponse]:
+        """
+        Modo write-behind: validar y encolar las completions sin esperar el commit (id None hasta guardarse)
+
+        En habitos once_per_day se omiten los dias ya registrados en la DB o pendientes en el buffer
+        """
+        habits = CompletionService.get_completable_habits_or_404(db, user_id, items)
+        rows = CompletionService.build_rows(user_id, items, habits, tz)
+
+        once_days = {(row["habit_id"], row["local_day"]) for row in rows if row["once_per_day"]}
+        if once_days:
+            taken = set(db.execute(
+                select(HabitCompletion.habit_id, HabitCompletion.local_day).where(
+                    HabitCompletion.habit_id.in_({habit_id for habit_id, _ in once_days}),
+                    HabitCompletion.local_day.in_({day for _, day in once_days}),
+                    HabitCompletion.once_per_day.is_(True),
+                )
+            ).tuples())
+            rows = [row for row in rows if (row["habit_id"], row["local_day"]) not in taken]
+
+        # lo necesario para las clasificaciones viaja con el evento (el journal se reenvia sin esta request)
+        for row in rows:
+            habit = habits[row["habit_id"]]
+            row.update(event_id=uuid4().hex, category=habit.category.value, is_public=bool(habit.is_public))
+        return [CompletionResponse.model_validate(event) for event in completion_buffer.add(rows)]
+
+    @staticmethod
+    def write_buffered(db: Session, events: list[dict]) -> list:
+        """
+        Guardar un lote del buffer write-behind (sin commit), retorna lo que falta sumar a las clasificaciones
+        """
+        by_user = {}
+        for event in events:
+            by_user.setdefault(event["user_id"], []).append(event)
+
+        dialect = db.bind.dialect.name
+        # event_id repetido (journal reenviado) o dia once_per_day ya registrado: se omite
+        stmt = _insert(dialect)(completions_table).on_conflict_do_nothing().returning(*completions_table.c)
+        leaderboard = []
+        for user_id in sorted(by_user):  # mismo orden de locks en todos los workers
+            user_events = by_user[user_id]
+            seq = db.scalar(bump_habits_version_stmt(dialect, user_id, habits=False))
+            # habitos borrados mientras sus completions esperaban: se descartan (KEY SHARE impide borrarlos ahora)
+            alive = set(db.scalars(
+                select(Habit.id)
+                .where(Habit.user_id == user_id, Habit.id.in_({event["habit_id"] for event in user_events}))
+                .with_for_update(key_share=True)
+            ))
+            rows = [
+                {**{key: event[key] for key in BUFFERED_COLUMNS}, "sync_seq": seq}
+                for event in user_events if event["habit_id"] in alive
+            ]
+            if not rows:
+                continue
+            completions = [CompletionResponse.model_validate(row) for row in db.execute(stmt, rows)]
+            if completions:
+                StatsService.record_completions(db, user_id, completions)
+                habits = {event["habit_id"]: event for event in user_events}
+                queue_completion_event(db, user_id, seq, completions, any(habits[c.habit_id]["is_public"] for c in completions))
+                leaderboard.append((user_id, [
+                    (HabitCategory(habits[c.habit_id]["category"]), c.completed_at, c.points_earned)
+                    for c in completions if habits[c.habit_id]["is_public"]
+                ]))
+        return leaderboard
+
+    @staticmethod
+    def record_buffered_leaderboard(leaderboard: list) -> None:
+        """
+        Sumar a las clasificaciones en memoria un lote ya confirmado
+        """
+        for user_id, completions in leaderboard:
+            LeaderboardService.record_completions(user_id, completions)
+
+    @staticmethod
+    def get_completable_habits_or_404(db: Session, user_id: int, items: list[CompletionBatchItem]) -> dict:
+        habits = CompletionService.get_completable_habits(db, user_id, {item.habit_id for item in items})
+        missing = {item.habit_id for item in items} - habits.keys()
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No existen los habitos: {sorted(missing)}"
+            )
+        return habits
+
+    @staticmethod
+    def get_completable_habits(db: Session, user_id: int, habit_ids: set[int]) -> dict:
+        """
+        Habitos del usuario entre habit_ids, con lo necesario para puntos y clasificaciones (una sola query)
+        """
+        return {
+            row.id: row
+            for row in db.execute(
+                select(Habit.id, Habit.track_time, Habit.is_public, Habit.category, Habit.once_per_day)
+                .where(Habit.user_id == user_id, Habit.id.in_(habit_ids))
+            )
+        }
+
+    @staticmethod
+    def build_rows(user_id: int, items: list[CompletionBatchItem], habits: dict, tz: str) -> list[dict]:
+        """
+        Filas de habit_completions con los puntos calculados
+        """
+        now = datetime.utcnow()
+        rows = []
+        for item in items:
+            track_time = bool(habits[item.habit_id].track_time)
+            time_spent = item.time_spent if track_time else None
+            completed_at = _to_naive_utc(item.completed_at) if item.completed_at else now
+            rows.append({
+                "habit_id": item.habit_id,
+                "user_id": user_id,
+                "completed_at": completed_at,
+                "time_spent": time_spent,
+                "points_earned": CompletionService.calculate_points(track_time, time_spent),
+                "local_day": day_key(local_day(completed_at, tz)),  # el dia se fija al registrar, en la zona del usuario
+                "once_per_day": bool(habits[item.habit_id].once_per_day),
+            })
+        return rows
+
+    @staticmethod
+    def insert_completions(db: Session, user_id: int, items: list[CompletionBatchItem], habits: dict, tz: str) -> list[CompletionResponse]:
+        """
+        INSERT de las completions y actualizacion de agregados, dentro de la transaccion de db (sin commit)
+        """
+        # sube el token de GET /sync del usuario; las filas quedan marcadas con el valor nuevo
+        seq = db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id, habits=False))
+        rows = CompletionService.build_rows(user_id, items, habits, tz)
+        for row in rows:
+            row["sync_seq"] = seq
+
+        # INSERT multi-fila con RETURNING (SQLAlchemy agrupa las filas en lotes "insertmanyvalues")
+        # se usa la tabla (Core) para no hidratar ni expirar objetos ORM en el commit
+        # el indice unico parcial descarta el segundo registro del dia de habitos once_per_day
+        stmt = _insert(db.bind.dialect.name)(completions_table).on_conflict_do_nothing(
+            index_elements=[completions_table.c.habit_id, completions_table.c.local_day],
+            index_where=completions_table.c.once_per_day.is_(True),
+        )
+        result = db.execute(stmt.returning(*completions_table.c), rows)
+        completions = [CompletionResponse.model_validate(row) for row in result]
+
+        # puntos y rachas materializados en la misma transaccion
+        if completions:
+            StatsService.record_completions(db, user_id, completions)
+            queue_completion_event(db, user_id, seq, completions, any(habits[c.habit_id].is_public for c in completions))
+        return completions
+
+    @staticmethod
+    def record_leaderboard(user_id: int, habits: dict, completions: list[CompletionResponse]) -> None:
+        """
+        Sumar a las clasificaciones en memoria, despues del commit
+        """
+        LeaderboardService.record_completions(user_id, [
+            (habits[c.habit_id].category, c.completed_at, c.points_earned)
+            for c in completions if habits[c.habit_id].is_public
+        ])
+
+    @staticmethod
+    def get_history(db: Session, user_id: int, habit_id: int, start: datetime, end: datetime, bucket: str) -> list[HistoryBucket] | None:
+        """
+        Historial de un habito agrupado por dia, semana o mes local del usuario (None si el habito no es del usuario)
+        """
+        # totales por local_day en SQL (cualquier dialecto) sobre el rango de completed_at que recorre el
+        # indice (habit_id, completed_at); semanas y meses se arman con esas filas, a lo sumo una por dia
+        query = (
+            select(
+                HabitCompletion.local_day,
+                func.count().label("completions"),
+                func.coalesce(func.sum(HabitCompletion.points_earned), 0).label("points"),
+                func.coalesce(func.sum(HabitCompletion.time_spent), 0).label("time_spent"),
+            )
+            .where(
+                HabitCompletion.habit_id == habit_id,
+                HabitCompletion.user_id == user_id,
+                HabitCompletion.completed_at >= _to_naive_utc(start),
+                HabitCompletion.completed_at < _to_naive_utc(end),
+            )
+            .group_by(HabitCompletion.local_day)
+            .order_by(HabitCompletion.local_day)
+        )
+        buckets = []
+        for row in db.execute(query):
+            period = _period_start(bucket, key_day(row.local_day))
+            if buckets and buckets[-1].bucket == period:
+                buckets[-1].completions += row.completions
+                buckets[-1].points += row.points
+                buckets[-1].time_spent += row.time_spent
+            else:
+                buckets.append(HistoryBucket(bucket=period, completions=row.completions, points=row.points, time_spent=row.time_spent))
+
+        # sin datos en el rango: distinguir "sin completions" de "habito ajeno / inexistente"
+        if not buckets:
+            owned = db.execute(select(Habit.id).where(Habit.id == habit_id, Habit.user_id == user_id)).first()
+            if not owned:
+                return None
+        return buckets
+
+
+# primer dia del periodo (semanas de lunes a domingo)
+def _period_start(bucket: str, day: date) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+# completed_at se guarda como UTC sin zona horaria (igual que datetime.utcnow)
+def _to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,202 @@
+# Eventos en vivo para GET /events (SSE)
+#
+# Las escrituras de habitos y completions encolan un evento en la sesion (queue_event); al hacer commit
+# se publica con NOTIFY en la misma transaccion, asi solo salen eventos de cambios confirmados.
+# Cada worker tiene UNA conexion con LISTEN (NotifyListener) y reparte los eventos a las conexiones
+# SSE de ese worker (EventHub); ninguna conexion SSE usa el pool de la DB.
+# Sin PostgreSQL (SQLite en local) el evento se entrega directo despues del commit, solo en este proceso.
+# Los tipos con handler (EventHub.on) no van a GET /events: corren en cada worker, por ejemplo para
+# invalidar caches en memoria (app.core.security).
+
+import asyncio
+import logging
+import select as select_module
+import threading
+import orjson
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "habit_events"
+MAX_EVENT_IDS = 100  # NOTIFY admite hasta 8000 bytes: con mas ids el cliente usa GET /sync
+
+EVENTS_PUBLISHED = Counter("events_published_total", "Eventos publicados por tipo")
+EVENT_SUBSCRIBERS = Gauge("event_subscribers", "Conexiones abiertas a GET /events en este worker")
+
+
+def queue_event(db, user_id: int, kind: str, token: int | None, ids: list[int] | None = None, **data) -> None:
+    """
+    Encolar un evento para publicarlo con el commit de db (se descarta con rollback)
+
+    - **token**: sync_seq despues del cambio; el cliente puede llamar GET /sync?since=<su token anterior>
+    """
+    if not settings.EVENTS_ENABLED:
+        return
+    if ids is not None and len(ids) > MAX_EVENT_IDS:
+        ids = None
+    db.info.setdefault("events", []).append({"user_id": user_id, "type": kind, "token": token, "ids": ids, **data})
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_events(session: Session) -> None:
+    if session.new or session.dirty or session.deleted:
+        session.flush()  # los eventos de mapper (after_update) se encolan en el flush, que el commit hace despues
+    events = session.info.get("events")
+    if not events or session.get_bind().dialect.name != "postgresql":
+        return
+    # NOTIFY dentro de la transaccion: PostgreSQL lo entrega recien cuando se confirma
+    for item in session.info.pop("events"):
+        session.execute(select(func.pg_notify(CHANNEL, orjson.dumps(item).decode())))
+        EVENTS_PUBLISHED.inc(type=item["type"])
+
+@event.listens_for(Session, "after_commit")
+def _publish_local_events(session: Session) -> None:
+    for item in session.info.pop("events", ()):
+        event_hub.publish(item)
+        EVENTS_PUBLISHED.inc(type=item["type"])
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_events(session: Session, previous_transaction) -> None:
+    session.info.pop("events", None)
+
+
+class Subscriber:
+    # una conexion SSE: cola acotada; si se llena el cliente recibe "resync" en lugar de los eventos perdidos
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.lost = False
+
+    def put(self, item: dict) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.lost = True
+
+    def take_lost(self) -> bool:
+        if not self.lost:
+            return False
+        self.lost = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        return True
+
+
+class EventHub:
+    # suscriptores de este worker por usuario; publish se puede llamar desde cualquier hilo
+
+    def __init__(self):
+        self.loop = None
+        self.subscribers = {}  # user_id -> set[Subscriber]
+        self.handlers = {}  # tipo -> [handler(item)], eventos internos entre workers
+
+    def on(self, kind: str, handler) -> None:
+        self.handlers.setdefault(kind, []).append(handler)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id)
+        self.subscribers.setdefault(user_id, set()).add(subscriber)
+        EVENT_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self.subscribers.get(subscriber.user_id)
+        if subscribers is not None and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.user_id]
+            EVENT_SUBSCRIBERS.dec()
+
+    def publish(self, item: dict) -> None:
+        handlers = self.handlers.get(item["type"])
+        if handlers is not None:
+            for handler in handlers:
+                handler(item)
+            return
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._dispatch, item)
+
+    def resync_all(self) -> None:
+        """
+        Avisar a todos que pudieron perder eventos (listener reconectado)
+        """
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._mark_all_lost)
+
+    def _dispatch(self, item: dict) -> None:
+        for subscriber in self.subscribers.get(item["user_id"], ()):
+            subscriber.put(item)
+
+    def _mark_all_lost(self) -> None:
+        for subscribers in self.subscribers.values():
+            for subscriber in subscribers:
+                subscriber.lost = True
+                subscriber.put({"type": "resync"})  # despierta al stream
+
+
+class NotifyListener:
+    # hilo con una conexion propia (fuera del pool) en LISTEN habit_events; reconecta si se cae
+
+    def __init__(self, engine, hub: EventHub):
+        self.engine = engine
+        self.hub = hub
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.run, name="event-listener", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def _connect(self):
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        connection = self.engine.dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return connection
+
+    def run(self) -> None:
+        connected_before = False
+        while not self.stopping.is_set():
+            try:
+                connection = self._connect()
+            except Exception:
+                logger.exception("No se pudo abrir la conexion LISTEN, reintentando")
+                self.stopping.wait(settings.EVENTS_RECONNECT_SECONDS)
+                continue
+            if connected_before:
+                self.hub.resync_all()  # los NOTIFY mientras estuvo caido se perdieron
+            connected_before = True
+            try:
+                self._listen(connection)
+            except Exception:
+                logger.exception("Se perdio la conexion LISTEN")
+            finally:
+                connection.close()
+
+    def _listen(self, connection) -> None:
+        while not self.stopping.is_set():
+            if not select_module.select([connection], [], [], 1.0)[0]:
+                continue
+            connection.poll()
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                try:
+                    self.hub.publish(orjson.loads(notify.payload))
+                except orjson.JSONDecodeError:
+                    logger.warning("Evento invalido en %s: %r", CHANNEL, notify.payload)
+
+
+event_hub = EventHub()
@@ -1,6 +1,97 @@
+from datetime import datetime
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.schemas.habit import HabitResponse, HabitCreate, HabitUpdate
-from app.models.habits import Habit
+from app.schemas.habit import HabitResponse, HabitCreate, HabitUpdate, HabitBulkUpdateItem
+from app.models.habits import Habit, HabitCategory, HabitTombstone, HabitVersion
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.event_service import queue_event
+
+# columnas de HabitResponse: las paginas se leen como filas, sin hidratar objetos ORM
+HABIT_RESPONSE_COLUMNS = (
+    Habit.id, Habit.user_id, Habit.title, Habit.description, Habit.category,
+    Habit.is_public, Habit.track_time, Habit.once_per_day, Habit.created_at, Habit.updated_at,
+)
+
+# pagina keyset ordenada por (created_at, id), usa el indice (user_id, created_at, id)
+# se pide una fila extra para saber si hay pagina siguiente
+def habits_page_query(user_id: int, limit: int, cursor: str | None = None,
+                      category: HabitCategory | None = None, is_public: bool | None = None):
+    query = select(*HABIT_RESPONSE_COLUMNS).where(Habit.user_id == user_id)
+    if category is not None:
+        query = query.where(Habit.category == category)
+    if is_public is not None:
+        query = query.where(Habit.is_public == is_public)
+    if cursor:
+        query = query.where(tuple_(Habit.created_at, Habit.id) > decode_cursor(cursor))
+    return query.order_by(Habit.created_at, Habit.id).limit(limit + 1)
+
+def split_page(rows: list, limit: int) -> tuple[list, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+# escrituras en una sola sentencia: UPDATE/DELETE ... WHERE user_id AND id RETURNING columnas
+# (sin SELECT previo ni refresh posterior); sin filas retornadas = el habito no existe o es ajeno
+def update_habits_stmt(user_id: int, habit_ids: list[int], values: dict):
+    if not values:
+        # nada que cambiar: solo leer los habitos
+        return select(*HABIT_RESPONSE_COLUMNS).where(Habit.user_id == user_id, Habit.id.in_(habit_ids))
+    return (
+        update(Habit)
+        .where(Habit.user_id == user_id, Habit.id.in_(habit_ids))
+        .values(**values)
+        .returning(*HABIT_RESPONSE_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+def delete_habits_stmt(user_id: int, habit_ids: list[int]):
+    # las completions y agregados del habito se borran por ON DELETE CASCADE
+    return (
+        delete(Habit)
+        .where(Habit.user_id == user_id, Habit.id.in_(habit_ids))
+        .returning(*HABIT_RESPONSE_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+# agrupar los cambios iguales: archivar/reordenar muchos habitos es un solo UPDATE
+def group_bulk_updates(items: list[HabitBulkUpdateItem]) -> dict:
+    groups = {}
+    for item in items:
+        values = item.model_dump(exclude_unset=True, exclude={"id"})
+        groups.setdefault(tuple(sorted(values.items())), []).append(item.id)
+    return groups
+
+# upsert version = version + 1 y sync_seq = sync_seq + 1 al inicio de la transaccion de la escritura,
+# retorna el sync_seq nuevo para marcar las filas escritas (completions solo suben sync_seq, no el ETag)
+def bump_habits_version_stmt(dialect_name: str, user_id: int, habits: bool = True):
+    insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+    set_ = {"sync_seq": HabitVersion.sync_seq + 1}
+    if habits:
+        set_["version"] = HabitVersion.version + 1
+    return insert(HabitVersion).values(user_id=user_id, version=int(habits), sync_seq=1).on_conflict_do_update(
+        index_elements=[HabitVersion.user_id],
+        set_=set_,
+    ).returning(HabitVersion.sync_seq)
+
+def tombstone_stmt(user_id: int, habit_ids: list[int], seq: int):
+    return insert(HabitTombstone).values([
+        {"habit_id": habit_id, "user_id": user_id, "sync_seq": seq, "deleted_at": datetime.utcnow()}
+        for habit_id in habit_ids
+    ])
+
+def habits_version_query(user_id: int):
+    return select(HabitVersion.version).where(HabitVersion.user_id == user_id)
+
+# ETag de un habito: solo updated_at por primary key, antes de cargar y serializar el habito
+def habit_updated_query(user_id: int, habit_id: int):
+    return select(Habit.updated_at).where(Habit.id == habit_id, Habit.user_id == user_id)
+
+def habit_query(user_id: int, habit_id: int):
+    return select(*HABIT_RESPONSE_COLUMNS).where(Habit.id == habit_id, Habit.user_id == user_id)
 
 
 class HabitService: 
@@ -14,12 +105,34 @@ class HabitService:
         return listHabits
 
     @staticmethod
-    def get_habit(db: Session, user_id: int, habit_id: int) -> HabitResponse:
+    def get_habits_page(db: Session, user_id: int, limit: int, cursor: str | None = None,
+                        category: HabitCategory | None = None, is_public: bool | None = None) -> tuple[list, str | None]:
         """
-        Obtener habito del usuario
+        Obtener una pagina de habitos del usuario y el cursor de la siguiente (None si es la ultima)
         """
-        habit = db.query(Habit).filter(Habit.user_id == user_id, Habit.id == habit_id).first()
-        return habit
+        rows = db.execute(habits_page_query(user_id, limit, cursor, category, is_public)).all()
+        return split_page(rows, limit)
+
+    @staticmethod
+    def get_habits_version(db: Session, user_id: int) -> int:
+        """
+        Version actual de la coleccion de habitos del usuario (0 si nunca escribio)
+        """
+        return db.scalar(habits_version_query(user_id)) or 0
+
+    @staticmethod
+    def get_habit_updated_at(db: Session, user_id: int, habit_id: int) -> datetime | None:
+        """
+        updated_at del habito del usuario (None si no existe o es ajeno)
+        """
+        return db.scalar(habit_updated_query(user_id, habit_id))
+
+    @staticmethod
+    def get_habit(db: Session, user_id: int, habit_id: int):
+        """
+        Obtener habito del usuario (fila con las columnas de HabitResponse)
+        """
+        return db.execute(habit_query(user_id, habit_id)).first()
 
     @staticmethod
     def create_habit(db: Session, user_id: int, habit_data: HabitCreate) -> HabitResponse:
@@ -33,11 +146,15 @@ class HabitService:
             description = habit_data.description,
             category = habit_data.category,
             is_public = habit_data.is_public,
-            track_time = habit_data.track_time
+            track_time = habit_data.track_time,
+            once_per_day = habit_data.once_per_day
         )
 
         # guardar habito nuevo en la DB
+        new_habit.sync_seq = db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
         db.add(new_habit)
+        db.flush()  # id para el evento
+        queue_event(db, user_id, "habit.created", new_habit.sync_seq, [new_habit.id])
         db.commit()
         db.refresh(new_habit)
 
@@ -48,11 +165,16 @@ class HabitService:
         """
         Actualizar un habito en la db
         """
-        habit = HabitService.get_habit(db, user_id, habit_id)
-        for field, value in habit_data.model_dump(exclude_unset=True).items():
-            setattr(habit, field, value)
+        values = habit_data.model_dump(exclude_unset=True)
+        if values:
+            values["sync_seq"] = db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+        habit = db.execute(update_habits_stmt(user_id, [habit_id], values)).first()
+        if habit is None:
+            db.rollback()  # no existe: sin subir la version
+            return None
+        if values:
+            queue_event(db, user_id, "habit.updated", values["sync_seq"], [habit_id])
         db.commit()
-        db.refresh(habit)
 
         return habit
 
@@ -61,8 +183,139 @@ class HabitService:
         """
         Eliminar un habito en la db
         """
-        habit = HabitService.get_habit(db, user_id, habit_id)
-        db.delete(habit)
+        seq = db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+        habit = db.execute(delete_habits_stmt(user_id, [habit_id])).first()
+        if habit is None:
+            db.rollback()
+            return None
+        db.execute(tombstone_stmt(user_id, [habit_id], seq))
+        queue_event(db, user_id, "habit.deleted", seq, [habit_id])
+        db.commit()
+
+        return habit
+
+    @staticmethod
+    def bulk_update_habits(db: Session, user_id: int, items: list[HabitBulkUpdateItem]) -> list[HabitResponse] | None:
+        """
+        Aplicar muchos cambios parciales en una transaccion (None y rollback si algun habito no existe)
+        """
+        seq = db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+        rows = []
+        for values, habit_ids in group_bulk_updates(items).items():
+            rows.extend(db.execute(update_habits_stmt(user_id, habit_ids, {**dict(values), "sync_seq": seq})).all())
+        if len({row.id for row in rows}) != len({item.id for item in items}):
+            db.rollback()
+            return None
+        queue_event(db, user_id, "habit.updated", seq, sorted({row.id for row in rows}))
         db.commit()
 
-        return habit
\ No newline at end of file
+        return rows
+
+
+class AsyncHabitService:
+    # mismas operaciones que HabitService sobre AsyncSession (DATABASE_ASYNC=true)
+
+    @staticmethod
+    async def get_habits(db: AsyncSession, user_id: int) -> list[HabitResponse]:
+        """
+        Obtener lista de habitos del usuario
+        """
+        result = await db.execute(select(Habit).where(Habit.user_id == user_id))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_habits_page(db: AsyncSession, user_id: int, limit: int, cursor: str | None = None,
+                              category: HabitCategory | None = None, is_public: bool | None = None) -> tuple[list, str | None]:
+        """
+        Obtener una pagina de habitos del usuario y el cursor de la siguiente (None si es la ultima)
+        """
+        rows = (await db.execute(habits_page_query(user_id, limit, cursor, category, is_public))).all()
+        return split_page(rows, limit)
+
+    @staticmethod
+    async def get_habits_version(db: AsyncSession, user_id: int) -> int:
+        """
+        Version actual de la coleccion de habitos del usuario (0 si nunca escribio)
+        """
+        return await db.scalar(habits_version_query(user_id)) or 0
+
+    @staticmethod
+    async def get_habit_updated_at(db: AsyncSession, user_id: int, habit_id: int) -> datetime | None:
+        """
+        updated_at del habito del usuario (None si no existe o es ajeno)
+        """
+        return await db.scalar(habit_updated_query(user_id, habit_id))
+
+    @staticmethod
+    async def get_habit(db: AsyncSession, user_id: int, habit_id: int):
+        """
+        Obtener habito del usuario (fila con las columnas de HabitResponse)
+        """
+        return (await db.execute(habit_query(user_id, habit_id))).first()
+
+    @staticmethod
+    async def create_habit(db: AsyncSession, user_id: int, habit_data: HabitCreate) -> HabitResponse:
+        """
+        Crear un nuevo habito en la db
+        """
+        new_habit = Habit(user_id=user_id, **habit_data.model_dump())
+
+        new_habit.sync_seq = await db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+        db.add(new_habit)
+        await db.flush()  # id para el evento
+        queue_event(db, user_id, "habit.created", new_habit.sync_seq, [new_habit.id])
+        await db.commit()
+        await db.refresh(new_habit)
+
+        return new_habit
+
+    @staticmethod
+    async def update_habit(db: AsyncSession, user_id: int, habit_id: int, habit_data: HabitUpdate) -> HabitResponse:
+        """
+        Actualizar un habito en la db
+        """
+        values = habit_data.model_dump(exclude_unset=True)
+        if values:
+            values["sync_seq"] = await db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+        habit = (await db.execute(update_habits_stmt(user_id, [habit_id], values))).first()
+        if habit is None:
+            await db.rollback()
+            return None
+        if values:
+            queue_event(db, user_id, "habit.updated", values["sync_seq"], [habit_id])
+        await db.commit()
+
+        return habit
+
+    @staticmethod
+    async def delete_habit(db: AsyncSession, user_id: int, habit_id: int) -> HabitResponse:
+        """
+        Eliminar un habito en la db
+        """
+        seq = await db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+        habit = (await db.execute(delete_habits_stmt(user_id, [habit_id]))).first()
+        if habit is None:
+            await db.rollback()
+            return None
+        await db.execute(tombstone_stmt(user_id, [habit_id], seq))
+        queue_event(db, user_id, "habit.deleted", seq, [habit_id])
+        await db.commit()
+
+        return habit
+
+    @staticmethod
+    async def bulk_update_habits(db: AsyncSession, user_id: int, items: list[HabitBulkUpdateItem]) -> list[HabitResponse] | None:
+        """
+        Aplicar muchos cambios parciales en una transaccion (None y rollback si algun habito no existe)
+        """
+        seq = await db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+        rows = []
+        for values, habit_ids in group_bulk_updates(items).items():
+            rows.extend((await db.execute(update_habits_stmt(user_id, habit_ids, {**dict(values), "sync_seq": seq}))).all())
+        if len({row.id for row in rows}) != len({item.id for item in items}):
+            await db.rollback()
+            return None
+        queue_event(db, user_id, "habit.updated", seq, sorted({row.id for row in rows}))
+        await db.commit()
+
+        return rows
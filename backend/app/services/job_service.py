@@ -0,0 +1,253 @@
+# Cola de trabajos en segundo plano sobre la tabla jobs, sin broker externo
+#
+# Cada worker toma trabajos con SELECT ... FOR UPDATE SKIP LOCKED: varios workers (procesos o
+# maquinas) consultan la misma tabla sin bloquearse entre si ni tomar dos veces el mismo trabajo.
+# Un trabajo corre en la misma transaccion que lo marca como terminado; si falla se reprograma
+# con backoff exponencial hasta max_attempts.
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.models.jobs import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOBS_PROCESSED = Counter("jobs_processed_total", "Trabajos en segundo plano ejecutados por tipo y resultado")
+
+
+# segundos hasta el proximo intento despues de `attempts` intentos fallidos
+def backoff_seconds(attempts: int) -> int:
+    return min(settings.JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), settings.JOB_RETRY_MAX_SECONDS)
+
+def _insert(dialect_name: str):
+    return postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+
+# ids en lotes de JOB_BATCH_SIZE recorriendo por primary key (keyset), sin cargar todos en memoria
+def id_batches(db: Session, query, column):
+    last_id = 0
+    while True:
+        ids = db.scalars(query.where(column > last_id).order_by(column).limit(settings.JOB_BATCH_SIZE)).all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+class JobService:
+
+    @staticmethod
+    def enqueue(db: Session, kind: str, payload: dict | None = None, run_at: datetime | None = None,
+                dedupe_key: str | None = None) -> None:
+        """
+        Agregar un trabajo a la cola (sin commit); con dedupe_key se ignora si ya existe
+        """
+        stmt = _insert(db.bind.dialect.name)(Job).values(
+            kind=kind,
+            payload=payload or {},
+            status=JobStatus.pending,
+            run_at=run_at or datetime.utcnow(),
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            dedupe_key=dedupe_key,
+        )
+        if dedupe_key is not None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[Job.dedupe_key])
+        db.execute(stmt)
+
+    @staticmethod
+    def enqueue_many(db: Session, kind: str, payloads: list[dict]) -> None:
+        """
+        Agregar muchos trabajos del mismo tipo en un solo INSERT (sin commit)
+        """
+        if not payloads:
+            return
+        now = datetime.utcnow()
+        db.execute(_insert(db.bind.dialect.name)(Job), [
+            {"kind": kind, "payload": payload, "status": JobStatus.pending, "run_at": now,
+             "max_attempts": settings.JOB_MAX_ATTEMPTS}
+            for payload in payloads
+        ])
+
+    @staticmethod
+    def claim(db: Session, worker_id: str, limit: int) -> list:
+        """
+        Tomar hasta `limit` trabajos vencidos y marcarlos running (commit incluido)
+        """
+        now = datetime.utcnow()
+        due = (
+            select(Job.id)
+            .where(Job.status == JobStatus.pending, Job.run_at <= now)
+            .order_by(Job.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)  # los que ya tomo otro worker se saltan, no se esperan
+        )
+        jobs = db.execute(
+            update(Job)
+            .where(Job.id.in_(due.scalar_subquery()))
+            .values(status=JobStatus.running, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+            .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return jobs
+
+    @staticmethod
+    def heartbeat(db: Session, job_id: int, worker_id: str) -> bool:
+        """
+        Renovar locked_at justo antes de ejecutar (commit incluido), False si el trabajo ya no es de este worker
+
+        Los trabajos de un mismo claim corren uno detras de otro: sin esto release_stale devolveria
+        a la cola los que esperan su turno y correrian dos veces
+        """
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.running, Job.locked_by == worker_id)
+            .values(locked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    def mark_done(db: Session, job_id: int, worker_id: str) -> bool:
+        """
+        Marcar terminado (sin commit: va en la transaccion del trabajo), False si otro worker lo retomo
+        """
+        result = db.execute(
+            update(Job).where(Job.id == job_id, Job.locked_by == worker_id)
+            .values(status=JobStatus.done, locked_by=None, locked_at=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def mark_failed(db: Session, job, worker_id: str, error: str) -> None:
+        """
+        Reprogramar con backoff o dejarlo failed si agoto los intentos (commit incluido)
+        """
+        values = {"locked_by": None, "locked_at": None, "last_error": error[-4000:]}
+        if job.attempts >= job.max_attempts:
+            values["status"] = JobStatus.failed
+        else:
+            values.update(status=JobStatus.pending, run_at=datetime.utcnow() + timedelta(seconds=backoff_seconds(job.attempts)))
+        db.execute(
+            update(Job).where(Job.id == job.id, Job.locked_by == worker_id).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def release_stale(db: Session) -> int:
+        """
+        Devolver a la cola los trabajos running de workers que murieron (commit incluido)
+        """
+        limit = datetime.utcnow() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+        result = db.execute(
+            update(Job)
+            .where(Job.status == JobStatus.running, Job.locked_at < limit)
+            .values(status=JobStatus.pending, run_at=datetime.utcnow(), locked_by=None, locked_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def purge_finished(db: Session) -> int:
+        """
+        Borrar trabajos done/failed mas viejos que JOB_RETENTION_DAYS (sin commit)
+        """
+        limit = datetime.utcnow() - timedelta(days=settings.JOB_RETENTION_DAYS)
+        result = db.execute(
+            delete(Job)
+            .where(Job.status.in_([JobStatus.done, JobStatus.failed]), Job.updated_at < limit)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+class JobWorker:
+    # bucle de un worker: programa los periodicos, rescata colgados y ejecuta lo vencido
+
+    def __init__(self, session_factory, handlers: dict, periodic: tuple = (), worker_id: str | None = None):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.periodic = periodic  # (kind, cada cuantos segundos)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self._scheduled = {}  # kind -> ultimo periodo programado por este worker
+
+    def schedule_periodic(self, db: Session) -> None:
+        now = time.time()
+        for kind, every in self.periodic:
+            period = int(now // every)
+            if self._scheduled.get(kind) == period:
+                continue
+            # la dedupe_key deja un solo trabajo por periodo aunque todos los workers lo intenten
+            JobService.enqueue(db, kind, dedupe_key=f"{kind}:{period}")
+            self._scheduled[kind] = period
+        db.commit()
+
+    def run_job(self, job) -> None:
+        handler = self.handlers.get(job.kind)
+        with self.session_factory() as db:
+            if not JobService.heartbeat(db, job.id, self.worker_id):
+                logger.warning("El trabajo %s (%s) volvio a la cola antes de ejecutarse, se omite", job.id, job.kind)
+                return
+            try:
+                if handler is None:
+                    raise LookupError(f"No hay handler para el trabajo {job.kind!r}")
+                handler(db, job.payload)
+                if not JobService.mark_done(db, job.id, self.worker_id):
+                    # tardo mas que JOB_LOCK_TIMEOUT_SECONDS y otro worker lo tomo: se descarta este resultado
+                    db.rollback()
+                    logger.warning("El trabajo %s (%s) fue retomado por otro worker, se descarta", job.id, job.kind)
+                    JOBS_PROCESSED.inc(kind=job.kind, result="lost")
+                    return
+                db.commit()
+                JOBS_PROCESSED.inc(kind=job.kind, result="done")
+            except Exception:
+                db.rollback()
+                logger.exception("Fallo el trabajo %s (%s), intento %d/%d", job.id, job.kind, job.attempts, job.max_attempts)
+                JobService.mark_failed(db, job, self.worker_id, traceback.format_exc())
+                JOBS_PROCESSED.inc(kind=job.kind, result="error")
+
+    def run_once(self) -> int:
+        """
+        Una vuelta del bucle, retorna cuantos trabajos ejecuto
+        """
+        with self.session_factory() as db:
+            self.schedule_periodic(db)
+            JobService.release_stale(db)
+            jobs = JobService.claim(db, self.worker_id, settings.JOB_CLAIM_SIZE)
+        for job in jobs:
+            self.run_job(job)
+        return len(jobs)
+
+    def run_forever(self) -> None:
+        logger.info("Worker de trabajos %s iniciado", self.worker_id)
+        while not self.stopping.is_set():
+            try:
+                executed = self.run_once()
+            except Exception:
+                # DB caida u otro error transitorio: esperar y seguir
+                logger.exception("Error en el worker de trabajos")
+                executed = 0
+            if not executed:
+                self.stopping.wait(settings.JOB_POLL_SECONDS)
+
+    def start_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run_forever, name="job-worker", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.stopping.set()
@@ -0,0 +1,83 @@
+# Trabajos periodicos de gamificacion y sus handlers: handler(db, payload)
+#
+# Los periodicos solo reparten: buscan los usuarios afectados y encolan un trabajo por cada
+# JOB_BATCH_SIZE usuarios, asi cada transaccion es corta y varios workers avanzan en paralelo.
+
+from datetime import timedelta
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.commands.rebuild_stats import rebuild_user_stats
+from app.core.localtime import latest_today, local_today
+from app.models.stats import HabitStats, UserStats
+from app.models.user import User
+from app.services.job_service import JobService, id_batches
+from app.services.sync_service import SyncService
+from app.services.token_service import TokenService
+
+
+def _stale_streak_filter(model, today):
+    # la racha se corta si la ultima completion fue antes de ayer
+    return model.current_streak > 0, model.last_completion_day < today - timedelta(days=1)
+
+
+def schedule_streak_resets(db: Session, payload: dict) -> None:
+    # candidatos con el "hoy" mas adelantado de cualquier zona; close_streaks usa el de cada usuario
+    today = latest_today()
+    query = select(UserStats.user_id).where(*_stale_streak_filter(UserStats, today))
+    batches = id_batches(db, query, UserStats.user_id)
+    JobService.enqueue_many(db, "close_streaks", [{"user_ids": user_ids} for user_ids in batches])
+
+def close_streaks(db: Session, payload: dict) -> None:
+    # los endpoints ya ocultan las rachas vencidas (_visible_streak); esto las deja en 0 en la DB
+    # un UPDATE por zona horaria del lote, cada una con su dia local
+    by_timezone = {}
+    for user_id, tz in db.execute(select(User.id, User.timezone).where(User.id.in_(payload["user_ids"]))):
+        by_timezone.setdefault(tz, []).append(user_id)
+    for tz, user_ids in by_timezone.items():
+        today = local_today(tz)
+        for model in (HabitStats, UserStats):
+            db.execute(
+                update(model)
+                .where(model.user_id.in_(user_ids), *_stale_streak_filter(model, today))
+                .values(current_streak=0)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def schedule_stats_rebuild(db: Session, payload: dict) -> None:
+    batches = id_batches(db, select(User.id), User.id)
+    JobService.enqueue_many(db, "rebuild_stats", [{"user_ids": user_ids} for user_ids in batches])
+
+def rebuild_stats(db: Session, payload: dict) -> None:
+    # corrige la deriva de los agregados incrementales (backfills, bugs) por lote de usuarios
+    rebuild_user_stats(db, payload["user_ids"])
+
+
+def purge_jobs(db: Session, payload: dict) -> None:
+    JobService.purge_finished(db)
+
+def purge_tombstones(db: Session, payload: dict) -> None:
+    SyncService.purge_tombstones(db)
+
+def purge_refresh_tokens(db: Session, payload: dict) -> None:
+    TokenService.purge_expired(db)
+
+
+HANDLERS = {
+    "schedule_streak_resets": schedule_streak_resets,
+    "close_streaks": close_streaks,
+    "schedule_stats_rebuild": schedule_stats_rebuild,
+    "rebuild_stats": rebuild_stats,
+    "purge_jobs": purge_jobs,
+    "purge_tombstones": purge_tombstones,
+    "purge_refresh_tokens": purge_refresh_tokens,
+}
+
+# (kind, cada cuantos segundos)
+PERIODIC = (
+    ("schedule_streak_resets", 3600),
+    ("schedule_stats_rebuild", 24 * 3600),
+    ("purge_jobs", 24 * 3600),
+    ("purge_tombstones", 24 * 3600),
+    ("purge_refresh_tokens", 24 * 3600),
+)
@@ -0,0 +1,268 @@
+# Clasificaciones de habitos publicos (global y por categoria) para las ultimas 24 horas, los ultimos 7 dias
+# y todo el tiempo
+#
+# Cada worker mantiene en memoria una lista ordenada por puntos que se actualiza con cada
+# completion que registra, y se reconcilia contra PostgreSQL cada LEADERBOARD_RECONCILE_SECONDS
+# (eso incorpora lo escrito por otros workers).
+# Las ventanas de dia y semana son moviles con resolucion de una hora: los puntos se guardan tambien por
+# hora y, al avanzar la hora, los de la hora que sale de la ventana se restan de sus listas.
+# El reconcile corre en un hilo aparte, uno a la vez por worker; las completions que llegan mientras lee
+# se guardan y se vuelven a sumar sobre las listas nuevas.
+# Sumar puntos, top-N y "mi posicion" son O(log n) (SortedList); ningun request hace GROUP BY sobre
+# habit_completions.
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sortedcontainers import SortedList
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core import database
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.habits import Habit, HabitCategory, HabitCompletion
+from app.models.stats import HabitStats
+from app.models.user import User
+from app.services.event_service import event_hub
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ("day", "week", "all")
+WINDOW_HOURS = {"day": 24, "week": 24 * 7}  # "all" no vence
+
+
+class Leaderboard:
+    # puntos por usuario + lista ordenada de (-puntos, user_id)
+
+    def __init__(self, scores: dict | None = None):
+        self._scores = {user_id: points for user_id, points in (scores or {}).items() if points > 0}
+        self._order = SortedList((-points, user_id) for user_id, points in self._scores.items())
+
+    def add(self, user_id: int, points: int) -> None:
+        # points negativos: puntos que salen de la ventana; sin puntos el usuario deja la lista
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._order.remove((-old, user_id))
+        new = (old or 0) + points
+        if new > 0:
+            self._scores[user_id] = new
+            self._order.add((-new, user_id))
+
+    def top(self, limit: int) -> list[tuple[int, int]]:
+        return [(user_id, -points) for points, user_id in self._order.islice(0, limit)]
+
+    def rank(self, user_id: int) -> tuple[int, int] | None:
+        points = self._scores.get(user_id)
+        if points is None:
+            return None
+        # empates: comparten la posicion del primero con esos puntos
+        return self._order.bisect_left((-points, -1)) + 1, points
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+def hour_of(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+# primera hora dentro de la ventana movil que termina en la hora `now`; "all" no tiene inicio
+def window_start(window: str, now: datetime) -> datetime | None:
+    hours = WINDOW_HOURS.get(window)
+    return None if hours is None else now - timedelta(hours=hours - 1)
+
+
+class _Registry:
+
+    def __init__(self):
+        self.boards: dict = {}  # (window, categoria o None) -> Leaderboard
+        self.hours: dict = {}  # hora -> {(user_id, categoria): puntos}, las horas de la ventana semanal
+        self.now = None  # hora hasta la que se aplicaron los vencimientos
+        self.usernames = TTLCache(maxsize=settings.LEADERBOARD_USERNAME_CACHE_SIZE, ttl=settings.LEADERBOARD_RECONCILE_SECONDS)
+        self.reconciled_at = 0.0
+        self.deltas = None  # completions registradas durante un reconcile (None si no hay uno en curso)
+        self.lock = threading.Lock()
+        self.reconcile_lock = threading.Lock()  # un solo reconcile a la vez
+
+    def board(self, window: str, category: HabitCategory | None) -> Leaderboard:
+        return self.boards.setdefault((window, category), Leaderboard())
+
+    def advance(self, now: datetime) -> None:
+        # con self.lock tomado: restar las horas que salieron de cada ventana desde el ultimo avance
+        now = hour_of(now)
+        if self.now is None or now <= self.now:
+            self.now = self.now or now
+            return
+        for window in WINDOW_HOURS:
+            old_start, new_start = window_start(window, self.now), window_start(window, now)
+            for hour in [hour for hour in self.hours if old_start <= hour < new_start]:
+                for (user_id, category), points in self.hours[hour].items():
+                    for scope in (None, category):
+                        self.board(window, scope).add(user_id, -points)
+        week_start = window_start("week", now)
+        self.hours = {hour: points for hour, points in self.hours.items() if hour >= week_start}
+        self.now = now
+
+    def add(self, user_id: int, completions: list, now: datetime) -> None:
+        # con self.lock tomado
+        self.advance(now)
+        for category, completed_at, points in completions:
+            hour = hour_of(completed_at)
+            if hour >= window_start("week", self.now):
+                bucket = self.hours.setdefault(hour, {})
+                bucket[(user_id, category)] = bucket.get((user_id, category), 0) + points
+            for window in WINDOWS:
+                start = window_start(window, self.now)
+                if start is not None and hour < start:
+                    continue  # completion fuera de la ventana
+                for scope in (None, category):
+                    self.board(window, scope).add(user_id, points)
+
+
+_registry = _Registry()
+
+# un usuario que cambia (por ejemplo su username) se vuelve a leer en la proxima clasificacion
+event_hub.on("user.changed", lambda item: _registry.usernames.pop(item["user_id"]))
+
+# hora de completed_at en SQL (la hora vuelve como datetime en PostgreSQL y como texto en SQLite)
+def _hour_column(dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.date_trunc("hour", HabitCompletion.completed_at)
+    return func.strftime("%Y-%m-%d %H:00:00", HabitCompletion.completed_at)
+
+
+def _reconcile_thread() -> None:
+    try:
+        with database.ReplicaSessionLocal() as db:
+            LeaderboardService.reconcile(db, max_age=settings.LEADERBOARD_RECONCILE_SECONDS)
+    except Exception:
+        # se reintenta con el proximo request que vea las listas vencidas
+        logger.exception("No se pudieron reconciliar las clasificaciones")
+
+
+class LeaderboardService:
+
+    @staticmethod
+    def record_completions(user_id: int, completions: list[tuple[HabitCategory, datetime, int]]) -> None:
+        """
+        Sumar completions de habitos publicos (categoria, completed_at, puntos) ya guardadas en la DB
+        """
+        with _registry.lock:
+            _registry.add(user_id, completions, datetime.utcnow())
+            if _registry.deltas is not None:
+                _registry.deltas.append((user_id, completions))
+
+    @staticmethod
+    def reconcile(db: Session, max_age: float | None = None) -> bool:
+        """
+        Reconstruir todas las clasificaciones desde PostgreSQL, retorna False si no hizo falta
+
+        Uno a la vez: si otro hilo esta reconciliando se espera y, con max_age, se omite si quedo al dia
+        """
+        with _registry.reconcile_lock:
+            if max_age is not None and time.monotonic() - _registry.reconciled_at <= max_age:
+                return False
+            with _registry.lock:
+                _registry.deltas = []
+            try:
+                LeaderboardService._rebuild(db)
+            finally:
+                with _registry.lock:
+                    _registry.deltas = None
+        return True
+
+    @staticmethod
+    def reconcile_in_background() -> None:
+        """
+        Lanzar un reconcile en un hilo con su propia sesion, si no hay uno en curso
+        """
+        if _registry.reconcile_lock.locked():
+            return
+        threading.Thread(target=_reconcile_thread, name="leaderboard-reconcile", daemon=True).start()
+
+    @staticmethod
+    def _rebuild(db: Session) -> None:
+        now = hour_of(datetime.utcnow())
+        totals = {}  # (window, categoria o None) -> {user_id: puntos}
+
+        def accumulate(window, rows):
+            for user_id, category, points in rows:
+                for scope in (None, category):
+                    scores = totals.setdefault((window, scope), {})
+                    scores[user_id] = scores.get(user_id, 0) + int(points)
+
+        # todo el tiempo: desde los agregados materializados por habito, sin tocar habit_completions
+        accumulate("all", db.execute(
+            select(HabitStats.user_id, Habit.category, func.sum(HabitStats.total_points))
+            .join(Habit, Habit.id == HabitStats.habit_id)
+            .where(Habit.is_public.is_(True))
+            .group_by(HabitStats.user_id, Habit.category)
+        ))
+
+        # ultimos 7 dias por hora: solo el rango reciente de completed_at
+        hour_column = _hour_column(db.get_bind().dialect.name)
+        recent = db.execute(
+            select(HabitCompletion.user_id, Habit.category, hour_column, func.sum(HabitCompletion.points_earned))
+            .join(Habit, Habit.id == HabitCompletion.habit_id)
+            .where(Habit.is_public.is_(True), HabitCompletion.completed_at >= window_start("week", now))
+            .group_by(HabitCompletion.user_id, Habit.category, hour_column)
+        ).all()
+        hours = {}
+        for user_id, category, hour, points in recent:
+            hour = hour if isinstance(hour, datetime) else datetime.fromisoformat(hour)
+            hours.setdefault(hour, {})[(user_id, category)] = int(points)
+        day_start = window_start("day", now)
+        accumulate("week", [(user_id, category, points) for points_by_user in hours.values() for (user_id, category), points in points_by_user.items()])
+        accumulate("day", [
+            (user_id, category, points)
+            for hour, points_by_user in hours.items() if hour >= day_start
+            for (user_id, category), points in points_by_user.items()
+        ])
+
+        with _registry.lock:
+            _registry.boards = {key: Leaderboard(scores) for key, scores in totals.items()}
+            _registry.hours = hours
+            _registry.now = now
+            # lo registrado desde que empezo la lectura va sobre las listas nuevas
+            # (una completion confirmada justo antes de los SELECT puede contar dos veces hasta el proximo reconcile)
+            for user_id, completions in _registry.deltas:
+                _registry.add(user_id, completions, datetime.utcnow())
+            _registry.reconciled_at = time.monotonic()
+
+    @staticmethod
+    def get_leaderboard(db: Session, user_id: int, window: str, category: HabitCategory | None, limit: int) -> dict:
+        """
+        Top-N de una clasificacion y la posicion del usuario
+        """
+        if not _registry.reconciled_at:
+            # todavia sin listas: el primer request espera (los concurrentes esperan ese mismo reconcile)
+            LeaderboardService.reconcile(db, max_age=settings.LEADERBOARD_RECONCILE_SECONDS)
+        elif time.monotonic() - _registry.reconciled_at > settings.LEADERBOARD_RECONCILE_SECONDS:
+            LeaderboardService.reconcile_in_background()  # se responde con las listas actuales
+
+        with _registry.lock:
+            _registry.advance(datetime.utcnow())
+            board = _registry.board(window, category)
+            top = board.top(limit)
+            me = board.rank(user_id)
+
+        # usernames: una sola query para los que no estan en memoria
+        usernames = {uid: _registry.usernames.get(uid) for uid, _ in top}
+        missing = [uid for uid, username in usernames.items() if username is None]
+        if missing:
+            for uid, username in db.execute(select(User.id, User.username).where(User.id.in_(missing))):
+                usernames[uid] = username
+                _registry.usernames.set(uid, username)
+
+        entries = []
+        for position, (uid, points) in enumerate(top, start=1):
+            # con empates la posicion es la del primero con esos puntos
+            rank = entries[-1]["rank"] if entries and entries[-1]["points"] == points else position
+            entries.append({"rank": rank, "user_id": uid, "username": usernames.get(uid) or "", "points": points})
+
+        return {
+            "window": window,
+            "category": category,
+            "entries": entries,
+            "me": {"rank": me[0], "points": me[1]} if me else None,
+        }
@@ -0,0 +1,161 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core.localtime import key_day, local_today
+from app.models.habits import Habit
+from app.models.stats import HabitStats, UserStats
+from app.schemas.completion import CompletionResponse
+from app.schemas.stats import HabitStatsResponse, UserStatsResponse
+from app.services.completion_buffer import completion_buffer
+
+
+STREAK_FIELDS = ("current_streak", "longest_streak", "last_completion_day")
+
+
+def _insert(dialect_name: str):
+    return postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+
+# aplicar una completion a un agregado (HabitStats o UserStats)
+def apply_completion(stats, day: date, points: int) -> None:
+    stats.total_points += points
+    stats.total_completions += 1
+    apply_streak(stats, day)
+
+def apply_streak(stats, day: date) -> None:
+    last = stats.last_completion_day
+    if last is None or day > last:
+        if last is not None and day == last + timedelta(days=1):
+            stats.current_streak += 1
+        else:
+            stats.current_streak = 1
+        stats.last_completion_day = day
+        stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    # mismo dia o un dia anterior (backfill offline): solo suma puntos,
+    # la racha historica exacta se recalcula con app.commands.rebuild_stats
+
+# sumar puntos y completions con INSERT ... ON CONFLICT DO UPDATE: la fila se crea o se bloquea en un paso,
+# dos primeras completions concurrentes no chocan en la primary key. Retorna las filas con la racha anterior
+def _upsert_totals(db: Session, model, rows: list[dict]) -> list:
+    stmt = _insert(db.bind.dialect.name)(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(model.__table__.primary_key.columns),
+        set_={
+            "total_points": model.total_points + stmt.excluded.total_points,
+            "total_completions": model.total_completions + stmt.excluded.total_completions,
+        },
+    ).returning(*model.__table__.primary_key.columns, *(getattr(model, field) for field in STREAK_FIELDS))
+    return [SimpleNamespace(**row._asdict()) for row in db.execute(stmt, rows)]
+
+def empty_stats(model, **keys):
+    return model(
+        **keys,
+        total_points=0,
+        total_completions=0,
+        current_streak=0,
+        longest_streak=0,
+        last_completion_day=None,
+    )
+
+# la racha guardada solo sigue viva si la ultima completion fue hoy o ayer (dias locales del usuario)
+def _visible_streak(stats, today: date) -> int:
+    if stats.last_completion_day is None or stats.last_completion_day < today - timedelta(days=1):
+        return 0
+    return stats.current_streak
+
+# completions aceptadas por el buffer write-behind que todavia no estan en los agregados de la DB
+def _apply_pending(response, pending: list[dict]) -> None:
+    for event in sorted(pending, key=lambda e: e["completed_at"]):
+        apply_completion(response, key_day(event["local_day"]), event["points_earned"])
+
+def _with_today(response, stats, today: date):
+    response.current_streak = _visible_streak(stats, today)
+    response.completed_today = stats.last_completion_day == today
+    return response
+
+
+class StatsService:
+
+    @staticmethod
+    def record_completions(db: Session, user_id: int, completions: list[CompletionResponse]) -> None:
+        """
+        Actualizar los agregados del usuario y de sus habitos, dentro de la transaccion del INSERT
+        """
+        completions = sorted(completions, key=lambda c: c.completed_at)
+        totals = {}
+        for completion in completions:
+            points, count = totals.get(completion.habit_id, (0, 0))
+            totals[completion.habit_id] = (points + completion.points_earned, count + 1)
+
+        # primero la fila del usuario: serializa las escrituras del usuario (tambien contra rebuild_user_stats),
+        # despues sus habitos en orden de id
+        user_stats = _upsert_totals(db, UserStats, [{
+            "user_id": user_id,
+            "total_points": sum(points for points, _ in totals.values()),
+            "total_completions": len(completions),
+        }])[0]
+        habit_stats = {
+            stats.habit_id: stats
+            for stats in _upsert_totals(db, HabitStats, [
+                {"habit_id": habit_id, "user_id": user_id, "total_points": points, "total_completions": count}
+                for habit_id, (points, count) in sorted(totals.items())
+            ])
+        }
+
+        # rachas sobre los valores bloqueados, en orden de completed_at; solo se escriben las que cambian
+        before = {habit_id: tuple(getattr(stats, f) for f in STREAK_FIELDS) for habit_id, stats in habit_stats.items()}
+        user_before = tuple(getattr(user_stats, f) for f in STREAK_FIELDS)
+        for completion in completions:
+            day = key_day(completion.local_day)
+            apply_streak(habit_stats[completion.habit_id], day)
+            apply_streak(user_stats, day)
+
+        changed = [
+            {"habit_id": habit_id, **{f: getattr(stats, f) for f in STREAK_FIELDS}}
+            for habit_id, stats in habit_stats.items()
+            if tuple(getattr(stats, f) for f in STREAK_FIELDS) != before[habit_id]
+        ]
+        if changed:
+            db.execute(update(HabitStats), changed)  # UPDATE por primary key, en lote
+        if tuple(getattr(user_stats, f) for f in STREAK_FIELDS) != user_before:
+            db.execute(
+                update(UserStats)
+                .where(UserStats.user_id == user_id)
+                .values(**{f: getattr(user_stats, f) for f in STREAK_FIELDS})
+            )
+
+    @staticmethod
+    def get_user_stats(db: Session, user_id: int, tz: str) -> UserStatsResponse:
+        """
+        Obtener puntos y rachas del usuario (una lectura por primary key)
+        """
+        stats, pending = completion_buffer.read_with_pending(
+            lambda: db.get(UserStats, user_id, populate_existing=True), user_id
+        )
+        response = UserStatsResponse.model_validate(stats) if stats is not None else UserStatsResponse(user_id=user_id)
+        _apply_pending(response, pending)
+        return _with_today(response, response, local_today(tz))
+
+    @staticmethod
+    def get_habit_stats(db: Session, user_id: int, habit_id: int, tz: str) -> HabitStatsResponse:
+        """
+        Obtener puntos y rachas de un habito del usuario
+        """
+        query = (
+            select(HabitStats)
+            .where(HabitStats.habit_id == habit_id, HabitStats.user_id == user_id)
+            .execution_options(populate_existing=True)
+        )
+        stats, pending = completion_buffer.read_with_pending(lambda: db.execute(query).scalars().first(), user_id)
+        pending = [event for event in pending if event["habit_id"] == habit_id]
+        if stats is None and not pending:
+            # sin completions todavia: solo confirmar que el habito es del usuario
+            owned = db.execute(
+                select(Habit.id).where(Habit.id == habit_id, Habit.user_id == user_id)
+            ).first()
+            return HabitStatsResponse(habit_id=habit_id) if owned else None
+        response = HabitStatsResponse.model_validate(stats) if stats is not None else HabitStatsResponse(habit_id=habit_id)
+        _apply_pending(response, pending)
+        return _with_today(response, response, local_today(tz))
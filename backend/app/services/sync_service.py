@@ -0,0 +1,169 @@
+# Sincronizacion incremental para clientes offline
+#
+# Cada escritura de habitos o completions sube HabitVersion.sync_seq del usuario y guarda el valor
+# en las filas escritas (habits.sync_seq, habit_completions.sync_seq, habit_tombstones.sync_seq).
+# GET /sync?since=N devuelve lo que tiene sync_seq > N usando los indices (user_id, sync_seq).
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.models.habits import Habit, HabitCompletion, HabitTombstone, HabitVersion
+from app.schemas.completion import CompletionBatchItem
+from app.schemas.sync import SyncUpload
+from app.services.completion_service import CompletionService
+from app.services.event_service import queue_event
+from app.services.habit_service import (
+    HABIT_RESPONSE_COLUMNS, bump_habits_version_stmt, delete_habits_stmt, group_bulk_updates,
+    tombstone_stmt, update_habits_stmt,
+)
+
+SYNC_COMPLETION_COLUMNS = (
+    HabitCompletion.id, HabitCompletion.habit_id, HabitCompletion.user_id, HabitCompletion.completed_at,
+    HabitCompletion.time_spent, HabitCompletion.points_earned, HabitCompletion.local_day,
+)
+
+
+class SyncService:
+
+    @staticmethod
+    def get_changes(db: Session, user_id: int, since: int | None, limit: int) -> dict:
+        """
+        Habitos, borrados y completions con sync_seq > since (todo si since es None o ya no alcanza)
+        """
+        version = db.execute(
+            select(HabitVersion.sync_seq, HabitVersion.sync_floor).where(HabitVersion.user_id == user_id)
+        ).first()
+        upper, floor = (version.sync_seq, version.sync_floor) if version else (0, 0)
+        # token negativo: pagina siguiente de un snapshot; vale aunque sea anterior a sync_floor
+        # (el snapshot ya no tenia los habitos de esos tombstones purgados)
+        snapshot = since is not None and since < 0
+        if snapshot:
+            since = -since - 1
+        # sin token o con uno anterior a los tombstones purgados: snapshot completo
+        full = since is None or (not snapshot and since < floor)
+        start = -1 if full else since  # -1: incluye filas anteriores a sync_seq (valor 0)
+
+        # completions paginadas sin partir un mismo sync_seq (un request escribe hasta 500 con el mismo valor)
+        query = (
+            select(*SYNC_COMPLETION_COLUMNS, HabitCompletion.sync_seq)
+            .where(HabitCompletion.user_id == user_id, HabitCompletion.sync_seq > start)
+            .order_by(HabitCompletion.sync_seq, HabitCompletion.id)
+        )
+        completions = db.execute(query.where(HabitCompletion.sync_seq <= upper).limit(limit + 1)).all()
+        has_more = len(completions) > limit
+        token = upper
+        if has_more:
+            token = completions[limit].sync_seq - 1
+            if token > start:
+                completions = [c for c in completions[:limit] if c.sync_seq <= token]
+            else:
+                # un solo sync_seq con mas de limit filas: va completo
+                token = completions[0].sync_seq
+                completions = db.execute(query.where(HabitCompletion.sync_seq == token)).all()
+
+        # habitos y borrados son pocos: van completos hasta upper en la primera pagina
+        # (repetirlos en las siguientes es inofensivo, el cliente los aplica por id)
+        habits = db.execute(
+            select(*HABIT_RESPONSE_COLUMNS)
+            .where(Habit.user_id == user_id, Habit.sync_seq > start, Habit.sync_seq <= upper)
+            .order_by(Habit.sync_seq, Habit.id)
+        ).all()
+        deleted = [] if full else db.scalars(
+            select(HabitTombstone.habit_id)
+            .where(HabitTombstone.user_id == user_id, HabitTombstone.sync_seq > start, HabitTombstone.sync_seq <= upper)
+        ).all()
+
+        if has_more and (full or snapshot):
+            token = -token - 1
+        return {
+            "token": token,
+            "full": full,
+            "has_more": has_more,
+            "habits": habits,
+            "deleted_habit_ids": deleted,
+            "completions": completions,
+        }
+
+    @staticmethod
+    def apply_upload(db: Session, user_id: int, tz: str, upload: SyncUpload) -> dict:
+        """
+        Aplicar habitos creados, modificados, borrados y completions hechos offline en una transaccion
+        """
+        skipped = set()
+        created_ids = {}
+        if upload.created_habits or upload.updated_habits or upload.deleted_habit_ids:
+            seq = db.scalar(bump_habits_version_stmt(db.bind.dialect.name, user_id))
+
+            if upload.created_habits:
+                # INSERT multi-fila; sort_by_parameter_order para emparejar cada id con su client_id
+                rows = db.execute(
+                    insert(Habit).returning(Habit.id, sort_by_parameter_order=True),
+                    [
+                        {"user_id": user_id, "sync_seq": seq, **habit.model_dump(exclude={"client_id"})}
+                        for habit in upload.created_habits
+                    ],
+                ).all()
+                created_ids = {habit.client_id: row.id for habit, row in zip(upload.created_habits, rows)}
+                queue_event(db, user_id, "habit.created", seq, [row.id for row in rows])
+
+            updated_ids = set()
+            for values, habit_ids in group_bulk_updates(upload.updated_habits).items():
+                updated = db.execute(update_habits_stmt(user_id, habit_ids, {**dict(values), "sync_seq": seq})).all()
+                updated_ids.update(row.id for row in updated)
+                skipped.update(set(habit_ids) - {row.id for row in updated})
+            if updated_ids:
+                queue_event(db, user_id, "habit.updated", seq, sorted(updated_ids))
+
+            if upload.deleted_habit_ids:
+                deleted = db.execute(delete_habits_stmt(user_id, upload.deleted_habit_ids)).all()
+                if deleted:
+                    db.execute(tombstone_stmt(user_id, [row.id for row in deleted], seq))
+                    queue_event(db, user_id, "habit.deleted", seq, [row.id for row in deleted])
+
+        # completions: las de habitos creados en este upload se resuelven por client_id
+        items = []
+        for item in upload.completions:
+            habit_id = item.habit_id if item.habit_id is not None else created_ids.get(item.habit_client_id)
+            if habit_id is not None:
+                items.append(CompletionBatchItem(habit_id=habit_id, **item.model_dump(exclude={"habit_id", "habit_client_id"})))
+        completions, habits = [], {}
+        if items:
+            habits = CompletionService.get_completable_habits(db, user_id, {item.habit_id for item in items})
+            skipped.update(item.habit_id for item in items if item.habit_id not in habits)
+            items = [item for item in items if item.habit_id in habits]
+        if items:
+            completions = CompletionService.insert_completions(db, user_id, items, habits, tz)
+
+        db.commit()
+        if completions:
+            CompletionService.record_leaderboard(user_id, habits, completions)
+
+        return {
+            "created_habit_ids": created_ids,
+            "skipped_habit_ids": sorted(skipped),
+            "completions": completions,
+        }
+
+    @staticmethod
+    def purge_tombstones(db: Session) -> int:
+        """
+        Borrar tombstones viejos y subir sync_floor: tokens anteriores reciben un snapshot completo (sin commit)
+        """
+        limit = datetime.utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        purged = (
+            select(HabitTombstone.user_id, func.max(HabitTombstone.sync_seq).label("max_seq"))
+            .where(HabitTombstone.deleted_at < limit)
+            .group_by(HabitTombstone.user_id)
+            .subquery()
+        )
+        db.execute(
+            update(HabitVersion)
+            .where(HabitVersion.user_id == purged.c.user_id)
+            .values(sync_floor=purged.c.max_seq)
+            .execution_options(synchronize_session=False)
+        )
+        result = db.execute(
+            delete(HabitTombstone).where(HabitTombstone.deleted_at < limit).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
@@ -0,0 +1,165 @@
+# Access tokens cortos + refresh tokens con rotacion
+#
+# Renovar la sesion es un lookup por indice (sha256 del refresh token) y dos escrituras, sin bcrypt.
+# Cada refresh token sirve una sola vez: si llega uno ya usado, alguien mas lo tiene y se revoca
+# toda la familia, incluidos los access tokens emitidos con ella (set de revocacion en memoria).
+
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.security import create_access_token, revoke_access_tokens, user_token_claims
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+
+def hash_refresh_token(token: str) -> bytes:
+    # el token ya es aleatorio (256 bits): sha256 basta, no hace falta un hash lento
+    return hashlib.sha256(token.encode()).digest()
+
+# access token + refresh token nuevos y la fila a guardar
+def issue_tokens(user, family_id: str | None = None) -> tuple[dict, dict]:
+    jti = uuid4().hex
+    access_token = create_access_token(
+        data={**user_token_claims(user), "jti": jti},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    refresh_token = secrets.token_urlsafe(32)
+    row = {
+        "user_id": user.id,
+        "token_hash": hash_refresh_token(refresh_token),
+        "family_id": family_id or uuid4().hex,
+        "access_jti": jti,
+        "expires_at": datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    }
+    return {"token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}, row
+
+def refresh_token_query(token: str):
+    return select(RefreshToken).where(RefreshToken.token_hash == hash_refresh_token(token)).with_for_update()
+
+def revoke_family_stmt(family_id: str, now: datetime):
+    return (
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .returning(RefreshToken.access_jti)
+        .execution_options(synchronize_session=False)
+    )
+
+def token_user_query(user_id: int):
+    return select(User.id, User.email, User.username).where(User.id == user_id)
+
+
+class TokenService:
+
+    @staticmethod
+    def create_tokens(db: Session, user: User) -> dict:
+        """
+        Tokens de una sesion nueva (login o registro)
+        """
+        tokens, row = issue_tokens(user)
+        db.execute(insert(RefreshToken).values(**row))
+        db.commit()
+        return tokens
+
+    @staticmethod
+    def refresh_tokens(db: Session, refresh_token: str) -> dict | None:
+        """
+        Rotar el refresh token: retorna tokens nuevos o None si no es valido (reutilizarlo revoca la familia)
+        """
+        now = datetime.utcnow()
+        current = db.scalars(refresh_token_query(refresh_token)).first()
+        if current is None or current.revoked_at is not None or current.expires_at < now:
+            return None
+        if current.used_at is not None:
+            # revoked_at con la hora de despues del FOR UPDATE, no la del inicio del request
+            jtis = db.scalars(revoke_family_stmt(current.family_id, datetime.utcnow())).all()
+            db.commit()
+            revoke_access_tokens(jtis)
+            return None
+
+        user = db.execute(token_user_query(current.user_id)).first()
+        if user is None:
+            return None
+        current.used_at = now
+        tokens, row = issue_tokens(user, current.family_id)
+        db.execute(insert(RefreshToken).values(**row))
+        db.commit()
+        return tokens
+
+    @staticmethod
+    def revoke_tokens(db: Session, refresh_token: str) -> None:
+        """
+        Cerrar la sesion: revocar la familia del refresh token y sus access tokens
+        """
+        current = db.scalars(refresh_token_query(refresh_token)).first()
+        if current is None:
+            return
+        jtis = db.scalars(revoke_family_stmt(current.family_id, datetime.utcnow())).all()
+        db.commit()
+        revoke_access_tokens(jtis)
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """
+        Borrar refresh tokens vencidos (sin commit)
+        """
+        result = db.execute(
+            delete(RefreshToken).where(RefreshToken.expires_at < datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+class AsyncTokenService:
+    # mismas operaciones que TokenService sobre AsyncSession (DATABASE_ASYNC=true)
+
+    @staticmethod
+    async def create_tokens(db: AsyncSession, user: User) -> dict:
+        """
+        Tokens de una sesion nueva (login o registro)
+        """
+        tokens, row = issue_tokens(user)
+        await db.execute(insert(RefreshToken).values(**row))
+        await db.commit()
+        return tokens
+
+    @staticmethod
+    async def refresh_tokens(db: AsyncSession, refresh_token: str) -> dict | None:
+        """
+        Rotar el refresh token: retorna tokens nuevos o None si no es valido (reutilizarlo revoca la familia)
+        """
+        now = datetime.utcnow()
+        current = (await db.scalars(refresh_token_query(refresh_token))).first()
+        if current is None or current.revoked_at is not None or current.expires_at < now:
+            return None
+        if current.used_at is not None:
+            jtis = (await db.scalars(revoke_family_stmt(current.family_id, datetime.utcnow()))).all()
+            await db.commit()
+            revoke_access_tokens(jtis)
+            return None
+
+        user = (await db.execute(token_user_query(current.user_id))).first()
+        if user is None:
+            return None
+        current.used_at = now
+        tokens, row = issue_tokens(user, current.family_id)
+        await db.execute(insert(RefreshToken).values(**row))
+        await db.commit()
+        return tokens
+
+    @staticmethod
+    async def revoke_tokens(db: AsyncSession, refresh_token: str) -> None:
+        """
+        Cerrar la sesion: revocar la familia del refresh token y sus access tokens
+        """
+        current = (await db.scalars(refresh_token_query(refresh_token))).first()
+        if current is None:
+            return
+        jtis = (await db.scalars(revoke_family_stmt(current.family_id, datetime.utcnow()))).all()
+        await db.commit()
+        revoke_access_tokens(jtis)
@@ -0,0 +1,79 @@
+# Warm-up del worker antes de aceptar requests (lifespan de la app)
+#
+# Abre conexiones del pool y ejecuta una vez los queries de cada request (usuario autenticado,
+# GET /habits, tokens): SQLAlchemy guarda el SQL compilado en el cache del engine y
+# asyncpg prepara los statements en esas conexiones. Sin esto lo paga el primer request.
+
+import asyncio
+import logging
+import time
+from starlette.concurrency import run_in_threadpool
+from app.core import database
+from app.core.config import settings
+from app.core.hashing import warm_up_hashing
+from app.core.security import _principal_query
+from app.services.habit_service import habits_page_query, habits_version_query
+from app.services.token_service import token_user_query
+
+logger = logging.getLogger(__name__)
+
+
+# queries calientes con ids que no existen: se compilan y ejecutan sin tocar filas
+# (solo SELECT simples, tambien corren en la replica)
+def hot_queries() -> list:
+    return [
+        _principal_query(0),
+        habits_page_query(0, settings.HABITS_PAGE_SIZE),
+        habits_version_query(0),
+        token_user_query(0),
+    ]
+
+def _pool_size(engine) -> int:
+    # con NullPool (PgBouncer) no hay conexiones que dejar abiertas
+    size = getattr(engine.pool, "size", None)
+    return min(settings.DB_POOL_WARMUP, size()) if size else 0
+
+
+def warm_up_engine(engine) -> None:
+    started = time.perf_counter()
+    try:
+        connections = [engine.connect() for _ in range(max(_pool_size(engine), 1))]
+        try:
+            for query in hot_queries():
+                connections[0].execute(query).all()
+            connections[0].rollback()
+        finally:
+            for connection in connections:
+                connection.close()
+        logger.info("Engine %s listo en %.0f ms", engine.url.render_as_string(), (time.perf_counter() - started) * 1000)
+    except Exception:
+        # sin warm-up el worker igual arranca; el primer request abre la conexion
+        logger.exception("No se pudo precalentar el engine %s", engine.url.render_as_string())
+
+async def warm_up_async_engine(engine) -> None:
+    started = time.perf_counter()
+    try:
+        connections = await asyncio.gather(*(engine.connect().start() for _ in range(max(_pool_size(engine.sync_engine), 1))))
+        try:
+            for query in hot_queries():
+                (await connections[0].execute(query)).all()
+            await connections[0].rollback()
+        finally:
+            for connection in connections:
+                await connection.close()
+        logger.info("Engine %s listo en %.0f ms", engine.url.render_as_string(), (time.perf_counter() - started) * 1000)
+    except Exception:
+        logger.exception("No se pudo precalentar el engine %s", engine.url.render_as_string())
+
+
+async def warm_up() -> None:
+    """
+    Pool, queries calientes y backend de bcrypt, antes de que el worker quede listo
+    """
+    for engine in (database.get_engine(), database.get_replica_engine()):
+        if engine is not None:
+            await run_in_threadpool(warm_up_engine, engine)
+    for engine in (database.get_async_engine(), database.get_async_replica_engine()):
+        if engine is not None:
+            await warm_up_async_engine(engine)
+    await run_in_threadpool(warm_up_hashing)
@@ -0,0 +1,85 @@
+# utilidades compartidas por los benchmarks
+# IMPORTANTE: configure_database() debe llamarse antes de importar cualquier modulo de app,
+# porque app.core.config lee el entorno al importarse
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+
+def add_database_arguments(parser) -> None:
+    parser.add_argument("--sqlite", metavar="PATH", help="usar SQLite en PATH en lugar de DATABASE_URL")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--habits", type=int, default=2000)
+    parser.add_argument("--completions", type=int, default=20000)
+    parser.add_argument("--reset", action="store_true", help="sin --sqlite: borrar y sembrar DATABASE_URL (obligatorio)")
+    parser.add_argument("--output", metavar="FILE", help="guardar el resultado en JSON")
+
+def configure_database(args) -> None:
+    # sembrar borra todas las tablas: contra DATABASE_URL solo con --reset explicito
+    if not args.sqlite and not getattr(args, "reset", True):
+        raise SystemExit("Este benchmark borra todas las tablas de DATABASE_URL, ejecutalo con --reset (o usa --sqlite)")
+    if args.sqlite:
+        os.environ["DATABASE_URL"] = f"sqlite:///{args.sqlite}"
+        os.environ.setdefault("DATABASE_ASYNC", "false")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production")
+    # todos los usuarios simulados salen de la misma IP: sin limite de requests
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    # nearest-rank
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: list, elapsed: float | None = None, errors: int = 0) -> dict:
+    """
+    Resumen en milisegundos de una lista de latencias en segundos
+    """
+    values = sorted(latencies)
+    summary = {
+        "requests": len(values),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(values) / elapsed, 2)
+    return summary
+
+
+def run_metadata(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "database": "sqlite" if args.sqlite else "postgresql",
+        "users": args.users,
+        "habits": args.habits,
+        "completions": args.completions,
+    }
+
+def write_results(path: str | None, results: dict) -> None:
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+def print_table(title: str, rows: dict) -> None:
+    print(f"\n{title}")
+    print(f"{'':40} {'req':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in rows.items():
+        print(f"{name:40} {r['requests']:>7} {r['errors']:>5} {r.get('throughput_rps', 0):>9} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
@@ -0,0 +1,50 @@
+# Comparar dos resultados JSON de load_test / micro / startup y marcar regresiones
+#
+# Uso:
+#   python -m benchmarks.compare base.json nuevo.json --threshold 0.15
+#
+# Termina con codigo 1 si alguna metrica (p95 por defecto) empeora mas que el umbral.
+
+import argparse
+import json
+import sys
+
+
+def _sections(results: dict) -> dict:
+    rows = {}
+    for section in ("endpoints", "micro", "startup"):
+        for name, summary in results.get(section, {}).items():
+            rows[f"{section}:{name}"] = summary
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Diferencias entre dos corridas de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.15, help="empeoramiento relativo permitido")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = _sections(json.load(f))
+    with open(args.new) as f:
+        new = _sections(json.load(f))
+
+    regressions = 0
+    for name in sorted(base.keys() & new.keys()):
+        before, after = base[name].get(args.metric, 0), new[name].get(args.metric, 0)
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  <-- REGRESION"
+            regressions += 1
+        print(f"{name:60} {before:>10} -> {after:>10} ({change:+.1%}){flag}")
+
+    for name in sorted(new.keys() - base.keys()):
+        print(f"{name:60} nuevo")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
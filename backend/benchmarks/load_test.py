@@ -0,0 +1,117 @@
+# Prueba de carga de la API completa (in-process, sin red) a concurrencia fija
+#
+# Uso (desde la carpeta backend):
+#   python -m benchmarks.load_test --sqlite /tmp/bench.db                     # sin PostgreSQL
+#   python -m benchmarks.load_test --reset --concurrency 50 --requests 2000   # DATABASE_URL del .env
+#   python -m benchmarks.load_test --sqlite /tmp/bench.db --output run.json
+#
+# Siembra la base (BORRA las tablas; contra DATABASE_URL exige --reset), hace login con usuarios sembrados
+# y ejecuta cada flujo (register, login, GET /habits, CRUD, completions) reportando throughput y p50/p95/p99.
+
+import argparse
+import asyncio
+import itertools
+import time
+from benchmarks.common import (
+    add_database_arguments, configure_database, print_table, run_metadata, summarize, write_results,
+)
+
+
+async def _run_phase(client, concurrency: int, total: int, make_request) -> dict:
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < total:
+            started = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run(args) -> dict:
+    import httpx
+    from app.main import app
+    from benchmarks.seed import BENCH_PASSWORD
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+        # tokens de usuarios sembrados (no se mide)
+        sessions = []
+        for n in range(1, min(args.users, args.concurrency) + 1):
+            r = await client.post("/auth/login", json={"email": f"user{n}@bench.example.com", "password": BENCH_PASSWORD})
+            r.raise_for_status()
+            sessions.append({"Authorization": f"Bearer {r.json()['token']}"})
+
+        def auth(i):
+            return sessions[i % len(sessions)]
+
+        created = {}  # indice de request -> id del habito creado en la fase create
+
+        async def create(i):
+            r = await client.post("/habits", headers=auth(i), json={
+                "title": f"load {i}", "category": "health", "is_public": i % 2 == 0, "track_time": True,
+            })
+            if r.status_code == 201:
+                created[i] = r.json()["id"]
+            return r
+
+        def habit_of(i):
+            return created.get(i, 0)
+
+        phases = {
+            "POST /auth/register": (min(args.requests, args.register_requests), lambda i: client.post("/auth/register", json={
+                "email": f"load{i}-{args.run_id}@bench.example.com", "username": f"load{i}-{args.run_id}", "password": BENCH_PASSWORD,
+            })),
+            "POST /auth/login": (min(args.requests, args.register_requests), lambda i: client.post("/auth/login", json={
+                "email": f"user{i % args.users + 1}@bench.example.com", "password": BENCH_PASSWORD,
+            })),
+            "GET /habits": (args.requests, lambda i: client.get("/habits", headers=auth(i))),
+            "POST /habits": (args.requests, create),
+            "GET /habits/{id}": (args.requests, lambda i: client.get(f"/habits/{habit_of(i)}", headers=auth(i))),
+            "PUT /habits/{id}": (args.requests, lambda i: client.put(f"/habits/{habit_of(i)}", headers=auth(i), json={"title": f"upd {i}"})),
+            "POST /habits/{id}/completions": (args.requests, lambda i: client.post(
+                f"/habits/{habit_of(i)}/completions", headers=auth(i), json={"time_spent": 30})),
+            "POST /completions:batch": (args.requests // 10 or 1, lambda i: client.post("/completions:batch", headers=auth(i), json={
+                "completions": [{"habit_id": habit_of(i), "time_spent": m} for m in range(20)],
+            })),
+            "DELETE /habits/{id}": (args.requests, lambda i: client.delete(f"/habits/{habit_of(i)}", headers=auth(i))),
+        }
+
+        results = {}
+        for name, (total, make_request) in phases.items():
+            results[name] = await _run_phase(client, args.concurrency, total, make_request)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API")
+    add_database_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="requests por endpoint")
+    parser.add_argument("--register-requests", type=int, default=50, help="register/login cuestan un bcrypt cada uno")
+    args = parser.parse_args()
+    args.run_id = int(time.time())
+    configure_database(args)
+
+    from app.core.database import engine
+    from benchmarks.seed import seed
+    seed(engine, args.users, args.habits, args.completions)
+
+    endpoints = asyncio.run(run(args))
+    print_table(f"Carga: concurrencia {args.concurrency}", endpoints)
+    write_results(args.output, {
+        "meta": {**run_metadata(args), "concurrency": args.concurrency},
+        "endpoints": endpoints,
+    })
+
+
+if __name__ == "__main__":
+    main()
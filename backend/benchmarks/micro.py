@@ -0,0 +1,98 @@
+# Micro-benchmarks de HabitService, de la serializacion de HabitResponse y del rate limit
+#
+# Uso (desde la carpeta backend):
+#   python -m benchmarks.micro --sqlite /tmp/bench.db --output micro.json
+#
+# Siembra la base (BORRA las tablas; contra DATABASE_URL exige --reset) y mide cada operacion --repeat veces.
+
+import argparse
+import time
+from datetime import datetime
+from benchmarks.common import add_database_arguments, configure_database, run_metadata, summarize, write_results
+
+SERIALIZATION_SIZES = (10, 1000)
+
+
+def _measure(fn, repeat: int) -> dict:
+    fn()  # calentar caches (statement cache de SQLAlchemy, validadores de pydantic)
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def run(args) -> dict:
+    from pydantic import TypeAdapter
+    from app.core.database import SessionLocal
+    from app.core.ratelimit import TokenBucketLimiter, client_key
+    from app.core.security import create_access_token
+    from app.models.habits import Habit, HabitCategory
+    from app.schemas.habit import HabitResponse
+    from app.services.habit_service import HabitService
+    from app.services.stats_service import StatsService
+
+    results = {}
+    db = SessionLocal()
+    try:
+        user_id = 1
+        habit_id = HabitService.get_habits(db, user_id)[0].id
+        db.expunge_all()
+
+        def fresh(fn):
+            # cada medicion con identity map vacio, como un request nuevo
+            def run_once():
+                fn()
+                db.expunge_all()
+            return run_once
+
+        results["HabitService.get_habits"] = _measure(fresh(lambda: HabitService.get_habits(db, user_id)), args.repeat)
+        results["HabitService.get_habits_page"] = _measure(fresh(lambda: HabitService.get_habits_page(db, user_id, 100)), args.repeat)
+        results["HabitService.get_habit"] = _measure(fresh(lambda: HabitService.get_habit(db, user_id, habit_id)), args.repeat)
+        results["StatsService.get_user_stats"] = _measure(fresh(lambda: StatsService.get_user_stats(db, user_id, "UTC")), args.repeat)
+    finally:
+        db.close()
+
+    # serializacion, sin DB: objetos ORM transitorios
+    now = datetime.utcnow()
+    adapter = TypeAdapter(list[HabitResponse])
+    for size in SERIALIZATION_SIZES:
+        habits = [
+            Habit(id=i, user_id=1, title=f"habit {i}", description="bench", category=HabitCategory.health,
+                  is_public=False, track_time=True, once_per_day=False, created_at=now, updated_at=now)
+            for i in range(size)
+        ]
+        results[f"HabitResponse.validate+dump_json[{size}]"] = _measure(
+            lambda: [HabitResponse.model_validate(h).model_dump_json() for h in habits], args.repeat)
+        results[f"TypeAdapter(list[HabitResponse]).dump_json[{size}]"] = _measure(
+            lambda: adapter.dump_json(adapter.validate_python(habits, from_attributes=True)), args.repeat)
+
+    # rate limit por request: bucket en memoria e identificacion del cliente (verifica el jwt, sin DB)
+    limiter = TokenBucketLimiter(1e9, 1e9)
+    scope = {"headers": [(b"authorization", b"Bearer " + create_access_token({"sub": "1"}).encode())], "client": ("127.0.0.1", 0)}
+    results["TokenBucketLimiter.acquire"] = _measure(lambda: limiter.acquire("user:1"), args.repeat)
+    results["ratelimit.client_key[bearer]"] = _measure(lambda: client_key(scope), args.repeat)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de servicios y serializacion")
+    add_database_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    configure_database(args)
+
+    from app.core.database import engine
+    from benchmarks.seed import seed
+    seed(engine, args.users, args.habits, args.completions)
+
+    micro = run(args)
+    for name, r in micro.items():
+        print(f"{name:55} mean {r['mean_ms']:>9} ms   p95 {r['p95_ms']:>9} ms")
+    write_results(args.output, {"meta": {**run_metadata(args), "repeat": args.repeat}, "micro": micro})
+
+
+if __name__ == "__main__":
+    main()
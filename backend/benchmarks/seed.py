@@ -0,0 +1,94 @@
+# Datos sinteticos para benchmarks: usuarios, habitos y completions
+# PostgreSQL se siembra con generate_series (millones de filas en segundos),
+# SQLite con INSERTs por lotes desde Python.
+#
+# Todos los usuarios sembrados son user<N>@bench.example.com / BENCH_PASSWORD
+
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from app.core.database import Base
+from app.core.localtime import day_key
+from app.core.security import get_password_hash
+from app.models import habits, stats, user  # noqa: F401 registrar todos los modelos
+from app.models.habits import Habit, HabitCategory, HabitCompletion
+from app.models.user import User
+
+BENCH_PASSWORD = "benchpass1"
+BATCH_SIZE = 5000
+
+
+def seed(engine, users: int, habit_count: int, completions: int) -> None:
+    """
+    BORRA y recrea todas las tablas, despues siembra los datos
+    """
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    password_hash = get_password_hash(BENCH_PASSWORD)  # un solo bcrypt para todos
+    if engine.dialect.name == "postgresql":
+        _seed_postgres(engine, users, habit_count, completions, password_hash)
+    else:
+        _seed_portable(engine, users, habit_count, completions, password_hash)
+
+
+def _seed_postgres(engine, users: int, habit_count: int, completions: int, password_hash: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO users (email, username, password_hash)
+            SELECT 'user' || g || '@bench.example.com', 'user' || g, :password_hash
+            FROM generate_series(1, :users) g
+        """), {"users": users, "password_hash": password_hash})
+        conn.execute(text("""
+            INSERT INTO habits (user_id, title, category, is_public, track_time, created_at, updated_at)
+            SELECT (g % :users) + 1, 'habit ' || g,
+                   (enum_range(NULL::habitcategory))[1 + g % 7],
+                   g % 5 = 0, g % 2 = 0,
+                   now() - (g || ' seconds')::interval, now()
+            FROM generate_series(1, :habits) g
+        """), {"users": users, "habits": habit_count})
+        conn.execute(text("""
+            INSERT INTO habit_completions (habit_id, user_id, completed_at, time_spent, points_earned, local_day)
+            SELECT h.id, h.user_id, now() - ((g % 730) || ' days')::interval, NULL, 1,
+                   to_char(now() - ((g % 730) || ' days')::interval, 'YYYYMMDD')::int
+            FROM generate_series(1, :completions) g
+            JOIN habits h ON h.id = (g % :habits) + 1
+        """), {"completions": completions, "habits": habit_count})
+        # agregados materializados de esas completions (sin rachas): las escrituras de stats hacen upsert sobre filas reales
+        conn.execute(text("""
+            INSERT INTO habit_stats (habit_id, user_id, total_points, total_completions, current_streak, longest_streak, last_completion_day)
+            SELECT habit_id, min(user_id), sum(points_earned), count(*), 0, 0, max(completed_at)::date
+            FROM habit_completions GROUP BY habit_id
+        """))
+        conn.execute(text("""
+            INSERT INTO user_stats (user_id, total_points, total_completions, current_streak, longest_streak, last_completion_day)
+            SELECT user_id, sum(total_points), sum(total_completions), 0, 0, max(last_completion_day)
+            FROM habit_stats GROUP BY user_id
+        """))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def _seed_portable(engine, users: int, habit_count: int, completions: int, password_hash: str) -> None:
+    categories = list(HabitCategory)
+    now = datetime.utcnow()
+
+    def batches(total, build):
+        for start in range(1, total + 1, BATCH_SIZE):
+            yield [build(g) for g in range(start, min(start + BATCH_SIZE, total + 1))]
+
+    with engine.begin() as conn:
+        for rows in batches(users, lambda g: {
+            "id": g, "email": f"user{g}@bench.example.com", "username": f"user{g}", "password_hash": password_hash,
+        }):
+            conn.execute(insert(User.__table__), rows)
+        for rows in batches(habit_count, lambda g: {
+            "id": g, "user_id": (g % users) + 1, "title": f"habit {g}", "category": categories[g % 7],
+            "is_public": g % 5 == 0, "track_time": g % 2 == 0,
+            "created_at": now - timedelta(seconds=g), "updated_at": now,
+        }):
+            conn.execute(insert(Habit.__table__), rows)
+        for rows in batches(completions, lambda g: {
+            "habit_id": (g % habit_count) + 1, "user_id": ((g % habit_count) + 1) % users + 1,
+            "completed_at": now - timedelta(days=g % 730), "time_spent": None, "points_earned": 1,
+            "local_day": day_key((now - timedelta(days=g % 730)).date()),
+        }):
+            conn.execute(insert(HabitCompletion.__table__), rows)
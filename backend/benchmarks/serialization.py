@@ -0,0 +1,94 @@
+# Serializacion de GET /habits: camino anterior vs respuesta directa con orjson
+#
+# Uso (desde la carpeta backend):
+#   python -m benchmarks.serialization --output serialization.json
+#
+# No necesita la base de la app: usa un SQLite en memoria propio.
+#   anterior: objetos ORM -> validacion con list[HabitResponse] -> dump a JSON-compatible -> json (JSONResponse)
+#   directo:  filas con las columnas de HabitResponse -> orjson (rows_response)
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from benchmarks.common import run_metadata, summarize, write_results
+
+SIZES = (10, 1000, 10000)
+
+
+def _measure(fn, repeat: int) -> dict:
+    fn()  # calentar validadores de pydantic
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def run(repeat: int) -> dict:
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, insert, select
+    from sqlalchemy.orm import Session
+    from app.core.database import Base
+    from app.core.responses import rows_response
+    from app.models.habits import Habit, HabitCategory
+    from app.models.user import User  # noqa: F401 (tabla referenciada por habits.user_id)
+    from app.schemas.habit import HabitResponse
+    from app.services.habit_service import HABIT_RESPONSE_COLUMNS
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Habit), [
+            {"user_id": 1, "title": f"habit {i}", "description": "bench", "category": HabitCategory.health,
+             "is_public": i % 2 == 0, "track_time": True, "created_at": now, "updated_at": now}
+            for i in range(max(SIZES))
+        ])
+
+    adapter = TypeAdapter(list[HabitResponse])
+    results = {}
+    with Session(engine) as db:
+        for size in SIZES:
+            habits = db.scalars(select(Habit).order_by(Habit.id).limit(size)).all()
+            rows = db.execute(select(*HABIT_RESPONSE_COLUMNS).order_by(Habit.id).limit(size)).all()
+
+            def previous():
+                validated = adapter.validate_python(habits, from_attributes=True)
+                return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+            def direct():
+                return rows_response(rows).body
+
+            assert len(previous()) > 0 and len(direct()) > 0
+            results[f"previous[{size}]"] = _measure(previous, repeat)
+            results[f"orjson_rows[{size}]"] = _measure(direct, repeat)
+            results[f"speedup[{size}]"] = round(results[f"previous[{size}]"]["mean_ms"] / results[f"orjson_rows[{size}]"]["mean_ms"], 2)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de serializacion de GET /habits")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for name, r in results.items():
+        if isinstance(r, dict):
+            print(f"{name:25} mean {r['mean_ms']:>9} ms   p95 {r['p95_ms']:>9} ms")
+        else:
+            print(f"{name:25} x{r}")
+    # sqlite en memoria, sin usuarios ni completions sembrados
+    args.sqlite, args.users, args.habits, args.completions = ":memory:", 1, max(SIZES), 0
+    write_results(args.output, {"meta": {**run_metadata(args), "repeat": args.repeat}, "serialization": results})
+
+
+if __name__ == "__main__":
+    main()
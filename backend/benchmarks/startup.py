@@ -0,0 +1,118 @@
+# Arranque en frio de un worker: import de app.main (python -X importtime) y lifespan hasta quedar listo
+#
+# Uso (desde la carpeta backend):
+#   python -m benchmarks.startup --sqlite /tmp/bench.db --runs 10 --output startup.json
+#   python -m benchmarks.compare startup_base.json startup.json
+#
+# Cada corrida es un proceso nuevo (sin modulos ya importados ni .pyc en memoria):
+#   import:  importar app.main (no deberia crear engines ni abrir conexiones)
+#   ready:   lifespan completo (engines, filtro de disponibilidad, warm-up del pool y de bcrypt)
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import configure_database, run_metadata, summarize, write_results
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def ready():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready_at = asyncio.run(ready())
+print(json.dumps({"import": imported - started, "ready": ready_at - started}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """
+    Lineas de -X importtime: "import time: self [us] | cumulative | modulo"
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_ms": round(int(self_us) / 1000, 3),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 3),
+        })
+    return modules
+
+def run_once() -> tuple[dict, list[dict]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+def create_tables() -> None:
+    # en un proceso aparte para no dejar modulos de app importados en este
+    subprocess.run([sys.executable, "-c", (
+        "from app.core.database import Base, engine\n"
+        "import app.models.user, app.models.habits, app.models.stats, app.models.jobs, app.models.refresh_token\n"
+        "Base.metadata.create_all(engine)\n"
+    )], check=True, env=os.environ.copy())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frio de la API")
+    parser.add_argument("--sqlite", metavar="PATH", help="usar SQLite en PATH en lugar de DATABASE_URL")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=20, help="modulos mas lentos a reportar")
+    parser.add_argument("--output", metavar="FILE", help="guardar el resultado en JSON")
+    args = parser.parse_args()
+    configure_database(args)
+    if args.sqlite:
+        create_tables()
+
+    imports, lifespans, totals = [], [], []
+    modules = {}
+    run_once()  # descartar: la primera corrida compila los .pyc
+    for _ in range(args.runs):
+        timings, run_modules = run_once()
+        imports.append(timings["import"])
+        lifespans.append(timings["ready"] - timings["import"])
+        totals.append(timings["ready"])
+        for module in run_modules:
+            modules.setdefault(module["module"], []).append(module)
+
+    # mediana por modulo entre corridas
+    def median(values: list) -> float:
+        return sorted(values)[len(values) // 2]
+
+    per_module = [
+        {"module": name, "self_ms": median([m["self_ms"] for m in runs]), "cumulative_ms": median([m["cumulative_ms"] for m in runs])}
+        for name, runs in modules.items()
+    ]
+    startup = {
+        "import_app_main": summarize(imports),
+        "lifespan_ready": summarize(lifespans),
+        "total_ready": summarize(totals),
+    }
+    for name, r in startup.items():
+        print(f"{name:20} mean {r['mean_ms']:>9} ms   p95 {r['p95_ms']:>9} ms")
+
+    args.users = args.habits = args.completions = 0
+    write_results(args.output, {
+        "meta": {**run_metadata(args), "runs": args.runs},
+        "startup": startup,
+        "slowest_imports": sorted(per_module, key=lambda m: m["self_ms"], reverse=True)[:args.top],
+        "app_modules": sorted(
+            (m for m in per_module if m["module"].startswith("app")), key=lambda m: m["cumulative_ms"], reverse=True
+        )[:args.top],
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Pruebas de la API sobre SQLite (un archivo temporal por sesion, tablas nuevas por prueba)
+#
+# Uso (desde la carpeta backend):
+#   python -m pytest -q
+
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="habit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ.setdefault("SECRET_KEY", "test-secret-key-not-for-production-0000")
+os.environ["DATABASE_ASYNC"] = "false"
+os.environ["HASH_EXECUTOR"] = "inline"
+os.environ["STARTUP_WARMUP"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"  # todas las pruebas salen de la misma IP
+os.environ["COMPLETION_JOURNAL_DIR"] = f"{_db_dir}/journal"
+
+import pytest
+from fastapi.testclient import TestClient
+import app.models.habits, app.models.jobs, app.models.refresh_token, app.models.stats, app.models.user  # noqa: F401
+from app.core import database
+from app.main import app
+
+
+@pytest.fixture
+def db_engine():
+    engine = database.get_engine()
+    database.Base.metadata.drop_all(engine)
+    database.Base.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture
+def db(db_engine):
+    session = database.SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db_engine):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def register(client):
+    """
+    Registrar un usuario y retornar los headers con su access token
+    """
+    def register_user(username: str = "ana", email: str | None = None, password: str = "password1") -> dict:
+        response = client.post("/auth/register", json={
+            "email": email or f"{username}@example.com", "username": username, "password": password,
+        })
+        assert response.status_code == 201, response.text
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+
+    return register_user
@@ -0,0 +1,61 @@
+# DATABASE_ASYNC=true elige las rutas async al importar app.main: se prueba en un proceso aparte
+# (aiosqlite en lugar de asyncpg)
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+SCRIPT = """
+import app.models.habits, app.models.jobs, app.models.refresh_token, app.models.stats, app.models.user
+from fastapi.testclient import TestClient
+from app.api import auth_async, habits_async
+from app.core import database
+from app.main import app
+
+database.Base.metadata.create_all(database.get_engine())
+assert any(route.endpoint is habits_async.get_habit for route in app.routes)
+
+with TestClient(app) as client:
+    user = {"email": "ana@example.com", "username": "ana", "password": "password1"}
+    assert client.post("/auth/register", json=user).status_code == 201
+    assert client.post("/auth/register", json=user).status_code == 409
+    login = client.post("/auth/login", json={"email": user["email"], "password": "password1"})
+    assert login.status_code == 200, login.text
+    assert client.post("/auth/login", json={"email": user["email"], "password": "otra"}).status_code == 401
+    headers = {"Authorization": "Bearer " + login.json()["token"]}
+    refreshed = client.post("/auth/refresh", json={"refresh_token": login.json()["refresh_token"]})
+    assert refreshed.status_code == 200, refreshed.text
+
+    habit = client.post("/habits", json={"title": "correr", "category": "health", "is_public": False, "track_time": False}, headers=headers)
+    assert habit.status_code == 201, habit.text
+    habit_id = habit.json()["id"]
+    listed = client.get("/habits", headers=headers)
+    assert [h["id"] for h in listed.json()] == [habit_id]
+    assert client.get("/habits", headers={**headers, "If-None-Match": listed.headers["etag"]}).status_code == 304
+    assert client.get("/habits", params={"cursor": "x"}, headers=headers).status_code == 400
+
+    one = client.get(f"/habits/{habit_id}", headers=headers)
+    assert one.status_code == 200 and one.json()["title"] == "correr"
+    assert client.get(f"/habits/{habit_id}", headers={**headers, "If-None-Match": one.headers["etag"]}).status_code == 304
+    assert client.put(f"/habits/{habit_id}", json={"title": "nadar"}, headers=headers).json()["title"] == "nadar"
+    assert client.patch("/habits", json={"habits": [{"id": habit_id, "is_public": True}]}, headers=headers).json()[0]["is_public"]
+    assert client.delete(f"/habits/{habit_id}", headers=headers).status_code == 200
+    assert client.get(f"/habits/{habit_id}", headers=headers).status_code == 404
+print("ok")
+"""
+
+
+def test_auth_and_habits_with_async_engine(tmp_path):
+    env = {
+        **os.environ,
+        "DATABASE_ASYNC": "true",
+        "DATABASE_URL": f"sqlite:///{tmp_path}/async.db",
+        "DATABASE_ASYNC_URL": f"sqlite+aiosqlite:///{tmp_path}/async.db",
+        "COMPLETION_JOURNAL_DIR": f"{tmp_path}/journal",
+    }
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=BACKEND, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.core import hashing, security
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.services.availability_service import availability_index
+from app.services.event_service import event_hub
+
+
+def _insert_user_from_other_worker(db, username: str, email: str) -> None:
+    # registro que este worker no vio: no pasa por availability_index.add
+    db.add(User(username=username, email=email, password_hash=get_password_hash("password1")))
+    db.commit()
+
+
+def test_register_duplicate_email_is_409(client, register):
+    register("ana")
+    response = client.post("/auth/register", json={"email": "ana@example.com", "username": "otra", "password": "password1"})
+    assert response.status_code == 409
+
+
+def test_register_user_missing_from_bloom_filter_is_409(client, db):
+    _insert_user_from_other_worker(db, "beto", "beto@example.com")
+    assert not availability_index.email_maybe_taken("beto@example.com")
+
+    response = client.post("/auth/register", json={"email": "beto@example.com", "username": "beto2", "password": "password1"})
+    assert response.status_code == 409
+    response = client.post("/auth/register", json={"email": "beto2@example.com", "username": "beto", "password": "password1"})
+    assert response.status_code == 409
+
+
+def test_check_email_sees_users_from_other_workers(client, db, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.AVAILABILITY_REFRESH_SECONDS", 0)
+    _insert_user_from_other_worker(db, "carla", "carla@example.com")
+
+    assert client.get("/auth/check-email/carla@example.com").json() == {"available": False}
+    assert client.get("/auth/check-username/carla").json() == {"available": False}
+    assert client.get("/auth/check-username/libre").json() == {"available": True}
+
+
+def test_revocation_committed_late_is_seen_by_other_workers(client, register, db):
+    headers = register("dora")
+    token = headers["Authorization"].split()[1]
+    security._revocation_sync.checked_at = 0
+    security.sync_revocations(db)  # otro worker ya leyo hasta ahora
+
+    # revocacion cuyo commit llego varios segundos despues de su revoked_at (espera de FOR UPDATE)
+    db.execute(update(RefreshToken).values(revoked_at=datetime.utcnow() - timedelta(seconds=10)))
+    db.commit()
+    security._revocation_sync.checked_at = 0
+    security.sync_revocations(db)
+
+    assert security.decode_access_token(token) is None
+    assert client.get("/habits", headers=headers).status_code == 401
+
+
+def test_user_update_is_published_to_other_workers(client, register, monkeypatch):
+    headers = register()
+    assert client.get("/stats/me", headers=headers).status_code == 200  # token en el cache de usuarios
+    published = []
+    original = event_hub.publish
+    monkeypatch.setattr(event_hub, "publish", lambda item: (published.append(item), original(item)))
+
+    response = client.patch("/auth/me", json={"timezone": "Europe/Madrid"}, headers=headers)
+    assert response.status_code == 200, response.text
+    # con PostgreSQL este evento sale por NOTIFY y cada worker borra sus entradas del usuario
+    assert [item["type"] for item in published] == ["user.changed"]
+    assert len(security.principal_cache) == 0
+
+
+def test_login_awaits_bcrypt_outside_the_threadpool(client, register, monkeypatch):
+    register()
+    monkeypatch.setattr(settings, "HASH_EXECUTOR", "process")
+    monkeypatch.setattr(settings, "HASH_WORKERS", 1)
+    submitted_on_loop = []
+    submit = hashing._submit
+
+    def recording_submit(*args):
+        try:
+            asyncio.get_running_loop()
+            submitted_on_loop.append(True)
+        except RuntimeError:  # hilo del threadpool
+            submitted_on_loop.append(False)
+        return submit(*args)
+
+    monkeypatch.setattr(hashing, "_submit", recording_submit)
+    try:
+        response = client.post("/auth/login", json={"email": "ana@example.com", "password": "password1"})
+    finally:
+        hashing.shutdown_hash_executor()
+    assert response.status_code == 200, response.text
+    assert submitted_on_loop == [True]
+
+
+def test_availability_filter_is_rebuilt_larger_when_full(client, register, db, monkeypatch):
+    monkeypatch.setattr(settings, "AVAILABILITY_BLOOM_CAPACITY", 2)
+    availability_index.warm(db)  # sin usuarios: capacidad 2
+    for name in ("ana", "bea", "carla"):
+        register(name)
+
+    availability_index.rebuild_thread.join(timeout=10)
+    assert availability_index._usernames.capacity == 6  # el doble de los usuarios al recargar
+    assert not availability_index._usernames.full
+    assert all(availability_index.username_maybe_taken(name) for name in ("ana", "bea", "carla"))
+    assert 0 < availability_index._usernames.fill_ratio < 1
@@ -0,0 +1,53 @@
+from datetime import datetime
+import orjson
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.core import database
+from app.services.completion_buffer import CompletionBuffer, _Journal
+
+
+def _event(event_id: str) -> dict:
+    return {
+        "event_id": event_id, "habit_id": 1, "user_id": 1, "completed_at": datetime.utcnow(),
+        "local_day": 20240101, "once_per_day": False,
+    }
+
+def _buffer(tmp_path, write) -> tuple[CompletionBuffer, list]:
+    # sin start(): el test llama flush/flush_isolated en lugar del hilo
+    buffer, committed = CompletionBuffer(), []
+    buffer.session_factory, buffer.write, buffer.after_commit = database.SessionLocal, write, committed.extend
+    buffer.journal = _Journal(str(tmp_path))
+    buffer.journal.open()
+    return buffer, committed
+
+
+def test_poison_event_goes_to_dead_letter_and_the_rest_is_saved(db_engine, tmp_path):
+    def write(db, events):
+        if any(event["event_id"] == "poison" for event in events):
+            raise ValueError("evento invalido")
+        return [event["event_id"] for event in events]
+
+    buffer, committed = _buffer(tmp_path, write)
+    buffer.add([_event("a"), _event("poison"), _event("b")])
+    with pytest.raises(ValueError):
+        buffer.flush()  # el lote entero falla mientras el evento siga adentro
+
+    assert buffer.flush_isolated() == 1
+    assert committed == ["a", "b"]
+    assert buffer.pending == [] and buffer.by_user == {}
+    dead = [orjson.loads(line) for line in (tmp_path / f"{buffer.journal.prefix}.dead").read_bytes().splitlines()]
+    assert [event["event_id"] for event in dead] == ["poison"]
+    assert [path.name for path in tmp_path.glob("*.journal")] == [buffer.journal.path.name]  # lote liberado
+
+
+def test_isolated_flush_keeps_everything_when_the_database_is_down(db_engine, tmp_path):
+    def write(db, events):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    buffer, committed = _buffer(tmp_path, write)
+    buffer.add([_event("a"), _event("b")])
+    with pytest.raises(OperationalError):
+        buffer.flush_isolated()
+
+    assert [event["event_id"] for event in buffer.pending] == ["a", "b"]
+    assert not (tmp_path / f"{buffer.journal.prefix}.dead").exists()
@@ -0,0 +1,44 @@
+import pytest
+from app.core.config import settings
+from app.services.habit_service import HabitService
+
+
+def test_list_habits_pages_by_default(client, register):
+    headers = register()
+    created = [
+        {"client_id": str(n), "title": f"habito {n}", "category": "health", "is_public": False, "track_time": False}
+        for n in range(settings.HABITS_PAGE_SIZE + 1)
+    ]
+    assert client.post("/sync", json={"created_habits": created}, headers=headers).status_code == 200
+
+    # sin ?limit= la pagina es de HABITS_PAGE_SIZE (el frontend sigue X-Next-Cursor)
+    first = client.get("/habits", headers=headers)
+    assert len(first.json()) == settings.HABITS_PAGE_SIZE
+    rest = client.get(f"/habits?cursor={first.headers['X-Next-Cursor']}", headers=headers)
+    assert len(rest.json()) == 1
+    assert "X-Next-Cursor" not in rest.headers
+
+
+def test_get_habit_not_modified_skips_full_load(client, register, monkeypatch):
+    headers = register()
+    habit = client.post("/habits", json={"title": "leer", "category": "health", "is_public": False, "track_time": False}, headers=headers).json()
+    first = client.get(f"/habits/{habit['id']}", headers=headers)
+    assert first.status_code == 200 and first.json()["title"] == "leer"
+
+    # con el ETag vigente no se carga el habito completo
+    monkeypatch.setattr(HabitService, "get_habit", lambda *args: pytest.fail("cargo el habito completo"))
+    response = client.get(f"/habits/{habit['id']}", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert client.get("/habits/999", headers={**headers, "If-None-Match": first.headers["ETag"]}).status_code == 404
+
+
+def test_bulk_update_rejects_duplicate_ids(client, register):
+    headers = register()
+    habit = client.post("/habits", json={"title": "leer", "category": "health", "is_public": False, "track_time": False}, headers=headers).json()
+
+    response = client.patch("/habits", json={"habits": [{"id": habit["id"], "title": "a"}, {"id": habit["id"], "is_public": True}]}, headers=headers)
+    assert response.status_code == 422
+    assert client.get(f"/habits/{habit['id']}", headers=headers).json()["title"] == "leer"
+
+    response = client.patch("/habits", json={"habits": [{"id": habit["id"], "title": "a"}]}, headers=headers)
+    assert [row["id"] for row in response.json()] == [habit["id"]]
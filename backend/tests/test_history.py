@@ -0,0 +1,20 @@
+def test_history_groups_by_local_day(client):
+    response = client.post("/auth/register", json={
+        "email": "bea@example.com", "username": "bea", "password": "password1", "timezone": "America/Argentina/Buenos_Aires",
+    })
+    assert response.status_code == 201, response.text
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+    habit = client.post("/habits", json={"title": "leer", "category": "study", "is_public": False, "track_time": False}, headers=headers).json()
+
+    # 01:30 UTC del lunes 12 es domingo 11 a la noche en Buenos Aires (UTC-3)
+    for completed_at in ("2026-01-12T01:30:00", "2026-01-12T15:00:00", "2026-01-14T12:00:00"):
+        response = client.post(f"/habits/{habit['id']}/completions", json={"completed_at": completed_at}, headers=headers)
+        assert response.status_code == 201, response.text
+
+    params = {"from": "2026-01-01T00:00:00", "to": "2026-02-01T00:00:00"}
+    days = client.get(f"/habits/{habit['id']}/history", params={**params, "bucket": "day"}, headers=headers).json()
+    assert [(day["bucket"], day["completions"]) for day in days] == [("2026-01-11", 1), ("2026-01-12", 1), ("2026-01-14", 1)]
+    weeks = client.get(f"/habits/{habit['id']}/history", params={**params, "bucket": "week"}, headers=headers).json()
+    assert [(week["bucket"], week["completions"]) for week in weeks] == [("2026-01-05", 1), ("2026-01-12", 2)]
+    months = client.get(f"/habits/{habit['id']}/history", params={**params, "bucket": "month"}, headers=headers).json()
+    assert [(month["bucket"], month["points"]) for month in months] == [("2026-01-01", 3)]
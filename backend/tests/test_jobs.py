@@ -0,0 +1,76 @@
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from app.commands.rebuild_stats import rebuild_stats, rebuild_user_stats
+from app.core import database
+from app.core.config import settings
+from app.models.jobs import Job, JobStatus
+from app.models.stats import HabitStats, UserStats
+from app.services.job_service import JobService, JobWorker
+
+
+def test_rebuild_corrects_drift_in_place(client, register, db):
+    headers = register()
+    habit = client.post("/habits", json={"title": "leer", "category": "health", "is_public": False, "track_time": False}, headers=headers).json()
+    assert client.post("/completions:batch", json={"completions": [{"habit_id": habit["id"]}] * 3}, headers=headers).status_code == 201
+
+    db.execute(update(UserStats).values(total_points=99, total_completions=99))
+    db.execute(update(HabitStats).values(total_points=99))
+    db.commit()
+
+    assert rebuild_user_stats(db, [1]) == 1
+    db.commit()
+    user_stats = db.execute(select(UserStats.total_points, UserStats.total_completions)).one()
+    habit_stats = db.execute(select(HabitStats.total_points)).one()
+    assert (tuple(user_stats), tuple(habit_stats)) == ((3, 3), (3,))
+
+    # las completions siguientes suman sobre los valores reconstruidos
+    assert client.post(f"/habits/{habit['id']}/completions", json={}, headers=headers).status_code == 201
+    assert client.get("/stats/me", headers=headers).json()["total_points"] == 4
+
+
+def test_rebuild_resets_users_without_completions(client, register, db):
+    register()
+    db.add(UserStats(user_id=1, total_points=5, total_completions=5, current_streak=1, longest_streak=1))
+    db.commit()
+    assert rebuild_user_stats(db, [1]) == 0
+    db.commit()
+    assert db.execute(select(UserStats.total_points)).scalar_one() == 0
+
+
+def test_full_rebuild_commits_per_batch_of_users(client, register, db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BATCH_SIZE", 1)
+    for username in ("ana", "bruno"):
+        headers = register(username)
+        habit = client.post("/habits", json={"title": "leer", "category": "health", "is_public": False, "track_time": False}, headers=headers).json()
+        assert client.post(f"/habits/{habit['id']}/completions", json={}, headers=headers).status_code == 201
+    db.execute(update(UserStats).values(total_points=99))
+    db.commit()
+
+    commits = []
+    listener = lambda session: commits.append(session)
+    event.listen(Session, "after_commit", listener)
+    try:
+        assert rebuild_stats() == 2
+    finally:
+        event.remove(Session, "after_commit", listener)
+    assert len(commits) == 2  # un commit por lote: los bloqueos duran un lote, no todo el historial
+    db.expire_all()
+    assert db.scalars(select(UserStats.total_points).order_by(UserStats.user_id)).all() == [1, 1]
+
+
+def test_claimed_job_requeued_before_running_is_skipped(db):
+    ran = []
+    worker = JobWorker(database.SessionLocal, {"task": lambda db, payload: ran.append(payload["n"])}, worker_id="w1")
+    JobService.enqueue_many(db, "task", [{"n": 1}, {"n": 2}])
+    db.commit()
+    first, second = JobService.claim(db, "w1", 10)
+
+    worker.run_job(first)
+    # el segundo espero mas que JOB_LOCK_TIMEOUT_SECONDS: release_stale lo devolvio y otro worker lo tomo
+    db.execute(update(Job).where(Job.id == second.id).values(locked_by="w2"))
+    db.commit()
+    worker.run_job(second)
+
+    assert ran == [1]
+    statuses = dict(db.execute(select(Job.id, Job.status).execution_options(populate_existing=True)).all())
+    assert statuses == {first.id: JobStatus.done, second.id: JobStatus.running}
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models.habits import HabitCategory
+from app.models.user import User
+from app.services import leaderboard_service
+from app.services.leaderboard_service import LeaderboardService
+
+
+def _public_habit_with_completion(client, headers) -> None:
+    habit = client.post("/habits", json={"title": "correr", "category": "health", "is_public": True, "track_time": False}, headers=headers).json()
+    response = client.post(f"/habits/{habit['id']}/completions", json={}, headers=headers)
+    assert response.status_code == 201, response.text
+
+
+def test_completion_recorded_during_reconcile_is_kept(client, register, db):
+    headers = register()
+    _public_habit_with_completion(client, headers)
+    stats = client.get("/stats/me", headers=headers).json()
+    user_id, points = int(stats["user_id"]), stats["total_points"]
+
+    class RecordingDuringRead:
+        # otra completion confirmada despues de los SELECT del reconcile (no esta en su lectura)
+        def __init__(self):
+            self.recorded = False
+
+        def get_bind(self):
+            return db.get_bind()
+
+        def execute(self, *args, **kwargs):
+            result = db.execute(*args, **kwargs)
+            if not self.recorded:
+                self.recorded = True
+                LeaderboardService.record_completions(user_id, [(HabitCategory.health, datetime.utcnow(), 5)])
+            return result
+
+    LeaderboardService.reconcile(RecordingDuringRead())
+
+    board = client.get("/leaderboard?window=all", headers=headers).json()
+    assert board["me"]["points"] == points + 5
+
+
+def test_stale_leaderboard_reconciles_in_background(client, register, monkeypatch):
+    headers = register()
+    _public_habit_with_completion(client, headers)
+    launched = []
+    monkeypatch.setattr(LeaderboardService, "reconcile", lambda *args, **kwargs: launched.append("sync"))
+    monkeypatch.setattr(LeaderboardService, "reconcile_in_background", lambda: launched.append("background"))
+    monkeypatch.setattr(leaderboard_service._registry, "reconciled_at", 1.0)  # listas vencidas
+
+    response = client.get("/leaderboard?window=all", headers=headers)
+    assert response.status_code == 200, response.text
+    assert launched == ["background"]
+
+
+def test_day_and_week_windows_roll_by_hour():
+    registry = leaderboard_service._Registry()
+    completed_at = datetime(2024, 3, 4, 10, 30)
+    registry.add(1, [(HabitCategory.health, completed_at, 5)], completed_at)
+    registry.add(2, [(HabitCategory.health, completed_at + timedelta(hours=20), 3)], completed_at + timedelta(hours=20))
+
+    registry.advance(completed_at + timedelta(hours=24))  # la hora de las 10 sale de la ventana de 24 horas
+    assert registry.board("day", None).top(10) == [(2, 3)]
+    assert registry.board("day", HabitCategory.health).rank(1) is None
+    assert registry.board("week", None).top(10) == [(1, 5), (2, 3)]
+
+    registry.advance(completed_at + timedelta(days=8))
+    assert registry.board("week", None).top(10) == []
+    assert registry.board("all", None).top(10) == [(1, 5), (2, 3)]
+    assert registry.hours == {}
+
+
+def test_usernames_are_reloaded_after_user_change(client, register, db):
+    headers = register()
+    _public_habit_with_completion(client, headers)
+    user_id = int(client.get("/stats/me", headers=headers).json()["user_id"])
+    assert client.get("/leaderboard?window=all", headers=headers).json()["entries"][0]["username"] == "ana"
+
+    db.execute(update(User).where(User.id == user_id).values(username="ana2"))
+    db.commit()
+    assert client.get("/leaderboard?window=all", headers=headers).json()["entries"][0]["username"] == "ana"  # en cache
+    assert client.patch("/auth/me", json={"timezone": "Europe/Madrid"}, headers=headers).status_code == 200
+    assert client.get("/leaderboard?window=all", headers=headers).json()["entries"][0]["username"] == "ana2"
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.ratelimit import RateLimiter, RateLimitMiddleware, client_key
+from app.core.security import create_access_token
+
+
+@pytest.fixture
+def limited_client(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_DEFAULT", (3, 0.001))
+    monkeypatch.setattr(settings, "RATE_LIMITS", {"POST /auth/login": (2, 0.001)})
+    monkeypatch.setattr(settings, "RATE_LIMIT_IP_ROUTES", ("POST /auth/login",))
+    app = FastAPI()
+    app.post("/auth/login")(lambda: {"ok": True})
+    app.get("/habits")(lambda: [])
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter())
+    return TestClient(app)
+
+def _bearer(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def test_login_is_limited_by_ip_even_with_tokens(limited_client):
+    # cada request con el token de otra cuenta: todas comparten el bucket de la IP
+    codes = [limited_client.post("/auth/login", headers=_bearer(user_id)).status_code for user_id in range(4)]
+    assert codes == [200, 200, 429, 429]
+
+def test_other_routes_are_limited_per_user(limited_client):
+    codes = [limited_client.get("/habits", headers=_bearer(1)).status_code for _ in range(4)]
+    assert codes == [200, 200, 200, 429]
+    response = limited_client.get("/habits", headers=_bearer(2))
+    assert response.status_code == 200
+    limited = limited_client.get("/habits", headers=_bearer(1))
+    assert int(limited.headers["retry-after"]) > 0
+
+
+def _scope(client: str, forwarded: str | None = None) -> dict:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return {"type": "http", "client": (client, 1234), "headers": headers}
+
+def test_forwarded_ip_is_used_only_behind_a_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", ("10.0.0.0/8",))
+    assert client_key(_scope("10.0.0.5", "203.0.113.7")) == "ip:203.0.113.7"
+    # el cliente puede inventar la parte izquierda: cuenta la ultima direccion que no es un proxy propio
+    assert client_key(_scope("10.0.0.5", "198.51.100.1, 203.0.113.7, 10.0.0.9")) == "ip:203.0.113.7"
+    assert client_key(_scope("203.0.113.7", "198.51.100.1")) == "ip:203.0.113.7"
+    assert client_key(_scope("10.0.0.5")) == "ip:10.0.0.5"
+
+
+def test_redis_outage_is_logged_once_and_retried_later(monkeypatch, caplog):
+    caplog.set_level(logging.INFO, logger="app.core.ratelimit")
+    class FlakyRedis:
+        down = True
+
+        async def acquire(self, *args):
+            if self.down:
+                raise ConnectionError("redis caido")
+            return 0.0
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_REDIS_RETRY_SECONDS", 0)
+    limiter = RateLimiter()
+    limiter.shared = FlakyRedis()
+    for _ in range(3):
+        assert asyncio.run(limiter.acquire("GET /habits", "user:1")) == 0
+    assert [r.levelname for r in caplog.records] == ["WARNING"]
+
+    limiter.shared.down = False
+    for _ in range(2):
+        asyncio.run(limiter.acquire("GET /habits", "user:1"))
+    assert [r.levelname for r in caplog.records] == ["WARNING", "INFO"]
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+
+def test_stats_accumulate_across_batches(client, register):
+    headers = register()
+    habit = client.post("/habits", json={"title": "leer", "category": "health", "is_public": False, "track_time": False}, headers=headers).json()
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    # primer batch crea las filas de agregados, los siguientes las actualizan
+    for days_ago in (2, 1, 0):
+        completed_at = (today - timedelta(days=days_ago)).isoformat()
+        response = client.post(f"/habits/{habit['id']}/completions", json={"completed_at": completed_at}, headers=headers)
+        assert response.status_code == 201, response.text
+
+    stats = client.get("/stats/me", headers=headers).json()
+    assert (stats["total_completions"], stats["current_streak"], stats["longest_streak"]) == (3, 3, 3)
+    assert stats["total_points"] == 3
+    habit_stats = client.get(f"/habits/{habit['id']}/stats", headers=headers).json()
+    assert (habit_stats["total_completions"], habit_stats["current_streak"]) == (3, 3)
+
+
+def test_future_completion_is_rejected(client, register):
+    headers = register()
+    habit = client.post("/habits", json={"title": "leer", "category": "health", "is_public": False, "track_time": False}, headers=headers).json()
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+
+    # una completion de manana adelantaria la racha y el "hecho hoy" de ese dia
+    response = client.post(f"/habits/{habit['id']}/completions", json={"completed_at": tomorrow}, headers=headers)
+    assert response.status_code == 422
+    response = client.post("/sync", json={"completions": [{"habit_id": habit["id"], "completed_at": tomorrow}]}, headers=headers)
+    assert response.status_code == 422
+
+    # desfase de reloj pequeno: se acepta
+    skewed = (datetime.utcnow() + timedelta(seconds=30)).isoformat()
+    response = client.post(f"/habits/{habit['id']}/completions", json={"completed_at": skewed}, headers=headers)
+    assert response.status_code == 201, response.text
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models.habits import HabitTombstone
+from app.services.sync_service import SyncService
+
+
+def _habit(client, headers, title: str) -> int:
+    response = client.post("/habits", json={"title": title, "category": "health", "is_public": False, "track_time": False}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def _complete(client, headers, habit_id: int, count: int) -> None:
+    response = client.post("/completions:batch", json={"completions": [{"habit_id": habit_id}] * count}, headers=headers)
+    assert response.status_code == 201, response.text
+
+
+def test_paged_snapshot_finishes_after_tombstone_purge(client, register, db):
+    headers = register()
+    for habit_id in (_habit(client, headers, "a"), _habit(client, headers, "b")):
+        _complete(client, headers, habit_id, 300)
+    deleted = _habit(client, headers, "c")
+    assert client.delete(f"/habits/{deleted}", headers=headers).status_code == 200
+
+    # el tombstone vence y se purga: sync_floor queda por encima de los sync_seq de las completions
+    db.execute(update(HabitTombstone).values(deleted_at=datetime.utcnow() - timedelta(days=365)))
+    assert SyncService.purge_tombstones(db) == 1
+    db.commit()
+
+    pages, completions, since = 0, set(), None
+    while True:
+        params = {"limit": 500} if since is None else {"limit": 500, "since": since}
+        page = client.get("/sync", params=params, headers=headers).json()
+        pages += 1
+        assert pages <= 3, "el snapshot paginado no termina"
+        completions.update(c["id"] for c in page["completions"])
+        since = page["token"]
+        if not page["has_more"]:
+            break
+
+    assert pages == 2
+    assert len(completions) == 600
+    assert deleted not in {h["id"] for h in page["habits"]}
+
+    # el token final es un token normal: sin cambios nuevos no devuelve nada
+    page = client.get("/sync", params={"since": since}, headers=headers).json()
+    assert (page["full"], page["completions"], page["habits"]) == (False, [], [])
+
+
+def test_old_token_gets_full_snapshot_after_purge(client, register, db):
+    headers = register()
+    habit_id = _habit(client, headers, "a")
+    token = client.get("/sync", headers=headers).json()["token"]
+    assert client.delete(f"/habits/{habit_id}", headers=headers).status_code == 200
+    db.execute(update(HabitTombstone).values(deleted_at=datetime.utcnow() - timedelta(days=365)))
+    SyncService.purge_tombstones(db)
+    db.commit()
+
+    page = client.get("/sync", params={"since": token}, headers=headers).json()
+    assert page["full"] is True
+    assert page["habits"] == []
+
+
+def test_small_pages_return_every_completion(client, register):
+    headers = register()
+    habit_id = _habit(client, headers, "a")
+    for _ in range(5):
+        _complete(client, headers, habit_id, 1)  # un sync_seq por request
+
+    pages, completions, since = 0, [], None
+    while True:
+        params = {"limit": 2} if since is None else {"limit": 2, "since": since}
+        response = client.get("/sync", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages += 1
+        assert len(page["completions"]) <= 2
+        completions.extend(c["id"] for c in page["completions"])
+        since = page["token"]
+        if not page["has_more"]:
+            break
+
+    assert pages == 3
+    assert sorted(completions) == sorted(set(completions)) and len(completions) == 5
@@ -0,0 +1,3 @@
+#!/bin/sh
+# permite conexiones de replicacion para el servicio postgres-replica (solo corre al crear el volumen)
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
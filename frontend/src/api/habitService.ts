@@ -99,11 +99,19 @@ const habitService = {
         await mockDelay();
         return [...mockHabits];
       }
-      const response = await fetch(`${API_URL}/habits`, {
-        method: 'GET',
-        headers: getHeaders()
-      });
-      return handleResponse<Habit[]>(response);
+      // GET /habits pagina (HABITS_PAGE_SIZE): se siguen las paginas con X-Next-Cursor
+      const habits: Habit[] = [];
+      let cursor: string | null = null;
+      do {
+        const url: string = cursor ? `${API_URL}/habits?cursor=${encodeURIComponent(cursor)}` : `${API_URL}/habits`;
+        const response = await fetch(url, {
+          method: 'GET',
+          headers: getHeaders()
+        });
+        habits.push(...await handleResponse<Habit[]>(response));
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor);
+      return habits;
     },
   
     getById: async (id: number): Promise<Habit> => {